@@ -0,0 +1,88 @@
+# python-services/agent_clients.py
+# Lazily constructed, process-wide clients shared by the LangGraph agent services
+
+import os
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from llm_gateway import LLMGateway
+
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+
+_lock = threading.Lock()
+_llms: Dict[Tuple[str, float], object] = {}
+_tool_llms: Dict[Tuple[str, float, Tuple[str, ...]], object] = {}
+_gateways: Dict[Tuple[str, str, float], LLMGateway] = {}
+_serper: Optional[object] = None
+
+# Replaced by override_clients() for offline benchmarks and replays
+_llm_factory: Optional[Callable[[str, float], object]] = None
+_serper_factory: Optional[Callable[[], object]] = None
+
+
+def _default_llm(model: str, temperature: float):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=temperature
+    )
+
+
+def _default_serper():
+    from langchain_community.utilities import GoogleSerperAPIWrapper
+    return GoogleSerperAPIWrapper()
+
+
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0.2):
+    """ChatGoogleGenerativeAI for (model, temperature); the google SDK is imported on first use"""
+    key = (model, temperature)
+    with _lock:
+        if key not in _llms:
+            _llms[key] = (_llm_factory or _default_llm)(model, temperature)
+        return _llms[key]
+
+
+def get_llm_with_tools(tools: Sequence, model: str = DEFAULT_MODEL, temperature: float = 0.2):
+    """get_llm(...).bind_tools(tools), built once per tool set"""
+    key = (model, temperature, tuple(tool.name for tool in tools))
+    llm = get_llm(model, temperature)
+    with _lock:
+        if key not in _tool_llms:
+            _tool_llms[key] = llm.bind_tools(tools)
+        return _tool_llms[key]
+
+
+def get_gateway(namespace: str, model: str = DEFAULT_MODEL, temperature: float = 0.2) -> LLMGateway:
+    key = (namespace, model, temperature)
+    llm = get_llm(model, temperature)
+    with _lock:
+        if key not in _gateways:
+            _gateways[key] = LLMGateway(llm, namespace=namespace)
+        return _gateways[key]
+
+
+def get_serper():
+    """GoogleSerperAPIWrapper; langchain_community is imported on first use"""
+    global _serper
+    with _lock:
+        if _serper is None:
+            _serper = (_serper_factory or _default_serper)()
+        return _serper
+
+
+def override_clients(llm_factory: Optional[Callable[[str, float], object]] = None,
+                     serper_factory: Optional[Callable[[], object]] = None) -> None:
+    """
+    Build clients with these factories from now on (None restores the real ones)
+    and drop every client and gateway created so far, so the next call picks up
+    the new factories and the current prompt cache.
+    """
+    global _llm_factory, _serper_factory, _serper
+    with _lock:
+        _llm_factory = llm_factory
+        _serper_factory = serper_factory
+        _llms.clear()
+        _tool_llms.clear()
+        _gateways.clear()
+        _serper = None
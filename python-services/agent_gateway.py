@@ -0,0 +1,118 @@
+# python-services/agent_gateway.py
+# Optional single-process gateway serving all four LangGraph agent apps
+#
+#   python agent_gateway.py                  # one process, listens on 8002/8004/8005/8006 like before
+#   python agent_gateway.py --workers 4      # same ports, 4 worker processes sharing the sockets
+#   python agent_gateway.py --port 8010      # one port, apps under /jobs /roadmap /course /hackathon
+#
+# The apps stay importable and runnable on their own (python roadmap.py etc.) for
+# separate deployment. Inside the gateway they share one interpreter, so the Gemini
+# clients, Serper wrapper, prompt cache and HTTP connection pools from agent_clients /
+# llm_gateway are created once per worker instead of once per service.
+
+import argparse
+import contextlib
+import os
+import socket
+
+import uvicorn
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import course
+import hackathon_agent
+import job_matcher_service
+import roadmap
+from metrics import metrics_endpoint
+from structured_logging import configure_logging
+
+load_dotenv()
+# Module level so spawned --workers processes configure logging on import too
+configure_logging("agent_gateway")
+
+# mount prefix -> (app, legacy port)
+SERVICES = {
+    "jobs": (job_matcher_service.app, 8002),
+    "roadmap": (roadmap.app, 8004),
+    "course": (course.app, 8005),
+    "hackathon": (hackathon_agent.app, 8006),
+}
+
+
+async def health(request):
+    return JSONResponse({"status": "healthy", "service": "agent_gateway", "apps": sorted(SERVICES)})
+
+
+class AgentGateway:
+    """ASGI app that dispatches by listening port, falling back to path prefixes"""
+
+    def __init__(self, services):
+        self.by_port = {port: app for app, port in services.values()}
+        self.apps = [app for app, _ in services.values()]
+        self.prefixed = Starlette(routes=[Route("/health", health), Route("/metrics", metrics_endpoint)] + [
+            Mount(f"/{prefix}", app=app) for prefix, (app, _) in services.items()
+        ])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        server = scope.get("server") or (None, None)
+        app = self.by_port.get(server[1], self.prefixed)
+        await app(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        """Mounted apps never see lifespan events, so run each app's startup/shutdown here"""
+        message = await receive()
+        assert message["type"] == "lifespan.startup"
+        async with contextlib.AsyncExitStack() as stack:
+            try:
+                for app in self.apps:
+                    await stack.enter_async_context(app.router.lifespan_context(app))
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+            message = await receive()
+            assert message["type"] == "lifespan.shutdown"
+        await send({"type": "lifespan.shutdown.complete"})
+
+
+app = AgentGateway(SERVICES)
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve all agent apps from one ASGI process")
+    parser.add_argument("--host", default=os.getenv("AGENT_GATEWAY_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=None,
+                        help="serve every app on this single port under path prefixes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AGENT_GATEWAY_WORKERS", "1")))
+    args = parser.parse_args()
+
+    ports = [args.port] if args.port else [port for _, port in SERVICES.values()]
+    sockets = [bind_socket(args.host, port) for port in ports]
+
+    config = uvicorn.Config("agent_gateway:app", host=args.host, workers=args.workers, lifespan="on")
+    server = uvicorn.Server(config)
+
+    print(f"🚀 Agent gateway: {', '.join(sorted(SERVICES))} on port(s) {', '.join(map(str, ports))}"
+          f" with {args.workers} worker(s)")
+    if args.workers > 1:
+        from uvicorn.supervisors import Multiprocess
+        Multiprocess(config, target=server.run, sockets=sockets).run()
+    else:
+        server.run(sockets=sockets)
+
+
+if __name__ == "__main__":
+    main()
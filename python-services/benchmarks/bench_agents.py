@@ -0,0 +1,247 @@
+# python-services/benchmarks/bench_agents.py
+# Offline load harness for the four LangGraph agent pipelines (no Gemini, no Serper, no GitHub)
+#
+#   python benchmarks/bench_agents.py                                  # synthetic clients, all phases
+#   python benchmarks/bench_agents.py --llm-latency lognormal:900:0.5 --search-latency uniform:150:400
+#   python benchmarks/bench_agents.py --mode record --recording rec.json --pipelines roadmap
+#   python benchmarks/bench_agents.py --mode replay --recording rec.json --llm-latency recorded
+#   python benchmarks/bench_agents.py --json out.json
+#
+# Phases:
+#   overhead  zero upstream latency, one request at a time -> pure orchestration cost
+#             (graph scheduling, prompt building, JSON parsing, validation)
+#   scaling   simulated upstream latency at increasing concurrency -> throughput, p50/p99,
+#             and how close throughput gets to linear in concurrency
+#   cache     unique inputs (cold) then the same inputs again (warm) -> prompt cache hit ratio
+#
+# Clients are swapped through agent_clients.override_clients(); the prompt cache is an
+# in-memory PromptCache per phase, so runs never touch .cache/ and start from a known state.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The agent modules read these at import; the fakes never send them anywhere
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("SERPER_API_KEY", "offline-benchmark")
+
+PIPELINES = ["jobs", "roadmap", "course", "hackathon"]
+MODES = ["synthetic", "record", "replay"]
+
+RESUME = """
+Jane Doe - Backend Engineer, Bengaluru. 4 years building Python services.
+Skills: Python, FastAPI, Django, PostgreSQL, Redis, Docker, Kubernetes, AWS, CI/CD, REST APIs.
+Experience: Senior Software Engineer at Acme (2022-present) - payment APIs, 2k rps, p99 under 80ms.
+Software Engineer at Globex (2020-2022) - data pipelines with Airflow and Spark.
+Education: B.Tech Computer Science.
+"""
+
+
+async def run_jobs(i: int):
+    from job_matcher_service import get_job_graph
+    state = {"resume_text": f"{RESUME}\nReference {i}", "messages": [], "preferred_location": "Bengaluru",
+             "job_type": "Full-time", "salary_expectation": "", "industry_preference": "", "search_iterations": 0}
+    result = await get_job_graph().ainvoke(state, config={"configurable": {"thread_id": f"bench_{i}_{time.time_ns()}"}})
+    return result.get("matched_jobs", [])
+
+
+async def run_roadmap(i: int):
+    from roadmap import build_roadmap
+    return await build_roadmap(f"Backend Engineering {i}", "Professional")
+
+
+async def run_course(i: int):
+    from course import build_course
+    return await build_course(f"Machine Learning {i}", "Beginner")
+
+
+async def run_hackathon(i: int):
+    from hackathon_agent import get_app_graph
+    # No github_username: the GitHub scan is skipped, so only LLM + search are exercised
+    state = {"inputs": {"location": "Online", "goal": "Get Hired", "github_username": "",
+                        "tech_stack": ["Python", "React"], "min_prize": 0},
+             "query": f"AI hackathon {i}", "github_skills": "", "raw_results": "", "structured_events": []}
+    result = await get_app_graph().ainvoke(state)
+    return result["structured_events"]
+
+
+RUNNERS = {"jobs": run_jobs, "roadmap": run_roadmap, "course": run_course, "hackathon": run_hackathon}
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_load(runner, inputs, concurrency: int) -> dict:
+    """Run runner(i) for every i in inputs with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await runner(i)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(repr(e))
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # the nodes print progress per request
+        await asyncio.gather(*(one(i) for i in inputs))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(inputs),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def fresh_clients(args, llm_latency: str, search_latency: str, cache_entries: int) -> dict:
+    """New in-memory prompt cache + freshly installed clients for one phase"""
+    import fake_clients
+    from llm_gateway import PromptCache, set_prompt_cache
+
+    cache = PromptCache(path=None, max_entries=cache_entries)
+    set_prompt_cache(cache)
+    installed = fake_clients.install(args.mode, llm_latency, search_latency, args.recording, args.seed)
+    installed["cache"] = cache
+    return installed
+
+
+async def phase_overhead(args, pipeline: str) -> dict:
+    installed = fresh_clients(args, "fixed:0", "fixed:0", cache_entries=0)
+    runner = RUNNERS[pipeline]
+    await run_load(runner, range(-args.warmup, 0), 1)
+    result = await run_load(runner, range(args.requests), 1)
+    result["upstream"] = installed["stats"].snapshot()
+    return result
+
+
+async def phase_scaling(args, pipeline: str) -> list:
+    results = []
+    base = None
+    for concurrency in args.concurrency:
+        installed = fresh_clients(args, args.llm_latency, args.search_latency, cache_entries=0)
+        result = await run_load(RUNNERS[pipeline], range(max(args.requests, concurrency * 2)), concurrency)
+        if base is None:
+            base = result["throughput_rps"] / concurrency if concurrency else 0.0
+        # 1.0 = throughput grew linearly with concurrency; well below means something serializes
+        result["efficiency"] = round(result["throughput_rps"] / (base * concurrency), 2) if base else 0.0
+        result["upstream"] = installed["stats"].snapshot()
+        results.append(result)
+    return results
+
+
+async def phase_cache(args, pipeline: str) -> dict:
+    installed = fresh_clients(args, args.llm_latency, args.search_latency, cache_entries=100_000)
+    cache = installed["cache"]
+    inputs = range(args.requests)
+    cold = await run_load(RUNNERS[pipeline], inputs, 1)
+    cold["cache"] = cache.stats()
+    hits, misses = cache.hits, cache.misses
+    warm = await run_load(RUNNERS[pipeline], inputs, 1)
+    warm_hits, warm_misses = cache.hits - hits, cache.misses - misses
+    warm["cache"] = {"hits": warm_hits, "misses": warm_misses,
+                     "hit_ratio": round(warm_hits / (warm_hits + warm_misses), 4) if warm_hits + warm_misses else 0.0}
+    return {"cold": cold, "warm": warm, "upstream": installed["stats"].snapshot()}
+
+
+def print_row(label: str, result: dict) -> None:
+    extra = f"  eff {result['efficiency']:.2f}" if "efficiency" in result else ""
+    print(f"   {label:<14} p50 {result['p50_ms']:>9.2f}ms  p99 {result['p99_ms']:>9.2f}ms"
+          f"  {result['throughput_rps']:>7.2f} req/s  errors {result['errors']}{extra}")
+    if result.get("first_error"):
+        print(f"   ⚠️ {result['first_error'][:160]}")
+
+
+async def run(args) -> dict:
+    report = {"mode": args.mode, "llm_latency": args.llm_latency, "search_latency": args.search_latency,
+              "seed": args.seed, "pipelines": {}}
+    for pipeline in args.pipelines:
+        print(f"🤖 {pipeline}")
+        results = {}
+        if "overhead" in args.phases:
+            results["overhead"] = await phase_overhead(args, pipeline)
+            print_row("overhead", results["overhead"])
+        if "scaling" in args.phases:
+            results["scaling"] = await phase_scaling(args, pipeline)
+            for result in results["scaling"]:
+                print_row(f"c={result['concurrency']}", result)
+        if "cache" in args.phases:
+            results["cache"] = await phase_cache(args, pipeline)
+            print_row("cache cold", results["cache"]["cold"])
+            print_row("cache warm", results["cache"]["warm"])
+            print(f"   💾 warm hit ratio {results['cache']['warm']['cache']['hit_ratio']:.2%}")
+        report["pipelines"][pipeline] = results
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the agent pipelines")
+    parser.add_argument("pipelines", nargs="*", default=PIPELINES, help=f"subset of {', '.join(PIPELINES)}")
+    parser.add_argument("--mode", choices=MODES, default="synthetic")
+    parser.add_argument("--recording", help="JSON file written by --mode record and read by --mode replay")
+    parser.add_argument("--phases", default="overhead,scaling,cache", help="comma-separated subset")
+    parser.add_argument("--llm-latency", default="lognormal:800:0.4",
+                        help="fixed:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA | recorded")
+    parser.add_argument("--search-latency", default="uniform:150:400")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels for the scaling phase")
+    parser.add_argument("--requests", type=int, default=8, help="requests per measurement")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="write results to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error(f"unknown pipelines: {', '.join(sorted(unknown))}")
+    if args.mode != "synthetic" and not args.recording:
+        parser.error(f"--mode {args.mode} needs --recording")
+    if args.mode == "record":
+        # Live clients: measure orchestration + real upstream once, at concurrency 1
+        args.phases = "overhead"
+        args.warmup = 0
+    args.phases = [p.strip() for p in args.phases.split(",") if p.strip()]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+
+    report = asyncio.run(run(args))
+
+    if args.mode == "record":
+        import agent_clients
+        recording = agent_clients.get_serper().recording
+        recording.save()
+        print(f"📼 Recorded {len(recording.entries)} responses to {args.recording}")
+    elif args.mode == "replay":
+        misses = sum(phase.get("upstream", {}).get("replay_misses", 0)
+                     for results in report["pipelines"].values()
+                     for phase in ([results.get("overhead", {}), results.get("cache", {})] + results.get("scaling", [])))
+        print(f"📼 Replay misses (served synthetic): {misses}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# python-services/benchmarks/bench_logging.py
+# Per-request logging overhead on the request thread: legacy INFO lines vs structured_logging
+#
+#   python benchmarks/bench_logging.py                    # 2000 simulated /verify requests
+#   python benchmarks/bench_logging.py --sink-delay-us 200  # simulate a slow terminal/disk
+#   python benchmarks/bench_logging.py --json out.json
+#
+# "legacy" replays the 12 INFO lines face_service.py used to write per verification through
+# a synchronous handler. "structured" replays the current calls: sampled hot-path debug
+# (disabled at INFO) plus one structured INFO line, written by a QueueListener thread.
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structured_logging import SampledLogger, create_queue_handler, request_id_var  # noqa: E402
+
+
+class SinkHandler(logging.Handler):
+    """Formats like a real handler and then discards, optionally stalling like a slow stream"""
+
+    def __init__(self, delay_us: float = 0.0):
+        super().__init__()
+        self.delay = delay_us / 1e6
+        self.written = 0
+
+    def emit(self, record):
+        self.format(record)
+        if self.delay:
+            deadline = time.perf_counter() + self.delay
+            while time.perf_counter() < deadline:
+                pass
+        self.written += 1
+
+
+def legacy_request(logger: logging.Logger, i: int) -> None:
+    similarity = 0.8123
+    logger.info("👤 Face verification request received")
+    logger.info(f"📥 Stored URL: {'https://res.cloudinary.com/demo/image/upload/face.jpg'[:50]}...")
+    logger.info(f"📥 Test image: {48213} chars")
+    logger.info("👤 Starting face verification...")
+    logger.info("📥 Downloading image from: https://res.cloudinary.com/demo/image/upload/face.jpg")
+    logger.info(f"✅ Downloaded {35812} bytes")
+    logger.info(f"🖼️ Processed image shape: {(480, 640, 3)}")
+    logger.info("🔍 Detecting face in stored image...")
+    logger.info(f"✅ InsightFace detected face: score={0.91:.3f}, size={180}x{200}")
+    logger.info(f"📊 Calculated similarity: {similarity:.4f}")
+    logger.info(f"🎯 VERIFICATION RESULT: {True}")
+    logger.info(f"📊 Similarity: {similarity:.4f} (threshold: {0.6})")
+
+
+def structured_request(logger: logging.Logger, hot: SampledLogger, i: int) -> None:
+    similarity = 0.8123
+    request_id_var.set(f"bench-{i}")
+    hot.debug("👤 Face verification request: stored=%s test=%d chars",
+              "https://res.cloudinary.com/demo/image/upload/face.jpg", 48213)
+    hot.debug("📥 Downloading image from: %s", "https://res.cloudinary.com/demo/image/upload/face.jpg")
+    hot.debug("✅ Downloaded %d bytes", 35812)
+    hot.debug("🖼️ Processed image shape: %s", (480, 640, 3))
+    hot.debug("✅ InsightFace detected face: score=%.3f, size=%dx%d", 0.91, 180, 200)
+    hot.debug("📊 Calculated similarity: %.4f", similarity)
+    logger.info("🎯 Face verification result", extra={
+        'verified': True, 'similarity': similarity, 'threshold': 0.6, 'confidence': 'HIGH', 'method': 'InsightFace'
+    })
+
+
+def isolated_logger(name: str, handler: logging.Handler, level: int) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+def measure(run, requests: int):
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        run(i)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p99_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request logging overhead benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sink-delay-us", type=float, default=0.0,
+                        help="busy-wait per written line, simulating a slow terminal or disk")
+    parser.add_argument("--format", choices=["json", "text"], default="json")
+    parser.add_argument("--json", metavar="PATH", help="write results to this file")
+    args = parser.parse_args()
+
+    # Legacy: synchronous handler, everything at INFO
+    legacy_sink = SinkHandler(args.sink_delay_us)
+    legacy_sink.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+    legacy = isolated_logger("bench.legacy", legacy_sink, logging.INFO)
+    legacy_result = measure(lambda i: legacy_request(legacy, i), args.requests)
+    legacy_result["lines_written"] = legacy_sink.written
+
+    # Structured: queue handler on the request thread, formatting + writing on the listener
+    structured_sink = SinkHandler(args.sink_delay_us)
+    enqueue, listener = create_queue_handler("bench", args.format, output=structured_sink)
+    structured = isolated_logger("bench.structured", enqueue, logging.INFO)
+    hot = SampledLogger(structured)
+    structured_result = measure(lambda i: structured_request(structured, hot, i), args.requests)
+    listener.stop()  # drains the queue
+    structured_result["lines_written"] = structured_sink.written
+
+    speedup = legacy_result["mean_us"] / structured_result["mean_us"] if structured_result["mean_us"] else 0.0
+    print(f"📊 {args.requests} simulated verifications, sink delay {args.sink_delay_us:.0f}µs/line")
+    for name, result in (("legacy", legacy_result), ("structured", structured_result)):
+        print(f"   {name:<11} mean {result['mean_us']:>8.2f}µs  p50 {result['p50_us']:>8.2f}µs"
+              f"  p99 {result['p99_us']:>8.2f}µs  lines {result['lines_written']}")
+    print(f"⚡ Request-thread logging cost reduced {speedup:.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"requests": args.requests, "sink_delay_us": args.sink_delay_us,
+                       "legacy": legacy_result, "structured": structured_result,
+                       "speedup": round(speedup, 2)}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,559 @@
+# python-services/benchmarks/bench_verification.py
+# Reproducible latency/throughput benchmark for verify_faces and verify_voices
+#
+#   python benchmarks/bench_verification.py                         # face + voice, default matrix
+#   python benchmarks/bench_verification.py face --resolutions 640x480 1920x1080
+#   python benchmarks/bench_verification.py preprocess              # image decode + resize only
+#   python benchmarks/bench_verification.py upload                  # JSON vs multipart vs raw body
+#   python benchmarks/bench_verification.py monitor --frames 300    # per-frame monitoring cost
+#   python benchmarks/bench_verification.py models                  # InsightFace module/det-size configs
+#   python benchmarks/bench_verification.py identities --identities 100000  # 1:N search, no model needed
+#   python benchmarks/bench_verification.py voice --clip-seconds 3 10 --iterations 10
+#   python benchmarks/bench_verification.py --json results/HEAD.json
+#   python benchmarks/bench_verification.py --compare results/base.json results/HEAD.json
+#
+# Stored media is served by a local HTTP server standing in for Cloudinary, so runs
+# need no network. Face fixtures come from InsightFace's bundled sample photo
+# (insightface.data.get_image('t1')) resized to each resolution, or synthetic frames
+# when it is unavailable. Voice fixtures are synthetic voiced clips, encoded as webm
+# when ffmpeg is available (the format the frontend records) and as WAV otherwise.
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+DEFAULT_RESOLUTIONS = ["640x480", "1280x720", "1920x1080", "4032x3024", "3024x4032"]
+DEFAULT_CLIP_SECONDS = [2.0, 5.0, 10.0, 30.0]
+SAMPLE_RATE = 16000
+
+
+# --- LOCAL MEDIA SERVER ---
+class FixtureServer:
+    """Serves in-memory fixtures over HTTP on an ephemeral localhost port"""
+
+    def __init__(self):
+        self.files = {}
+        files = self.files
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = files.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add(self, path: str, body: bytes) -> str:
+        self.files[path] = body
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+# --- FIXTURES ---
+def _base_face_image():
+    """RGB uint8 array of a photo with faces, or None"""
+    try:
+        from insightface.data import get_image
+        return get_image("t1")[:, :, ::-1]  # BGR -> RGB
+    except Exception:
+        return None
+
+
+def face_fixture(width: int, height: int, seed: int) -> bytes:
+    import numpy as np
+    from PIL import Image
+    base = _base_face_image()
+    if base is not None:
+        image = Image.fromarray(np.ascontiguousarray(base)).resize((width, height), Image.Resampling.BILINEAR)
+    else:
+        # Smooth synthetic frame; exercises decode/resize/detection cost without a face
+        rng = np.random.default_rng(seed)
+        small = rng.integers(0, 255, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+        image = Image.fromarray(small).resize((width, height), Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def voiced_signal(seconds: float, seed: int, f0: float):
+    """Harmonic source with vibrato, syllable envelope and noise; float32 in [-1, 1]"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 5 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t + rng.uniform(0, np.pi)))
+    signal = 0.3 * voice * envelope + 0.02 * rng.standard_normal(t.shape)
+    return (signal / np.max(np.abs(signal))).astype(np.float32)
+
+
+def encode_audio(signal) -> tuple:
+    """(bytes, format) - webm/opus through pydub when ffmpeg works, WAV otherwise"""
+    import numpy as np
+    pcm = (signal * 32767).astype(np.int16).tobytes()
+    try:
+        from pydub import AudioSegment
+        segment = AudioSegment(pcm, sample_width=2, frame_rate=SAMPLE_RATE, channels=1)
+        buffer = io.BytesIO()
+        segment.export(buffer, format="webm", codec="libopus")
+        return buffer.getvalue(), "webm"
+    except Exception:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(SAMPLE_RATE)
+            wav.writeframes(pcm)
+        return buffer.getvalue(), "wav"
+
+
+def webcam_frames(width: int, height: int, count: int) -> list:
+    """JPEG frames of the fixture drifting a few pixels per frame, like a candidate on a webcam"""
+    import numpy as np
+    from PIL import Image
+    base = np.asarray(Image.open(io.BytesIO(face_fixture(width, height, seed=2))).convert("RGB"))
+    frames = []
+    for i in range(count):
+        shifted = np.roll(base, (int(4 * np.sin(i / 10)), int(6 * np.cos(i / 15))), axis=(0, 1))
+        buffer = io.BytesIO()
+        Image.fromarray(shifted).save(buffer, format="JPEG", quality=80)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def data_url(body: bytes, mime: str) -> str:
+    return f"data:{mime};base64," + base64.b64encode(body).decode("ascii")
+
+
+# --- MEASUREMENT ---
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values, q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_case(call, iterations: int, warmup: int, concurrency: int) -> dict:
+    from profiling import collect
+
+    def timed_call(_):
+        with collect() as profile:
+            started = time.perf_counter()
+            result = call()
+            elapsed = time.perf_counter() - started
+        return elapsed, result, profile.breakdown()["stages_ms"]
+
+    for i in range(warmup):
+        timed_call(i)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            runs = list(pool.map(timed_call, range(iterations)))
+    else:
+        runs = [timed_call(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in runs)
+    errors = sum(1 for _, result, _ in runs if result.get("error"))
+    stage_totals = {}
+    for _, _, stages in runs:
+        for name, ms in stages.items():
+            stage_totals[name] = stage_totals.get(name, 0.0) + ms
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p90_ms": round(percentile(latencies, 0.90), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "throughput_rps": round(iterations / wall, 2) if wall else 0.0,
+        "errors": errors,
+        "verified": sum(1 for _, result, _ in runs if result.get("verified")),
+        "stages_mean_ms": {name: round(total / len(runs), 2) for name, total in stage_totals.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_face(server, args) -> dict:
+    from face_service import face_verifier
+    face_verifier.wait_until_ready()
+    results = {}
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        stored_url = server.add(f"/face/{resolution}.jpg", face_fixture(width, height, seed=1))
+        test_b64 = data_url(face_fixture(width, height, seed=2), "image/jpeg")
+        case = run_case(lambda: face_verifier.verify_faces(stored_url, test_b64),
+                        args.iterations, args.warmup, args.concurrency)
+        results[f"face/{resolution}"] = case
+        print(f"👤 face {resolution:>10}: p50 {case['p50_ms']:>8.1f}ms  p99 {case['p99_ms']:>8.1f}ms"
+              f"  {case['throughput_rps']:>6.2f} req/s  errors {case['errors']}  rss {case['peak_rss_mb']}MB")
+    return results
+
+
+def bench_preprocess(server, args) -> dict:
+    """preprocess_image alone: webcam frames and high-resolution uploads, no model needed"""
+    from face_service import face_verifier
+    results = {}
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        test_b64 = data_url(face_fixture(width, height, seed=2), "image/jpeg")
+
+        def call():
+            image_array, _ = face_verifier.preprocess_image(test_b64)
+            return {"shape": image_array.shape}
+
+        case = run_case(call, args.iterations, args.warmup, args.concurrency)
+        results[f"preprocess/{resolution}"] = case
+        stages = "  ".join(f"{name} {ms:.1f}ms" for name, ms in case["stages_mean_ms"].items())
+        print(f"🖼️ preprocess {resolution:>10}: p50 {case['p50_ms']:>7.2f}ms  p99 {case['p99_ms']:>7.2f}ms  {stages}")
+    return results
+
+
+def upload_bodies(stored_url: str, jpeg: bytes) -> dict:
+    """encoding -> (body, content type, query string) for one /verify request"""
+    from werkzeug.datastructures import FileStorage
+    from werkzeug.test import encode_multipart
+    json_body = json.dumps({"stored_image_url": stored_url,
+                            "test_image_base64": data_url(jpeg, "image/jpeg")}).encode("utf-8")
+    boundary, multipart_body = encode_multipart({
+        "stored_image_url": stored_url,
+        "test_image": FileStorage(io.BytesIO(jpeg), filename="frame.jpg", content_type="image/jpeg"),
+    })
+    return {
+        "json": (json_body, "application/json", ""),
+        "multipart": (multipart_body, f"multipart/form-data; boundary={boundary}", ""),
+        "binary": (jpeg, "application/octet-stream", f"stored_image_url={stored_url}"),
+    }
+
+
+def bench_upload(server, args) -> dict:
+    """Bytes on the wire and server-side parse + decode time per /verify encoding (no model needed)"""
+    from face_service import app, face_verifier
+    from uploads import read_verify_upload
+    results = {}
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        bodies = upload_bodies("http://127.0.0.1/face/stored.jpg", face_fixture(width, height, seed=2))
+        for encoding, (body, content_type, query) in bodies.items():
+            def call():
+                with app.test_request_context("/verify", method="POST", data=body,
+                                              content_type=content_type, query_string=query):
+                    upload = read_verify_upload("face", "stored_image_url", "test_image_base64", "test_image")
+                    image_array, _ = face_verifier.preprocess_image(upload.media)
+                return {"shape": image_array.shape}
+
+            case = run_case(call, args.iterations, args.warmup, args.concurrency)
+            case["body_bytes"] = len(body)
+            results[f"upload/{resolution}/{encoding}"] = case
+            print(f"📦 upload {resolution:>10} {encoding:<9}: {len(body) / 1024:>8.1f}KB"
+                  f"  p50 {case['p50_ms']:>7.2f}ms  p99 {case['p99_ms']:>7.2f}ms")
+    return results
+
+
+def bench_monitor(server, args) -> dict:
+    """Per-frame cost of interview monitoring: full FaceAnalysis.get vs detector + IoU tracking"""
+    import itertools
+    from face_service import face_verifier
+    face_verifier.wait_until_ready()
+    stored_url = server.add("/face/monitor.jpg", face_fixture(640, 480, seed=1))
+    frames = webcam_frames(640, 480, min(args.frames, 60))
+    results = {}
+
+    full_frames = itertools.cycle(frames)
+
+    def full_call():
+        image_array, scale = face_verifier.preprocess_image(io.BytesIO(next(full_frames)))
+        face = face_verifier.detect_best_face(image_array, scale)
+        return {"verified": face is not None}
+
+    session = face_verifier.start_monitor_session(stored_url)
+    monitor_frames = itertools.cycle(frames)
+    embedded = []
+
+    def monitor_call():
+        image_array, scale = face_verifier.preprocess_image(io.BytesIO(next(monitor_frames)))
+        result = face_verifier.monitor_frame(session, image_array, scale)
+        embedded.append(result["embedded"])
+        return {"verified": result["same_person"]}
+
+    for name, call in (("full", full_call), ("monitor", monitor_call)):
+        cpu_started = time.process_time()
+        case = run_case(call, args.frames, args.warmup, 1)
+        case["cpu_ms_per_frame"] = round((time.process_time() - cpu_started) * 1000 / (args.frames + args.warmup), 2)
+        results[f"monitor/{name}"] = case
+    results["monitor/monitor"]["embed_ratio"] = round(sum(embedded) / len(embedded), 3) if embedded else 0.0
+
+    full, monitor = results["monitor/full"], results["monitor/monitor"]
+    for name, case in (("full", full), ("monitor", monitor)):
+        print(f"🎥 monitor {name:<8}: p50 {case['p50_ms']:>7.2f}ms  cpu {case['cpu_ms_per_frame']:>7.2f}ms/frame"
+              f"  verified {case['verified']}/{case['iterations']}")
+    if monitor["cpu_ms_per_frame"]:
+        print(f"⚡ {full['cpu_ms_per_frame'] / monitor['cpu_ms_per_frame']:.1f}x less CPU per monitored frame"
+              f" (recognition on {monitor['embed_ratio']:.0%} of frames)")
+    return results
+
+
+# Each configuration loads the models in a fresh process, so startup and RSS are comparable
+MODEL_CONFIGS = {
+    "all-modules/get": {"FACE_MODULES": "all", "FACE_ADAPTIVE_DET_SIZE": "0", "PROBE_FULL_GET": "1"},
+    "det+rec/640": {"FACE_MODULES": "detection,recognition", "FACE_ADAPTIVE_DET_SIZE": "0"},
+    "det+rec/adaptive": {"FACE_MODULES": "detection,recognition", "FACE_ADAPTIVE_DET_SIZE": "1"},
+}
+
+MODEL_PROBE = """
+import io, json, os, sys, time
+sys.path[:0] = [{service_dir!r}, {bench_dir!r}]
+from bench_verification import face_fixture
+from face_service import face_verifier
+face_verifier.wait_until_ready()
+image_array, scale = face_verifier.preprocess_image(io.BytesIO(face_fixture({width}, {height}, seed=2)))
+if os.environ.get("PROBE_FULL_GET") == "1":
+    call = lambda: face_verifier.insight_model.get(image_array)  # what /verify ran before
+else:
+    call = lambda: face_verifier.detect_best_face(image_array, scale)
+for _ in range(3):
+    call()
+timings = []
+for _ in range({iterations}):
+    started = time.perf_counter()
+    call()
+    timings.append((time.perf_counter() - started) * 1000)
+timings.sort()
+print("MODEL_PROBE " + json.dumps({{
+    "init_seconds": face_verifier.init_seconds, "model_rss_mb": face_verifier.model_rss_mb,
+    "modules": sorted(face_verifier.insight_model.models) if face_verifier.insight_model else [],
+    "frame_p50_ms": round(timings[len(timings) // 2], 2), "frame_mean_ms": round(sum(timings) / len(timings), 2)}}))
+"""
+
+
+def bench_models(server, args) -> dict:
+    """Startup time, model RSS and per-frame latency for each InsightFace configuration"""
+    results = {}
+    for resolution in args.resolutions[:2]:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        probe = MODEL_PROBE.format(service_dir=SERVICE_DIR, bench_dir=os.path.dirname(os.path.abspath(__file__)),
+                                   width=width, height=height, iterations=args.iterations)
+        for name, overrides in MODEL_CONFIGS.items():
+            env = dict(os.environ, **overrides)
+            proc = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True)
+            line = next((l for l in proc.stdout.splitlines() if l.startswith("MODEL_PROBE ")), None)
+            if line is None:
+                print(f"❌ models {name}: probe failed\n{proc.stderr[-2000:]}")
+                continue
+            case = json.loads(line[len("MODEL_PROBE "):])
+            results[f"models/{resolution}/{name}"] = case
+            print(f"🧠 models {resolution:>9} {name:<17}: init {case['init_seconds']:>5.2f}s"
+                  f"  rss +{case['model_rss_mb']}MB  frame p50 {case['frame_p50_ms']:>7.2f}ms  {case['modules']}")
+    return results
+
+
+def bench_identities(server, args) -> dict:
+    """IdentityIndex search at args.identities synthetic embeddings: exact scan vs IVF, plus save/load"""
+    import tempfile
+    import numpy as np
+    import identity_index
+    from identity_index import IdentityIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.identities, 512)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Queries are enrolled faces seen again: cosine ~0.7 to their own entry
+    targets = rng.integers(0, args.identities, size=256)
+    noise = rng.standard_normal((len(targets), 512)).astype(np.float32)
+    queries = vectors[targets] + noise / np.linalg.norm(noise, axis=1, keepdims=True)
+
+    index = IdentityIndex(512)
+    started = time.perf_counter()
+    for i, vector in enumerate(vectors):
+        index.add(f"c{i}", vector)
+    add_s = time.perf_counter() - started
+    print(f"🗂️ identities {args.identities}: added in {add_s:.2f}s ({len(index.blocks)} lists)")
+
+    results = {}
+    for label, nprobe in (("exact", len(index.blocks)), ("ivf", identity_index.NPROBE)):
+        position = iter(range(10 ** 9))
+
+        def call():
+            i = next(position) % len(targets)
+            top = index.search(queries[i], k=5, nprobe=nprobe)
+            return {"verified": bool(top) and top[0][0] == f"c{targets[i]}"}
+
+        case = run_case(call, max(args.iterations, len(targets)), args.warmup, args.concurrency)
+        case["recall_at_1"] = round(case.pop("verified") / case["iterations"], 3)
+        case["nprobe"] = nprobe
+        results[f"identities/{args.identities}/{label}"] = case
+        print(f"🗂️ search {label:>5} (nprobe {nprobe:>4}): p50 {case['p50_ms']:>7.3f}ms  p99 {case['p99_ms']:>7.3f}ms"
+              f"  recall@1 {case['recall_at_1']:.3f}")
+
+    with tempfile.TemporaryDirectory() as path:
+        started = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - started
+        started = time.perf_counter()
+        IdentityIndex.load(path)
+        load_s = time.perf_counter() - started
+    print(f"🗂️ save {save_s * 1000:.0f}ms  memory-mapped load {load_s * 1000:.0f}ms")
+    results[f"identities/{args.identities}/persistence"] = {
+        "add_s": round(add_s, 2), "save_ms": round(save_s * 1000, 1), "load_ms": round(load_s * 1000, 1)}
+    return results
+
+
+def bench_voice(server, args) -> dict:
+    from voice_service import voice_verifier
+    voice_verifier.wait_until_ready()
+    results = {}
+    for seconds in args.clip_seconds:
+        stored_body, fmt = encode_audio(voiced_signal(seconds, seed=1, f0=140))
+        test_body, _ = encode_audio(voiced_signal(seconds, seed=2, f0=150))
+        stored_url = server.add(f"/voice/{seconds:g}s.{fmt}", stored_body)
+        test_b64 = data_url(test_body, f"audio/{fmt}")
+        case = run_case(lambda: voice_verifier.verify_voices(stored_url, test_b64),
+                        args.iterations, args.warmup, args.concurrency)
+        case["audio_format"] = fmt
+        results[f"voice/{seconds:g}s"] = case
+        print(f"🎤 voice {seconds:>8g}s: p50 {case['p50_ms']:>8.1f}ms  p99 {case['p99_ms']:>8.1f}ms"
+              f"  {case['throughput_rps']:>6.2f} req/s  errors {case['errors']}  rss {case['peak_rss_mb']}MB ({fmt})")
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# --- COMPARE ---
+def compare(baseline_path: str, current_path: str, threshold: float, metric: str) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["cases"]
+    with open(current_path) as f:
+        current = json.load(f)["cases"]
+
+    regressions = []
+    print(f"{'case':<20} {'baseline':>10} {'current':>10} {'change':>8}   ({metric})")
+    for name in sorted(set(baseline) & set(current)):
+        if metric not in baseline[name] or metric not in current[name]:
+            continue
+        before, after = baseline[name][metric], current[name][metric]
+        change = (after - before) / before if before else 0.0
+        flag = "❌" if change > threshold else "✅"
+        print(f"{name:<20} {before:>10.1f} {after:>10.1f} {change:>+7.1%} {flag}")
+        if change > threshold:
+            regressions.append(name)
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:<20} only in {'baseline' if name in baseline else 'current'}")
+
+    if regressions:
+        print(f"\n❌ Regressed beyond {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\n✅ No case regressed beyond {threshold:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face and voice verification")
+    parser.add_argument("services", nargs="*", metavar="SERVICE",
+                        help="face, voice, preprocess, upload, monitor, models and/or identities (default: face and voice)")
+    parser.add_argument("--resolutions", nargs="+", default=DEFAULT_RESOLUTIONS, help="WIDTHxHEIGHT")
+    parser.add_argument("--clip-seconds", nargs="+", type=float, default=DEFAULT_CLIP_SECONDS)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=300, help="frames per monitoring run")
+    parser.add_argument("--identities", type=int, default=100_000, help="index size for the identities case")
+    parser.add_argument("--media-cache", action="store_true",
+                        help="serve repeat stored-media fetches from the disk cache (default: always download)")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel verifications (threads)")
+    parser.add_argument("--json", metavar="PATH", help="write results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown for --compare")
+    parser.add_argument("--metric", default="p50_ms", help="metric used by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare, args.threshold, args.metric)
+    services = args.services or ["face", "voice"]
+    unknown = set(services) - {"face", "voice", "preprocess", "upload", "monitor", "models", "identities"}
+    if unknown:
+        parser.error(f"unknown service(s): {', '.join(sorted(unknown))}")
+
+    if not args.media_cache:
+        from media_fetcher import MediaFetcher, set_media_fetcher
+        set_media_fetcher(MediaFetcher(cache_dir=None))
+
+    server = FixtureServer()
+    cases = {}
+    try:
+        if "face" in services:
+            cases.update(bench_face(server, args))
+        if "preprocess" in services:
+            cases.update(bench_preprocess(server, args))
+        if "upload" in services:
+            cases.update(bench_upload(server, args))
+        if "monitor" in services:
+            cases.update(bench_monitor(server, args))
+        if "models" in services:
+            cases.update(bench_models(server, args))
+        if "identities" in services:
+            cases.update(bench_identities(server, args))
+        if "voice" in services:
+            cases.update(bench_voice(server, args))
+    finally:
+        server.close()
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"environment": environment(), "cases": cases}, f, indent=2)
+        print(f"📝 Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
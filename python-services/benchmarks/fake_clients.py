@@ -0,0 +1,364 @@
+# python-services/benchmarks/fake_clients.py
+# Offline stand-ins for ChatGoogleGenerativeAI and GoogleSerperAPIWrapper
+#
+# Three modes, installed through agent_clients.override_clients():
+#   synthetic  schema-valid canned responses for every agent prompt
+#   record     wrap the real clients and save responses + latencies to a JSON file
+#   replay     serve recorded responses (optionally at recorded latency); unknown prompts
+#              fall back to synthetic responses and are counted as replay misses
+#
+# Latency specs: fixed:MS, uniform:LO:HI, normal:MEAN:SD, lognormal:MEDIAN_MS:SIGMA, or
+# recorded (replay only: each response waits as long as it took when recorded)
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from llm_gateway import normalize_prompt
+
+
+class Latency:
+    def __init__(self, spec: str = "fixed:0", seed: int = 0):
+        self.spec = spec
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        if kind not in ("fixed", "uniform", "normal", "lognormal", "recorded"):
+            raise ValueError(f"unknown latency distribution: {spec}")
+
+    def sample(self, recorded_ms: float = 0.0) -> float:
+        """Seconds; `recorded_ms` is used as-is for the recorded distribution"""
+        with self._lock:
+            if self.kind == "recorded":
+                ms = recorded_ms
+            elif self.kind == "fixed":
+                ms = self.params[0]
+            elif self.kind == "uniform":
+                ms = self._random.uniform(self.params[0], self.params[1])
+            elif self.kind == "normal":
+                ms = self._random.gauss(self.params[0], self.params[1])
+            else:
+                ms = self._random.lognormvariate(math.log(max(self.params[0], 1e-3)), self.params[1])
+        return max(ms, 0.0) / 1000
+
+
+class CallStats:
+    """Upstream calls made through the fakes, for per-run accounting"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.replay_misses = 0
+
+    def add(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.seconds[kind] = self.seconds.get(kind, 0.0) + seconds
+
+    def miss(self) -> None:
+        with self._lock:
+            self.replay_misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": dict(self.counts),
+                    "simulated_seconds": {k: round(v, 3) for k, v in self.seconds.items()},
+                    "replay_misses": self.replay_misses}
+
+
+def prompt_key(messages: List[Any], tools: Optional[List[str]] = None) -> str:
+    text = "\n".join(f"{getattr(m, 'type', 'human')}:{normalize_prompt(getattr(m, 'content', m))}" for m in messages)
+    return hashlib.sha256(f"{tools or ''}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+# --- SYNTHETIC RESPONSES ---
+def _seed(text: str) -> int:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def synthetic_content(messages: List[Any]) -> str:
+    """A schema-valid answer for whichever agent prompt this is"""
+    text = "\n".join(str(getattr(m, "content", m)) for m in messages)
+    n = _seed(text) % 1000
+
+    if "precision resume analyzer" in text:
+        return json.dumps({
+            "core_skills": ["Python", "FastAPI", "SQL", "Docker", "AWS"],
+            "all_skills": ["Python", "FastAPI", "SQL", "Docker", "AWS", "Redis", "Git", "Linux", "React"],
+            "experience_level": "Mid-Level",
+            "job_titles": ["Backend Engineer", "Python Developer"],
+            "industry_preference": "Technology",
+            "preferred_roles": ["Backend Engineer", "Python Developer", "Platform Engineer"],
+        })
+    if "precision job data extractor" in text:
+        return json.dumps([{
+            "title": f"Backend Engineer {i}", "company": f"Company {n}-{i}", "location": "Bengaluru",
+            "salary": "₹12L - ₹20L PA", "description": "Build and operate Python APIs on AWS with a small team.",
+            "apply_link": f"https://jobs.example.com/{n}/{i}", "match_score": "High",
+            "key_requirements": ["Python", "SQL"], "matching_skills": ["Python", "FastAPI"],
+        } for i in range(8)], ensure_ascii=False)
+    if "Design a professional learning path" in text:
+        return json.dumps([
+            {"phase_title": f"Phase {i + 1}: Stage {i + 1}", "topics": [f"Topic {i}.{j}" for j in range(3)]}
+            for i in range(5)
+        ])
+    if "Expand ONE phase" in text:
+        return json.dumps({
+            "title": f"Phase {n}", "duration": "2 Weeks",
+            "steps": [{
+                "title": f"Concept {j}", "details": "Technical explanation of the concept and how to practise it.",
+                "resources": [{"title": "Official Docs", "url": f"https://docs.example.com/{n}/{j}", "type": "doc"}],
+            } for j in range(4)],
+        })
+    if "Course Curriculum Designer" in text:
+        return json.dumps({
+            "course_title": f"Mastering Topic {n}", "description": "A practical course.",
+            "lessons": [{"title": f"Lesson {i + 1}", "search_query": f"topic {n} lesson {i + 1} tutorial",
+                         "description": "What this lesson covers."} for i in range(8)],
+        })
+    if "Hackathon Agent" in text:
+        return json.dumps([{
+            "title": f"Hack {n}-{i}", "date": "2099-01-0{}".format(i + 1), "location": "Online",
+            "link": f"https://devpost.example.com/{n}/{i}", "match_reason": "Matches your Python skills",
+            "tags": ["AI", "Hiring"], "match_score": 90 - i,
+        } for i in range(5)])
+    return "{}"
+
+
+def synthetic_search(query: str) -> Dict[str, Any]:
+    n = _seed(query) % 1000
+    results = {"organic": [{
+        "title": f"Result {i} for {query[:40]} - LinkedIn",
+        "link": f"https://www.linkedin.com/jobs/view/{n}{i}",
+        "snippet": "Hiring now. Apply today for this role with competitive pay and benefits.",
+    } for i in range(10)]}
+    if "youtube" in query:
+        results["videos"] = [{
+            "title": f"Video {i} for {query[:40]}", "link": f"https://www.youtube.com/watch?v={n:04d}{i}",
+            "snippet": "Tutorial", "imageUrl": f"https://i.ytimg.com/vi/{n}{i}/hqdefault.jpg",
+        } for i in range(2)]
+    return results
+
+
+def _search_text(results: Dict[str, Any]) -> str:
+    return "\n".join(f"{item['title']}: {item['snippet']} {item['link']}" for item in results.get("organic", []))
+
+
+# --- RECORDINGS ---
+class Recording:
+    """prompt/query key -> recorded response, persisted as JSON"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.entries[key] = entry
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+
+
+# --- FAKE CHAT MODEL ---
+class FakeChatModel:
+    """Duck-typed chat model covering what the agents and LLMGateway call"""
+
+    def __init__(self, model: str, temperature: float, latency: Latency, stats: CallStats,
+                 recording: Optional[Recording] = None, tools: Optional[List[Any]] = None):
+        self.model = model
+        self.temperature = temperature
+        self.latency = latency
+        self.stats = stats
+        self.recording = recording
+        self.tools = tools or []
+
+    def bind_tools(self, tools):
+        return FakeChatModel(self.model, self.temperature, self.latency, self.stats, self.recording, list(tools))
+
+    def _respond(self, messages) -> tuple:
+        """(AIMessage, simulated seconds)"""
+        tool_names = [tool.name for tool in self.tools] or None
+        if self.recording is not None:
+            entry = self.recording.get(prompt_key(messages, tool_names))
+            if entry is not None:
+                message = AIMessage(content=entry["content"], tool_calls=entry.get("tool_calls") or [])
+                return message, self.latency.sample(entry.get("latency_ms", 0))
+            self.stats.miss()
+
+        if self.tools:
+            prompt = str(getattr(messages[-1], "content", ""))
+            tool = next((t for t in self.tools if "company" in t.name), self.tools[0]) \
+                if "compan" in prompt.lower() else self.tools[0]
+            message = AIMessage(content="", tool_calls=[{
+                "name": tool.name, "args": {"query": " ".join(prompt.split())[:80]},
+                "id": f"call_{_seed(prompt)}", "type": "tool_call",
+            }])
+        else:
+            message = AIMessage(content=synthetic_content(messages))
+        return message, self.latency.sample()
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        message, delay = self._respond(messages)
+        await asyncio.sleep(delay)
+        self.stats.add("llm", delay)
+        return message
+
+    def invoke(self, messages, *args, **kwargs):
+        message, delay = self._respond(messages)
+        time.sleep(delay)
+        self.stats.add("llm", delay)
+        return message
+
+    async def astream(self, messages, *args, **kwargs):
+        """Half the latency before the first token, the rest spread over ~20 chunks"""
+        message, delay = self._respond(messages)
+        content = message.content
+        pieces = max(1, min(20, len(content)))
+        size = math.ceil(len(content) / pieces) if content else 1
+        await asyncio.sleep(delay / 2)
+        for start in range(0, max(len(content), 1), size):
+            await asyncio.sleep(delay / 2 / pieces)
+            yield AIMessageChunk(content=content[start:start + size])
+        self.stats.add("llm", delay)
+
+
+# --- FAKE SEARCH ---
+class FakeSerper:
+    """Duck-typed GoogleSerperAPIWrapper (results / run / arun)"""
+
+    def __init__(self, latency: Latency, stats: CallStats, recording: Optional[Recording] = None):
+        self.latency = latency
+        self.stats = stats
+        self.recording = recording
+
+    def _results(self, query: str) -> tuple:
+        if self.recording is not None:
+            entry = self.recording.get(prompt_key([query], ["serper"]))
+            if entry is not None:
+                return entry["results"], self.latency.sample(entry.get("latency_ms", 0))
+            self.stats.miss()
+        return synthetic_search(query), self.latency.sample()
+
+    def results(self, query: str) -> Dict[str, Any]:
+        results, delay = self._results(query)
+        time.sleep(delay)
+        self.stats.add("search", delay)
+        return results
+
+    def run(self, query: str) -> str:
+        return _search_text(self.results(query))
+
+    async def aresults(self, query: str) -> Dict[str, Any]:
+        results, delay = self._results(query)
+        await asyncio.sleep(delay)
+        self.stats.add("search", delay)
+        return results
+
+    async def arun(self, query: str) -> str:
+        return _search_text(await self.aresults(query))
+
+
+# --- RECORDING WRAPPERS (live clients) ---
+class RecordingChatModel:
+    def __init__(self, llm, recording: Recording, tools: Optional[List[Any]] = None):
+        self.llm = llm
+        self.recording = recording
+        self.tools = tools
+        self.model = getattr(llm, "model", "recorded")
+        self.temperature = getattr(llm, "temperature", None)
+
+    def bind_tools(self, tools):
+        return RecordingChatModel(self.llm.bind_tools(tools), self.recording, list(tools))
+
+    def _save(self, messages, message, started: float) -> None:
+        self.recording.put(prompt_key(messages, [t.name for t in self.tools] if self.tools else None), {
+            "content": message.content if isinstance(message.content, str) else "",
+            "tool_calls": getattr(message, "tool_calls", None) or [],
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        started = time.perf_counter()
+        message = await self.llm.ainvoke(messages, *args, **kwargs)
+        self._save(messages, message, started)
+        return message
+
+    def invoke(self, messages, *args, **kwargs):
+        started = time.perf_counter()
+        message = self.llm.invoke(messages, *args, **kwargs)
+        self._save(messages, message, started)
+        return message
+
+    async def astream(self, messages, *args, **kwargs):
+        started = time.perf_counter()
+        chunks = []
+        async for chunk in self.llm.astream(messages, *args, **kwargs):
+            chunks.append(chunk.content if isinstance(chunk.content, str) else "")
+            yield chunk
+        self._save(messages, AIMessage(content="".join(chunks)), started)
+
+
+class RecordingSerper:
+    def __init__(self, serper, recording: Recording):
+        self.serper = serper
+        self.recording = recording
+
+    def results(self, query: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        results = self.serper.results(query)
+        self.recording.put(prompt_key([query], ["serper"]), {
+            "results": results, "latency_ms": round((time.perf_counter() - started) * 1000, 1)})
+        return results
+
+    def run(self, query: str) -> str:
+        return _search_text(self.results(query))
+
+    async def arun(self, query: str) -> str:
+        return await asyncio.to_thread(self.run, query)
+
+
+def install(mode: str, llm_latency: str, search_latency: str, recording_path: Optional[str] = None,
+            seed: int = 0) -> Dict[str, Any]:
+    """Install clients for `mode` through agent_clients; returns {"stats", "recording"}"""
+    import agent_clients
+
+    stats = CallStats()
+    recording = Recording(recording_path) if mode in ("record", "replay") else None
+
+    if mode == "record":
+        agent_clients.override_clients(
+            llm_factory=lambda model, temperature: RecordingChatModel(
+                agent_clients._default_llm(model, temperature), recording),
+            serper_factory=lambda: RecordingSerper(agent_clients._default_serper(), recording),
+        )
+    else:
+        llm = Latency(llm_latency, seed)
+        search = Latency(search_latency, seed + 1)
+        agent_clients.override_clients(
+            llm_factory=lambda model, temperature: FakeChatModel(model, temperature, llm, stats, recording),
+            serper_factory=lambda: FakeSerper(search, stats, recording),
+        )
+    return {"stats": stats, "recording": recording}
@@ -0,0 +1,126 @@
+# python-services/benchmarks/startup_profile.py
+# Cold-start report for the LangGraph agent services (-X importtime + wall clock)
+#
+#   python benchmarks/startup_profile.py                  # report for all four services
+#   python benchmarks/startup_profile.py --budget 3.0     # exit 1 if any import exceeds 3s
+#   python benchmarks/startup_profile.py --json out.json  # machine-readable results
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> lazily built graph getter
+SERVICES = {
+    "job_matcher_service": "get_job_graph",
+    "roadmap": "get_roadmap_graph",
+    "course": "get_course_graph",
+    "hackathon_agent": "get_app_graph",
+}
+
+DEFAULT_BUDGET = float(os.getenv("AGENT_IMPORT_BUDGET_SECONDS", "3.0"))
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import {module} as service
+imported = time.perf_counter()
+service.{getter}()
+built = time.perf_counter()
+print("STARTUP_PROFILE " + json.dumps({{"import_s": imported - started, "graph_build_s": built - imported}}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """Return [(cumulative_us, self_us, depth, name)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, raw_name = parts
+        name = raw_name[1:]  # drop the separator space; the rest is 2 spaces per nesting level
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        try:
+            rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def profile_service(module: str, getter: str, top: int):
+    env = os.environ.copy()
+    # Services refuse to import without keys; no request is made during profiling
+    env.setdefault("GOOGLE_API_KEY", "startup-profile-placeholder")
+    env.setdefault("SERPER_API_KEY", "startup-profile-placeholder")
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, getter=getter)],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True
+    )
+    process_s = time.perf_counter() - started
+
+    result = {"module": module, "process_s": round(process_s, 3), "ok": proc.returncode == 0}
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_PROFILE "):
+            timings = json.loads(line[len("STARTUP_PROFILE "):])
+            result.update({key: round(value, 3) for key, value in timings.items()})
+    if proc.returncode != 0:
+        result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+
+    rows = parse_importtime(proc.stderr)
+    top_level = sorted((r for r in rows if r[2] == 0), reverse=True)[:top]
+    result["heaviest_imports"] = [
+        {"module": name, "cumulative_ms": round(cum / 1000, 1), "self_ms": round(self_us / 1000, 1)}
+        for cum, self_us, _, name in top_level
+    ]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start report for the agent services")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="maximum seconds allowed for importing one service module")
+    parser.add_argument("--top", type=int, default=10, help="heaviest top-level imports to list")
+    parser.add_argument("--json", metavar="PATH", help="write results to this file")
+    parser.add_argument("services", nargs="*", default=list(SERVICES), help="modules to profile")
+    args = parser.parse_args()
+
+    results = []
+    over_budget = []
+    for module in args.services:
+        result = profile_service(module, SERVICES[module], args.top)
+        results.append(result)
+
+        print(f"\n📦 {module}")
+        if not result["ok"]:
+            print(f"   ❌ failed to start: {result.get('error')}")
+            over_budget.append(module)
+            continue
+        print(f"   import: {result['import_s']:.3f}s | first graph build: {result['graph_build_s']:.3f}s"
+              f" | process total: {result['process_s']:.3f}s (budget {args.budget:.1f}s)")
+        for item in result["heaviest_imports"]:
+            print(f"   {item['cumulative_ms']:>9.1f} ms  {item['module']}")
+        if result["import_s"] > args.budget:
+            over_budget.append(module)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"budget_s": args.budget, "results": results}, f, indent=2)
+
+    if over_budget:
+        print(f"\n❌ Over import budget: {', '.join(over_budget)}")
+        return 1
+    print(f"\n✅ All services import within {args.budget:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+# python-services/catalog.py
+# Precomputed roadmap/course catalog with stale-while-revalidate serving and off-peak warming
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import QUEUE_DEPTH, record_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(BASE_DIR, ".cache", "catalog.sqlite3"))
+CATALOG_FRESH_SECONDS = int(os.getenv("CATALOG_FRESH_SECONDS", str(3 * 24 * 3600)))
+CATALOG_WARM_TOP_N = int(os.getenv("CATALOG_WARM_TOP_N", "200"))
+CATALOG_WARM_CONCURRENCY = int(os.getenv("CATALOG_WARM_CONCURRENCY", "2"))
+CATALOG_WARM_INTERVAL = int(os.getenv("CATALOG_WARM_INTERVAL", "900"))
+CATALOG_OFFPEAK_HOURS = os.getenv("CATALOG_OFFPEAK_HOURS", "1-6")  # local hours, inclusive
+
+# Generators set payload["degraded"] when any part of it is fallback output
+Generator = Callable[[str, str], Awaitable[Optional[Dict]]]
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation"""
+    topic = re.sub(r"\s+", " ", str(topic)).strip().casefold()
+    return topic.strip(" .,!?:;\"'")
+
+
+def _parse_hours(spec: str) -> Tuple[int, int]:
+    try:
+        start, end = (int(part) for part in spec.split("-", 1))
+        return start % 24, end % 24
+    except ValueError:
+        return 1, 6
+
+
+def in_offpeak_window(now: Optional[datetime] = None, spec: str = CATALOG_OFFPEAK_HOURS) -> bool:
+    hour = (now or datetime.now()).hour
+    start, end = _parse_hours(spec)
+    if start <= end:
+        return start <= hour <= end
+    return hour >= start or hour <= end  # window wraps midnight, e.g. "22-5"
+
+
+class CatalogStore:
+    """SQLite-backed catalog keyed by (kind, normalized topic, difficulty)"""
+
+    def __init__(self, path: str = CATALOG_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS catalog ("
+            "kind TEXT, topic_key TEXT, difficulty TEXT, topic TEXT, payload TEXT, "
+            "generated_at REAL, request_count INTEGER DEFAULT 0, last_requested REAL, "
+            "PRIMARY KEY (kind, topic_key, difficulty))"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def record_request(self, kind: str, topic: str, difficulty: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO catalog (kind, topic_key, difficulty, topic, request_count, last_requested) "
+                "VALUES (?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT(kind, topic_key, difficulty) DO UPDATE SET "
+                "request_count = request_count + 1, last_requested = excluded.last_requested",
+                (kind, normalize_topic(topic), difficulty, topic, now),
+            )
+            self._db.commit()
+
+    def get(self, kind: str, topic: str, difficulty: str) -> Optional[Tuple[Dict, float]]:
+        """Return (payload, age_seconds) or None when nothing has been generated yet"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, generated_at FROM catalog "
+                "WHERE kind = ? AND topic_key = ? AND difficulty = ? AND payload IS NOT NULL",
+                (kind, normalize_topic(topic), difficulty),
+            ).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, kind: str, topic: str, difficulty: str, payload: Dict, stale: bool = False) -> None:
+        """Store a payload; `stale` entries are served but regenerated on their next request"""
+        generated_at = 0.0 if stale else time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO catalog (kind, topic_key, difficulty, topic, payload, generated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(kind, topic_key, difficulty) DO UPDATE SET "
+                "payload = excluded.payload, generated_at = excluded.generated_at",
+                (kind, normalize_topic(topic), difficulty, topic, json.dumps(payload), generated_at),
+            )
+            self._db.commit()
+
+    def top_topics(self, kind: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT topic, difficulty, generated_at, request_count FROM catalog "
+                "WHERE kind = ? ORDER BY request_count DESC LIMIT ?",
+                (kind, limit),
+            ).fetchall()
+        return [
+            {"topic": topic, "difficulty": difficulty, "generated_at": generated_at, "requests": count}
+            for topic, difficulty, generated_at, count in rows
+        ]
+
+
+class Catalog:
+    """Serves one kind of generated content (roadmap, course) from the catalog store"""
+
+    def __init__(self, kind: str, generator: Generator, store: Optional[CatalogStore] = None,
+                 fresh_seconds: int = CATALOG_FRESH_SECONDS):
+        self.kind = kind
+        self.generator = generator
+        self.store = store or get_catalog_store()
+        self.fresh_seconds = fresh_seconds
+        self._refreshing: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._warmer: Optional[asyncio.Task] = None
+        QUEUE_DEPTH.set_function(lambda: len(self._refreshing), queue=f"catalog_{kind}_refresh")
+
+    async def serve(self, topic: str, difficulty: str) -> Tuple[Optional[Dict], str]:
+        """Return (payload, status) where status is "hit", "stale" or "miss" """
+        self.store.record_request(self.kind, topic, difficulty)
+        entry = self.store.get(self.kind, topic, difficulty)
+        if entry is not None:
+            payload, age = entry
+            if age <= self.fresh_seconds:
+                record_cache(f"catalog_{self.kind}", "hit")
+                return payload, "hit"
+            record_cache(f"catalog_{self.kind}", "stale")
+            self.refresh_in_background(topic, difficulty)
+            return payload, "stale"
+
+        record_cache(f"catalog_{self.kind}", "miss")
+        # Concurrent misses for one topic share a single generation
+        key = (normalize_topic(topic), difficulty)
+        task = self._refreshing.get(key)
+        if task is None or task.done():
+            task = self._track(key, asyncio.create_task(self.refresh(topic, difficulty)))
+        payload = await asyncio.shield(task)
+        return payload, "miss"
+
+    async def refresh(self, topic: str, difficulty: str) -> Optional[Dict]:
+        payload = await self.generator(topic, difficulty)
+        if not payload:
+            return payload
+        if payload.get("degraded"):
+            # Keep whatever is already stored; a first entry is stored stale so it gets retried
+            print(f"⚠️ Generated {self.kind} for {topic} is degraded, not caching it as fresh")
+            if self.store.get(self.kind, topic, difficulty) is None:
+                self.store.put(self.kind, topic, difficulty, payload, stale=True)
+        else:
+            self.store.put(self.kind, topic, difficulty, payload)
+        return payload
+
+    def refresh_in_background(self, topic: str, difficulty: str) -> None:
+        key = (normalize_topic(topic), difficulty)
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return
+        print(f"♻️ Refreshing stale {self.kind} in background: {topic} ({difficulty})")
+        self._track(key, asyncio.create_task(self._safe_refresh(topic, difficulty)))
+
+    def _track(self, key: Tuple[str, str], task: asyncio.Task) -> asyncio.Task:
+        """Register the in-flight generation for key until it finishes"""
+        self._refreshing[key] = task
+
+        def done(finished: asyncio.Task) -> None:
+            if self._refreshing.get(key) is finished:
+                del self._refreshing[key]
+            if not finished.cancelled():
+                finished.exception()  # retrieved even when every waiter went away
+
+        task.add_done_callback(done)
+        return task
+
+    async def _safe_refresh(self, topic: str, difficulty: str) -> None:
+        try:
+            await self.refresh(topic, difficulty)
+        except Exception as e:
+            print(f"❌ Catalog refresh failed for {topic}: {e}")
+
+    # --- Background warmer ---
+    async def warm_once(self, top_n: int = CATALOG_WARM_TOP_N,
+                        concurrency: int = CATALOG_WARM_CONCURRENCY) -> int:
+        """Regenerate stale or missing entries among the top-N requested topics"""
+        candidates = [
+            item for item in self.store.top_topics(self.kind, top_n)
+            if not item["generated_at"] or time.time() - item["generated_at"] > self.fresh_seconds
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(item):
+            async with semaphore:
+                await self._safe_refresh(item["topic"], item["difficulty"])
+
+        await asyncio.gather(*(warm(item) for item in candidates))
+        if candidates:
+            print(f"🔥 Warmed {len(candidates)} {self.kind} catalog entries")
+        return len(candidates)
+
+    async def _warm_loop(self, interval: int) -> None:
+        while True:
+            try:
+                if in_offpeak_window():
+                    await self.warm_once()
+            except Exception as e:
+                print(f"❌ Catalog warmer error: {e}")
+            await asyncio.sleep(interval)
+
+    def start_warmer(self, interval: int = CATALOG_WARM_INTERVAL) -> None:
+        if self._warmer is None or self._warmer.done():
+            self._warmer = asyncio.create_task(self._warm_loop(interval))
+
+    def stop_warmer(self) -> None:
+        if self._warmer is not None:
+            self._warmer.cancel()
+            self._warmer = None
+
+
+_store: Optional[CatalogStore] = None
+_store_lock = threading.Lock()
+
+
+def get_catalog_store() -> CatalogStore:
+    """Process-wide catalog store shared by the roadmap and course catalogs"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CatalogStore()
+        return _store
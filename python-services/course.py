@@ -2,15 +2,18 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Any, Annotated, TypedDict
-from langgraph.graph import StateGraph, START, END
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_core.tools import Tool
 import os
 import json
 import uvicorn
 from dotenv import load_dotenv
+from llm_gateway import LLMGateway
+from agent_clients import get_gateway, get_serper
+from json_utils import parse_complete_json, parse_llm_json
+from catalog import Catalog
+from structured_logging import configure_logging, install_request_id_fastapi
+from metrics import instrument_fastapi, instrument_node, observe_upstream
 
 # Load env variables
 load_dotenv()
@@ -30,16 +33,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_fastapi(app, "course")
+install_request_id_fastapi(app)
 
 # --- TOOLS ---
-serper = GoogleSerperAPIWrapper()
-
 def search_youtube_tool(query: str) -> str:
     """Searches specifically for YouTube videos using Google Serper."""
     print(f"🎥 Searching YouTube for: {query}")
     # We force site:youtube.com to ensure we get video links
     # and use 'videos' type if supported, or standard search with filtering
-    results = serper.results(f"{query} site:youtube.com")
+    with observe_upstream("serper", "course.youtube"):
+        results = get_serper().results(f"{query} site:youtube.com")
     
     video_data = []
     
@@ -71,11 +75,9 @@ youtube_tool = Tool(
 )
 
 # --- LLM ---
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite", # Using the requested model
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.2
-)
+# Created on first use (see agent_clients) to keep import time low
+def course_llm() -> LLMGateway:
+    return get_gateway("course", temperature=0.2)
 
 # --- STATE ---
 class CourseState(TypedDict):
@@ -87,6 +89,15 @@ class CourseState(TypedDict):
 
 # --- NODES ---
 
+def _syllabus_lessons(data) -> List[Dict]:
+    """Lessons that survived parsing intact (a truncated tail may cut the last one short)"""
+    if not isinstance(data, dict) or not isinstance(data.get("lessons"), list):
+        return []
+    return [
+        lesson for lesson in data["lessons"]
+        if isinstance(lesson, dict) and lesson.get("title") and lesson.get("search_query")
+    ]
+
 async def syllabus_designer_node(state: CourseState) -> Dict:
     """
     Step 1: Design the curriculum/syllabus based on the topic.
@@ -115,12 +126,25 @@ async def syllabus_designer_node(state: CourseState) -> Dict:
     }}
     """
     
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    response = await course_llm().ainvoke(
+        [HumanMessage(content=prompt)],
+        semantic_key=state['topic'],
+        semantic_scope=f"course.syllabus:{state['difficulty']}:{state['duration']}",
+        validate=lambda content: _syllabus_lessons(parse_complete_json(content, expect=dict))
+    )
     
     try:
-        content = response.content.replace("```json", "").replace("```", "").strip()
-        data = json.loads(content)
-        return {"syllabus": data["lessons"], "final_course": {"title": data["course_title"], "description": data["description"]}}
+        data = parse_llm_json(response.content, expect=dict)
+        lessons = _syllabus_lessons(data)
+        if not lessons:
+            raise ValueError("no complete lessons in syllabus response")
+        return {
+            "syllabus": lessons,
+            "final_course": {
+                "title": data.get("course_title") or f"Mastering {state['topic']}",
+                "description": data.get("description") or ""
+            }
+        }
     except Exception as e:
         print(f"Syllabus Generation Error: {e}")
         # Fallback syllabus
@@ -128,7 +152,7 @@ async def syllabus_designer_node(state: CourseState) -> Dict:
             "syllabus": [
                 {"title": f"Intro to {state['topic']}", "search_query": f"{state['topic']} introduction tutorial", "description": "Basics"}
             ],
-            "final_course": {"title": f"{state['topic']} Course", "description": "Generated Course"}
+            "final_course": {"title": f"{state['topic']} Course", "description": "Generated Course", "degraded": True}
         }
 
 async def video_curator_node(state: CourseState) -> Dict:
@@ -139,6 +163,7 @@ async def video_curator_node(state: CourseState) -> Dict:
     
     syllabus = state["syllabus"]
     completed_lessons = []
+    missing_videos = 0
     
     # We process sequentially to avoid rate limits, or we could parallelize
     for lesson in syllabus:
@@ -153,6 +178,7 @@ async def video_curator_node(state: CourseState) -> Dict:
             selected_video = videos[0] # Take top result
         else:
             # Fallback if search fails
+            missing_videos += 1
             selected_video = {
                 "title": lesson["title"], 
                 "link": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", # Fallback
@@ -161,7 +187,7 @@ async def video_curator_node(state: CourseState) -> Dict:
             
         completed_lessons.append({
             "title": lesson["title"],
-            "description": lesson["description"],
+            "description": lesson.get("description", ""),
             "videoUrl": selected_video["link"],
             "thumbnail": selected_video.get("thumbnail", ""),
             "duration": "15 min" # Placeholder, hard to get exact without YouTube Data API
@@ -172,46 +198,84 @@ async def video_curator_node(state: CourseState) -> Dict:
     final_course["lessons"] = completed_lessons
     final_course["total_lessons"] = len(completed_lessons)
     final_course["difficulty"] = state["difficulty"]
+    final_course["degraded"] = bool(final_course.get("degraded") or missing_videos)
     
     return {"final_course": final_course}
 
 # --- GRAPH ---
-builder = StateGraph(CourseState)
+_course_graph = None
+
+def get_course_graph():
+    """Compile the graph on first use so langgraph stays out of import time"""
+    global _course_graph
+    if _course_graph is None:
+        from langgraph.graph import StateGraph, START, END
+        builder = StateGraph(CourseState)
 
-builder.add_node("designer", syllabus_designer_node)
-builder.add_node("curator", video_curator_node)
+        builder.add_node("designer", instrument_node("course", "designer", syllabus_designer_node))
+        builder.add_node("curator", instrument_node("course", "curator", video_curator_node))
 
-builder.add_edge(START, "designer")
-builder.add_edge("designer", "curator")
-builder.add_edge("curator", END)
+        builder.add_edge(START, "designer")
+        builder.add_edge("designer", "curator")
+        builder.add_edge("curator", END)
 
-course_graph = builder.compile()
+        _course_graph = builder.compile()
+    return _course_graph
 
 # --- API ENDPOINT ---
 
+# Catalog entries are keyed by difficulty; non-default durations bypass the catalog
+DEFAULT_DURATION = "2 Hours"
+
 class GenerateRequest(BaseModel):
     topic: str
     difficulty: str = "Beginner"
-    duration: str = "2 Hours"
+    duration: str = DEFAULT_DURATION
+
+async def build_course(topic: str, difficulty: str, duration: str = DEFAULT_DURATION) -> Dict:
+    initial_state = {
+        "topic": topic,
+        "difficulty": difficulty,
+        "duration": duration,
+        "syllabus": [],
+        "final_course": {}
+    }
+    result = await get_course_graph().ainvoke(initial_state)
+    return result["final_course"]
+
+course_catalog = Catalog("course", build_course)
+
+@app.on_event("startup")
+async def start_catalog_warmer():
+    course_catalog.start_warmer()
+
+@app.on_event("shutdown")
+async def stop_catalog_warmer():
+    course_catalog.stop_warmer()
 
 @app.post("/generate-course")
 async def generate_course_endpoint(req: GenerateRequest):
     try:
-        initial_state = {
-            "topic": req.topic,
-            "difficulty": req.difficulty,
-            "duration": req.duration,
-            "syllabus": [],
-            "final_course": {}
-        }
-        
-        result = await course_graph.ainvoke(initial_state)
-        return {"success": True, "course": result["final_course"]}
+        if req.duration != DEFAULT_DURATION:
+            course = await build_course(req.topic, req.difficulty, req.duration)
+            return {"success": True, "course": course}
+
+        course, status = await course_catalog.serve(req.topic, req.difficulty)
+        return {"success": True, "course": course or {}, "catalog": status}
         
     except Exception as e:
         print(f"❌ Error: {e}")
         return {"success": False, "error": str(e)}
 
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "course"}
+
+@app.get("/catalog/top")
+async def catalog_top(limit: int = 20):
+    return {"success": True, "topics": course_catalog.store.top_topics("course", limit)}
+
 if __name__ == "__main__":
+    configure_logging("course")
     print("🚀 Course Generator running on port 8005")
     uvicorn.run(app, host="0.0.0.0", port=8005)
\ No newline at end of file
@@ -1,160 +1,336 @@
 # python-services/face_service_fixed.py
 # FIXED Face Verification Service - Fast detection with proper face matching
 
-from flask import Flask, request, jsonify
+from flask import Flask, jsonify
 from flask_cors import CORS
 import cv2
 import numpy as np
 import base64
-import requests
 from io import BytesIO
 from PIL import Image
 import logging
 import tempfile
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import MODEL_INFERENCE, QUEUE_DEPTH, instrument_flask
+from profiling import install_profiling_flask, run_parallel, stage
+from structured_logging import configure_logging, hot_path_logger, install_request_id_flask
+from uploads import install_binary_uploads, media_size, read_verify_upload
+from identity_index import IdentityIndexRegistry
+from media_fetcher import get_media_fetcher
+from sessions import SessionStore
 
 # Try to import InsightFace for better face detection
 try:
     import insightface
+    from insightface.app.common import Face
     INSIGHTFACE_AVAILABLE = True
     logging.getLogger().info("✅ InsightFace successfully imported!")
 except ImportError as e:
     INSIGHTFACE_AVAILABLE = False
     logging.getLogger().warning(f"⚠️ InsightFace not available: {e}")
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging; per-request detail goes through the sampled hot-path logger
+configure_logging("face")
 logger = logging.getLogger(__name__)
+hot_log = hot_path_logger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+instrument_flask(app, "face")
+install_request_id_flask(app)
+install_profiling_flask(app, "face")
+install_binary_uploads(app)
+
+# --- INSIGHTFACE RUNTIME ---
+# The default pack also ships 2D/3D landmark and gender/age models the service never uses
+FACE_MODEL_PACK = os.getenv("FACE_MODEL_PACK", "buffalo_l")
+FACE_MODULES = os.getenv("FACE_MODULES", "detection,recognition")  # or "all"
+FACE_DET_SIZE = int(os.getenv("FACE_DET_SIZE", "640"))
+FACE_ADAPTIVE_DET_SIZE = os.getenv("FACE_ADAPTIVE_DET_SIZE", "1") == "1"
+# ONNX Runtime session options; unset = onnxruntime defaults
+FACE_ORT_INTRA_OP_THREADS = int(os.getenv("FACE_ORT_INTRA_OP_THREADS", "0"))
+FACE_ORT_INTER_OP_THREADS = int(os.getenv("FACE_ORT_INTER_OP_THREADS", "0"))
+FACE_ORT_GRAPH_OPTIMIZATION = os.getenv("FACE_ORT_GRAPH_OPTIMIZATION", "all")  # disable | basic | extended | all
+FACE_ORT_EXECUTION_MODE = os.getenv("FACE_ORT_EXECUTION_MODE", "sequential")  # or parallel
+
+def ort_session_options():
+    """onnxruntime.SessionOptions from the FACE_ORT_* settings"""
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = FACE_ORT_INTRA_OP_THREADS
+    options.inter_op_num_threads = FACE_ORT_INTER_OP_THREADS
+    options.graph_optimization_level = {
+        'disable': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    }.get(FACE_ORT_GRAPH_OPTIMIZATION.lower(), onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL)
+    options.execution_mode = (onnxruntime.ExecutionMode.ORT_PARALLEL if FACE_ORT_EXECUTION_MODE.lower() == 'parallel'
+                              else onnxruntime.ExecutionMode.ORT_SEQUENTIAL)
+    return options
+
+def load_face_analysis():
+    """FaceAnalysis with only FACE_MODULES loaded and every ONNX session built with ort_session_options()"""
+    from insightface.model_zoo import model_zoo
+    allowed_modules = None if FACE_MODULES.strip().lower() == 'all' else [
+        name.strip() for name in FACE_MODULES.split(',') if name.strip()]
+    options = ort_session_options()
+    
+    # FaceAnalysis has no session-options argument; inject them into the sessions it creates
+    base_session = model_zoo.PickableInferenceSession
+    
+    class TunedInferenceSession(base_session):
+        def __init__(self, model_path, **kwargs):
+            kwargs.setdefault('sess_options', options)
+            super().__init__(model_path, **kwargs)
+    
+    model_zoo.PickableInferenceSession = TunedInferenceSession
+    try:
+        return insightface.app.FaceAnalysis(
+            name=FACE_MODEL_PACK,
+            allowed_modules=allowed_modules,
+            providers=['CPUExecutionProvider']  # Use CPU for compatibility
+        )
+    finally:
+        model_zoo.PickableInferenceSession = base_session
+
+def rss_mb():
+    """Current resident set size in MB, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# --- CONCURRENT VERIFICATION ---
+# /verify runs the stored path (download, decode, detect, embed) on a worker while the
+# request thread handles the test image. Downloads, JPEG decoding, OpenCV resizing and
+# onnxruntime inference all release the GIL, so the two paths genuinely overlap.
+VERIFY_PARALLEL = os.getenv("FACE_VERIFY_PARALLEL", "1") == "1"
+VERIFY_WORKERS = int(os.getenv("FACE_VERIFY_WORKERS", "8"))
+verify_pool = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix="face-verify") if VERIFY_PARALLEL else None
+
+# --- INTERVIEW MONITORING ---
+# Between recognition passes a frame costs one detector run; the embedding is recomputed
+# when the track breaks, a second face appears, or the periodic refresh is due.
+MONITOR_IOU_THRESHOLD = float(os.getenv("MONITOR_IOU_THRESHOLD", "0.5"))
+MONITOR_EMBED_EVERY_FRAMES = int(os.getenv("MONITOR_EMBED_EVERY_FRAMES", "15"))
+MONITOR_EMBED_EVERY_SECONDS = float(os.getenv("MONITOR_EMBED_EVERY_SECONDS", "10"))
+MONITOR_SESSION_TTL = float(os.getenv("MONITOR_SESSION_TTL", "900"))
+MONITOR_MAX_SESSIONS = int(os.getenv("MONITOR_MAX_SESSIONS", "1000"))
+
+# /analyze frame-quality flags (blur = Laplacian variance, brightness = mean gray 0-255,
+# motion = mean absolute difference of 64x48 thumbnails, 0-1)
+ANALYZE_BLUR_MIN = float(os.getenv("ANALYZE_BLUR_MIN", "60"))
+ANALYZE_BRIGHTNESS_RANGE = tuple(float(v) for v in os.getenv("ANALYZE_BRIGHTNESS_RANGE", "40,220").split(","))
+ANALYZE_MOTION_MIN = float(os.getenv("ANALYZE_MOTION_MIN", "0.002"))
+
+def bbox_iou(a, b):
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return float(intersection / union) if union > 0 else 0.0
+
+class MonitorSession:
+    """Face track and last identity score for one monitored candidate"""
+    
+    def __init__(self, stored_image_url, reference_embedding):
+        self.stored_image_url = stored_image_url
+        self.reference_embedding = reference_embedding
+        self.lock = threading.Lock()
+        self.bbox = None  # last tracked box, source pixels; None = no track
+        self.similarity = None
+        self.frames = 0
+        self.frames_since_embed = 0
+        self.last_embed_at = 0.0
+        self.previous_thumbnail = None  # /analyze motion reference
 
 class FastFaceVerification:
     def __init__(self):
         # FIXED: Optimized thresholds for better accuracy and speed
         self.face_threshold = 0.6  # Reasonable threshold
         self.high_confidence_threshold = 0.7
-        self.min_face_size = 50  # Minimum face size in pixels
-        self.max_image_size = 1024  # Resize large images for speed
+        self.min_face_size = 50  # Minimum face size in source-image pixels
+        self.det_size = (FACE_DET_SIZE, FACE_DET_SIZE)  # Largest InsightFace detector input
+        self.adaptive_det_size = False  # Set once the detector is known to accept any input size
+        self.max_image_size = max(self.det_size)  # Decode/resize straight to detector resolution
         
-        # Initialize face detection models
+        # Face detection models are loaded by a background initializer
         self.insight_model = None
         self.cv2_cascade = None
-        
-        self._initialize_models()
+        self.ready_event = threading.Event()
+        self.init_error = None
+        self.init_seconds = None
+        self.model_rss_mb = None
         
         logger.info("👤 FastFaceVerification initialized")
         logger.info(f"📊 Face threshold: {self.face_threshold}")
 
+    def start_background_init(self):
+        """Load models and warm them up off the request path, in parallel with server startup"""
+        thread = threading.Thread(target=self._initialize_models, name="face-model-init", daemon=True)
+        thread.start()
+        return thread
+
     def _initialize_models(self):
-        """Initialize face detection models"""
+        """Initialize face detection models (InsightFace and the OpenCV cascade load in parallel)"""
+        started = time.perf_counter()
+        rss_before = rss_mb()
         try:
+            cascade_thread = threading.Thread(target=self._initialize_cascade, daemon=True)
+            cascade_thread.start()
+            
             # Initialize InsightFace (faster and more accurate)
             if INSIGHTFACE_AVAILABLE:
-                logger.info("🔄 Initializing InsightFace model...")
-                self.insight_model = insightface.app.FaceAnalysis(
-                    providers=['CPUExecutionProvider']  # Use CPU for compatibility
-                )
-                self.insight_model.prepare(ctx_id=0, det_size=(640, 640))
-                logger.info("✅ InsightFace model initialized successfully")
-            
-            # Initialize OpenCV cascade as fallback
-            logger.info("🔄 Initializing OpenCV cascade...")
-            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            if os.path.exists(cascade_path):
-                self.cv2_cascade = cv2.CascadeClassifier(cascade_path)
-                logger.info("✅ OpenCV cascade initialized successfully")
-            else:
-                logger.error("❌ OpenCV cascade file not found")
-                
+                logger.info(f"🔄 Initializing InsightFace {FACE_MODEL_PACK} ({FACE_MODULES})...")
+                self.insight_model = load_face_analysis()
+                self.insight_model.prepare(ctx_id=0, det_size=self.det_size)
+                # Dynamic-shape detectors (SCRFD in buffalo_*) can run at the frame's own size
+                input_shape = self.insight_model.det_model.session.get_inputs()[0].shape
+                self.adaptive_det_size = FACE_ADAPTIVE_DET_SIZE and not all(
+                    isinstance(dim, int) for dim in input_shape[2:])
+                logger.info(f"✅ InsightFace model initialized: {sorted(self.insight_model.models)}, "
+                            f"adaptive det size: {self.adaptive_det_size}")
+            
+            cascade_thread.join()
+            self._warm_up()
         except Exception as e:
+            self.init_error = str(e)
             logger.error(f"❌ Model initialization failed: {e}")
+        finally:
+            self.init_seconds = round(time.perf_counter() - started, 2)
+            rss_after = rss_mb()
+            if rss_before is not None and rss_after is not None:
+                self.model_rss_mb = round(rss_after - rss_before, 1)
+            self.ready_event.set()
+            logger.info(f"✅ Face models ready in {self.init_seconds}s (+{self.model_rss_mb}MB RSS)")
+
+    def _initialize_cascade(self):
+        # Initialize OpenCV cascade as fallback
+        logger.info("🔄 Initializing OpenCV cascade...")
+        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        if os.path.exists(cascade_path):
+            self.cv2_cascade = cv2.CascadeClassifier(cascade_path)
+            logger.info("✅ OpenCV cascade initialized successfully")
+        else:
+            logger.error("❌ OpenCV cascade file not found")
+
+    def _warm_up(self):
+        """Synthetic inference so ONNX session setup is not paid by the first candidate"""
+        blank = np.zeros((self.max_image_size, self.max_image_size, 3), dtype=np.uint8)
+        if self.insight_model:
+            self.run_detector(blank)
+            if self.adaptive_det_size:
+                self.run_detector(blank[:self.max_image_size * 3 // 4])  # 4:3 webcam frame shape
+            recognition = self.insight_model.models.get('recognition')
+            if recognition is not None:
+                recognition.get_feat(np.zeros((112, 112, 3), dtype=np.uint8))
+        if self.cv2_cascade is not None:
+            self.cv2_cascade.detectMultiScale(cv2.cvtColor(blank, cv2.COLOR_RGB2GRAY))
+        logger.info("🔥 Face models warmed up")
+
+    def wait_until_ready(self, timeout=None):
+        return self.ready_event.wait(timeout)
 
     def download_image_from_url(self, image_url):
         """Download image from Cloudinary URL"""
         try:
-            logger.info(f"📥 Downloading image from: {image_url}")
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            image_data = BytesIO(response.content)
-            logger.info(f"✅ Downloaded {len(response.content)} bytes")
+            hot_log.debug("📥 Downloading image from: %s", image_url)
+            # Pooled connection, size cap, and a disk cache revalidated with ETag / Last-Modified
+            image_data = get_media_fetcher().fetch(image_url, "download_image")
+            hot_log.debug("✅ Downloaded %d bytes", image_data.getbuffer().nbytes)
             return image_data
         except Exception as e:
             logger.error(f"❌ Failed to download image: {e}")
             raise
 
     def preprocess_image(self, image_data):
-        """Preprocess image for faster detection"""
+        """
+        Decode straight to detector resolution.
+
+        JPEGs are decoded by libjpeg at 1/2, 1/4 or 1/8 scale (draft mode), then a single
+        bilinear resize fits the longest side to the detector input, so InsightFace does
+        not resize again. Returns (RGB array, scale from array pixels to source pixels).
+        """
         try:
-            # Load image
-            if isinstance(image_data, (BytesIO, str)):
-                if isinstance(image_data, str):
-                    # Base64 string
-                    image_bytes = base64.b64decode(image_data.split(',')[1])
-                    image_data = BytesIO(image_bytes)
-                
+            if isinstance(image_data, str):
+                # Base64 data URL (or bare base64)
+                with stage("face", "base64_decode"):
+                    image_data = BytesIO(base64.b64decode(image_data[image_data.find(',') + 1:]))
+            elif not isinstance(image_data, BytesIO):
+                image_data = BytesIO(image_data)
+            
+            with stage("face", "image_decode"):
                 pil_image = Image.open(image_data)
-            else:
-                pil_image = Image.open(BytesIO(image_data))
-            
-            # Convert to RGB if needed
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            
-            # FIXED: Resize large images for speed
-            if max(pil_image.size) > self.max_image_size:
-                ratio = self.max_image_size / max(pil_image.size)
-                new_size = (int(pil_image.size[0] * ratio), int(pil_image.size[1] * ratio))
-                pil_image = pil_image.resize(new_size, Image.Resampling.LANCZOS)
-                logger.info(f"📐 Resized image to: {new_size}")
-            
-            # Convert to numpy array
-            image_array = np.array(pil_image)
+                source_width, source_height = pil_image.size
+                ratio = min(1.0, self.max_image_size / max(source_width, source_height))
+                target_size = (max(1, round(source_width * ratio)), max(1, round(source_height * ratio)))
+                if pil_image.format == 'JPEG':
+                    # Never goes below target_size, so the resize below still does the final fit
+                    pil_image.draft('RGB', target_size)
+                if pil_image.mode not in ('RGB', 'L'):
+                    # Palette/alpha/CMYK: convert before resampling
+                    pil_image = pil_image.convert('RGB')
+                else:
+                    pil_image.load()
+            
+            with stage("face", "resize"):
+                if pil_image.size != target_size:
+                    pil_image = pil_image.resize(target_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+                    hot_log.debug("📐 Resized %dx%d image to: %s", source_width, source_height, target_size)
+                if pil_image.mode != 'RGB':
+                    pil_image = pil_image.convert('RGB')
+                
+                # Single copy out of PIL; the detectors only read the array
+                image_array = np.asarray(pil_image)
             
-            logger.info(f"🖼️ Processed image shape: {image_array.shape}")
-            return image_array, pil_image
+            hot_log.debug("🖼️ Processed image shape: %s", image_array.shape)
+            return image_array, source_width / image_array.shape[1]
             
         except Exception as e:
             logger.error(f"❌ Image preprocessing failed: {e}")
             raise
 
-    def detect_best_face_insightface(self, image_array):
-        """Detect best face using InsightFace (primary method)"""
+    def detect_best_face_insightface(self, image_array, scale=1.0):
+        """Detect best face using InsightFace (primary method); bbox in source pixels"""
         try:
             if not self.insight_model:
                 return None
                 
-            logger.info("🔍 Detecting face with InsightFace...")
             
-            # Detect faces
-            faces = self.insight_model.get(image_array)
+            # Detector only; the recognition embedding is computed for the chosen face alone
+            faces = self.run_detector(image_array)
             
             if not faces:
-                logger.warning("⚠️ No faces detected by InsightFace")
+                hot_log.debug("⚠️ No faces detected by InsightFace")
                 return None
             
             # FIXED: Select best face based on detection score and size
             best_face = max(faces, key=lambda x: x.det_score * np.prod(x.bbox[2:] - x.bbox[:2]))
             
             # Quality checks
-            bbox = best_face.bbox.astype(int)
+            bbox = (best_face.bbox * scale).astype(int)
             face_width = bbox[2] - bbox[0]
             face_height = bbox[3] - bbox[1]
             
             if face_width < self.min_face_size or face_height < self.min_face_size:
-                logger.warning(f"⚠️ Face too small: {face_width}x{face_height}")
+                hot_log.debug("⚠️ Face too small: %dx%d", face_width, face_height)
                 return None
             
             if best_face.det_score < 0.5:
-                logger.warning(f"⚠️ Low detection confidence: {best_face.det_score}")
+                hot_log.debug("⚠️ Low detection confidence: %.3f", best_face.det_score)
                 return None
             
-            logger.info(f"✅ InsightFace detected face: score={best_face.det_score:.3f}, size={face_width}x{face_height}")
+            hot_log.debug("✅ InsightFace detected face: score=%.3f, size=%dx%d",
+                          best_face.det_score, face_width, face_height)
             
             return {
                 'bbox': bbox.tolist(),
-                'embedding': best_face.embedding,
+                'embedding': self.embed_face(image_array, best_face),
                 'confidence': float(best_face.det_score),
                 'method': 'InsightFace'
             }
@@ -163,27 +339,27 @@ class FastFaceVerification:
             logger.error(f"❌ InsightFace detection failed: {e}")
             return None
 
-    def detect_best_face_opencv(self, image_array):
-        """Detect best face using OpenCV (fallback method)"""
+    def detect_best_face_opencv(self, image_array, scale=1.0):
+        """Detect best face using OpenCV (fallback method); bbox in source pixels"""
         try:
             if not self.cv2_cascade:
                 return None
                 
-            logger.info("🔍 Detecting face with OpenCV...")
             
             # Convert to grayscale
             gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
             
             # Detect faces
-            faces = self.cv2_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=1.1, 
-                minNeighbors=5, 
-                minSize=(self.min_face_size, self.min_face_size)
-            )
+            with MODEL_INFERENCE.time(model="opencv_cascade", operation="detect"):
+                faces = self.cv2_cascade.detectMultiScale(
+                    gray, 
+                    scaleFactor=1.1, 
+                    minNeighbors=5, 
+                    minSize=(max(1, int(self.min_face_size / scale)),) * 2
+                )
             
             if len(faces) == 0:
-                logger.warning("⚠️ No faces detected by OpenCV")
+                hot_log.debug("⚠️ No faces detected by OpenCV")
                 return None
             
             # Select largest face
@@ -199,10 +375,10 @@ class FastFaceVerification:
             embedding = face_resized.flatten().astype(np.float32)
             embedding = embedding / (np.linalg.norm(embedding) + 1e-8)  # Normalize
             
-            logger.info(f"✅ OpenCV detected face: size={w}x{h}")
+            hot_log.debug("✅ OpenCV detected face: size=%dx%d", w, h)
             
             return {
-                'bbox': [x, y, x+w, y+h],
+                'bbox': [int(v * scale) for v in (x, y, x + w, y + h)],
                 'embedding': embedding,
                 'confidence': 0.8,  # Fixed confidence for OpenCV
                 'method': 'OpenCV'
@@ -212,20 +388,20 @@ class FastFaceVerification:
             logger.error(f"❌ OpenCV detection failed: {e}")
             return None
 
-    def detect_best_face(self, image_array):
+    def detect_best_face(self, image_array, scale=1.0):
         """Detect best face using available methods"""
         # Try InsightFace first (faster and more accurate)
         if INSIGHTFACE_AVAILABLE:
-            face_data = self.detect_best_face_insightface(image_array)
+            face_data = self.detect_best_face_insightface(image_array, scale)
             if face_data:
                 return face_data
         
         # Fallback to OpenCV
-        face_data = self.detect_best_face_opencv(image_array)
+        face_data = self.detect_best_face_opencv(image_array, scale)
         if face_data:
             return face_data
         
-        logger.warning("⚠️ No face detected by any method")
+        hot_log.debug("⚠️ No face detected by any method")
         return None
 
     def calculate_similarity(self, embedding1, embedding2):
@@ -245,37 +421,36 @@ class FastFaceVerification:
             # Ensure similarity is between 0 and 1
             similarity = max(0.0, min(1.0, (similarity + 1) / 2))
             
-            logger.info(f"📊 Calculated similarity: {similarity:.4f}")
+            hot_log.debug("📊 Calculated similarity: %.4f", similarity)
             return float(similarity)
             
         except Exception as e:
             logger.error(f"❌ Similarity calculation failed: {e}")
             return 0.0
 
-    def verify_faces(self, stored_image_url, test_image_base64):
-        """Main face verification method with improved speed and accuracy"""
+    def verify_faces(self, stored_image_url, test_image):
+        """Main face verification method; test_image is a base64 data URL or raw bytes (BytesIO)"""
         try:
-            logger.info("👤 Starting face verification...")
-            
-            # Download and preprocess stored image
-            stored_image_data = self.download_image_from_url(stored_image_url)
-            stored_image_array, _ = self.preprocess_image(stored_image_data)
-            
-            # Preprocess test image
-            test_image_array, _ = self.preprocess_image(test_image_base64)
-            
-            # Detect faces
-            logger.info("🔍 Detecting face in stored image...")
-            stored_face = self.detect_best_face(stored_image_array)
-            
-            if not stored_face:
-                raise ValueError("No face detected in stored image")
-            
-            logger.info("🔍 Detecting face in test image...")
-            test_face = self.detect_best_face(test_image_array)
-            
-            if not test_face:
-                raise ValueError("No face detected in test image")
+            def stored_path():
+                with stage("face", "download"):
+                    stored_image_data = self.download_image_from_url(stored_image_url)
+                stored_image_array, stored_scale = self.preprocess_image(stored_image_data)
+                with stage("face", "detect_embed"):
+                    stored_face = self.detect_best_face(stored_image_array, stored_scale)
+                if not stored_face:
+                    raise ValueError("No face detected in stored image")
+                return stored_face
+            
+            def test_path():
+                test_image_array, test_scale = self.preprocess_image(test_image)
+                with stage("face", "detect_embed"):
+                    test_face = self.detect_best_face(test_image_array, test_scale)
+                if not test_face:
+                    raise ValueError("No face detected in test image")
+                return test_face
+            
+            # Stored and test paths overlap; latency is roughly the slower of the two
+            stored_face, test_face = run_parallel(verify_pool, stored_path, test_path)
             
             # Calculate similarity
             similarity = self.calculate_similarity(
@@ -313,9 +488,11 @@ class FastFaceVerification:
                 'model_used': f"FastFaceVerification_{test_face['method']}"
             }
             
-            logger.info(f"🎯 VERIFICATION RESULT: {verified}")
-            logger.info(f"📊 Similarity: {similarity:.4f} (threshold: {self.face_threshold})")
-            logger.info(f"🎖️ Confidence: {confidence}")
+            # One structured line per verification; the step-by-step detail is sampled debug
+            logger.info("🎯 Face verification result", extra={
+                'verified': bool(verified), 'similarity': round(float(similarity), 4),
+                'threshold': self.face_threshold, 'confidence': confidence, 'method': test_face['method']
+            })
             
             return result
             
@@ -329,8 +506,228 @@ class FastFaceVerification:
                 'model_used': 'FastFaceVerification_Error'
             }
 
-# Initialize the face verification system
+    # --- InsightFace building blocks ---
+    def detection_size(self, image_array):
+        """Detector input for this frame: its own size rounded up to a multiple of 32, capped at det_size"""
+        if not self.adaptive_det_size:
+            return self.det_size
+        height, width = image_array.shape[:2]
+        ratio = min(1.0, self.det_size[0] / width, self.det_size[1] / height)
+        return (min(self.det_size[0], -(-int(width * ratio) // 32) * 32),
+                min(self.det_size[1], -(-int(height * ratio) // 32) * 32))
+
+    def run_detector(self, image_array):
+        """Detector only (no landmarks/recognition/attributes); unfiltered Face objects"""
+        with MODEL_INFERENCE.time(model="insightface", operation="detect"):
+            bboxes, kpss = self.insight_model.det_model.detect(
+                image_array, input_size=self.detection_size(image_array), max_num=0, metric='default')
+        return [Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None, det_score=float(bboxes[i, 4]))
+                for i in range(bboxes.shape[0])]
+
+    def detect_faces_fast(self, image_array, scale=1.0):
+        """Detected faces that pass the quality checks (score, size in source pixels)"""
+        faces = []
+        for face in self.run_detector(image_array):
+            width, height = (face.bbox[2:4] - face.bbox[0:2]) * scale
+            if face.det_score >= 0.5 and width >= self.min_face_size and height >= self.min_face_size:
+                faces.append(face)
+        return faces
+
+    def embed_face(self, image_array, face):
+        """Recognition embedding for one detected face"""
+        with MODEL_INFERENCE.time(model="insightface", operation="embed"):
+            return self.insight_model.models['recognition'].get(image_array, face)
+
+    # --- Monitoring fast path ---
+    def start_monitor_session(self, stored_image_url):
+        """Reference embedding from the enrolled photo, computed once per monitored candidate"""
+        with stage("face", "download"):
+            stored_image_data = self.download_image_from_url(stored_image_url)
+        stored_image_array, stored_scale = self.preprocess_image(stored_image_data)
+        with stage("face", "detect_embed"):
+            stored_face = self.detect_best_face_insightface(stored_image_array, stored_scale)
+        if not stored_face:
+            raise ValueError("No face detected in stored image")
+        return MonitorSession(stored_image_url, stored_face['embedding'])
+
+    def monitor_frame(self, session, image_array, scale=1.0):
+        """
+        One monitoring frame: detect, follow the candidate's box by IoU, and reuse the last
+        identity score unless the track broke, several faces are visible, or a refresh is due.
+        Caller holds session.lock.
+        """
+        now = time.monotonic()
+        session.frames += 1
+        with stage("face", "detect"):
+            faces = self.detect_faces_fast(image_array, scale)
+        
+        if not faces:
+            session.bbox = None  # track broken; the next face is re-identified
+            return {'face_present': False, 'face_count': 0, 'multiple_faces': False,
+                    'same_person': False, 'similarity': None, 'tracked': False,
+                    'embedded': False, 'embed_reason': None, 'bbox': None}
+        
+        boxes = [face.bbox * scale for face in faces]
+        if session.bbox is not None:
+            ious = [bbox_iou(session.bbox, box) for box in boxes]
+            best = int(np.argmax(ious))
+        else:
+            ious = [0.0] * len(faces)
+            best = int(np.argmax([(box[2] - box[0]) * (box[3] - box[1]) for box in boxes]))
+        
+        if session.bbox is None:
+            reason = 'new_track'
+        elif len(faces) > 1:
+            reason = 'multiple_faces'
+        elif ious[best] < MONITOR_IOU_THRESHOLD:
+            reason = 'track_lost'
+        elif (session.frames_since_embed >= MONITOR_EMBED_EVERY_FRAMES
+              or now - session.last_embed_at >= MONITOR_EMBED_EVERY_SECONDS):
+            reason = 'periodic'
+        else:
+            reason = None
+        
+        if reason:
+            # With several faces in view, the candidate is whichever matches the reference best
+            candidates = range(len(faces)) if len(faces) > 1 else [best]
+            with stage("face", "embed"):
+                scored = [(self.calculate_similarity(session.reference_embedding,
+                                                     self.embed_face(image_array, faces[i])), i)
+                          for i in candidates]
+            session.similarity, best = max(scored)
+            session.frames_since_embed = 0
+            session.last_embed_at = now
+        else:
+            session.frames_since_embed += 1
+        session.bbox = boxes[best]
+        
+        return {
+            'face_present': True,
+            'face_count': len(faces),
+            'multiple_faces': len(faces) > 1,
+            'same_person': session.similarity >= self.face_threshold,
+            'similarity': session.similarity,
+            'tracked': reason is None,
+            'embedded': reason is not None,
+            'embed_reason': reason,
+            'iou': round(ious[best], 3),
+            'bbox': boxes[best].astype(int).tolist(),
+            'confidence': float(faces[best].det_score)
+        }
+
+    # --- 1:N identity search ---
+    def identity_embedding(self, image_data):
+        """Recognition embedding of the best face in an image (base64 or BytesIO); ValueError if none"""
+        image_array, scale = self.preprocess_image(image_data)
+        with stage("face", "detect_embed"):
+            face = self.detect_best_face_insightface(image_array, scale)
+        if not face:
+            raise ValueError("No usable face detected in image")
+        return face
+
+    def search_identities(self, index, image_data, exclude=(), k=5):
+        """Top-k enrolled identities for the best face in a frame, on the calculate_similarity scale"""
+        face = self.identity_embedding(image_data)
+        with stage("face", "identity_search"):
+            started = time.perf_counter()
+            matches = index.search(face['embedding'], k=k, exclude=exclude)
+            search_ms = (time.perf_counter() - started) * 1000
+        results = []
+        for identity_id, cosine in matches:
+            similarity = max(0.0, min(1.0, (cosine + 1) / 2))
+            results.append({'candidate_id': identity_id, 'similarity': similarity,
+                            'is_match': similarity >= self.face_threshold})
+        return {
+            'matches': results,
+            'matches_other_candidate': any(match['is_match'] for match in results),
+            'bbox': face['bbox'],
+            'confidence': face['confidence'],
+            'index_size': len(index),
+            'search_ms': round(search_ms, 3),
+            'threshold_used': self.face_threshold
+        }
+
+    # --- Single-pass frame analysis ---
+    def frame_quality(self, image_array, previous_thumbnail=None):
+        """(blur, brightness, motion or None, thumbnail) from one grayscale conversion of the frame"""
+        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+        blur = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        brightness = float(gray.mean())
+        thumbnail = cv2.resize(gray, (64, 48), interpolation=cv2.INTER_AREA)
+        motion = None
+        if previous_thumbnail is not None:
+            motion = float(cv2.absdiff(thumbnail, previous_thumbnail).mean()) / 255.0
+        return blur, brightness, motion, thumbnail
+
+    def analyze_frame(self, image_array, scale, reference_embedding, session=None):
+        """
+        Every face with its identity score against the reference, plus frame quality and
+        liveness signals, from one decode and one detector pass. Caller holds session.lock.
+        """
+        with stage("face", "detect"):
+            faces = [face for face in self.run_detector(image_array) if face.det_score >= 0.5]
+        
+        with stage("face", "embed"):
+            similarities = [self.calculate_similarity(reference_embedding, self.embed_face(image_array, face))
+                            for face in faces]
+        
+        with stage("face", "quality"):
+            blur, brightness, motion, thumbnail = self.frame_quality(
+                image_array, session.previous_thumbnail if session else None)
+        if session is not None:
+            session.previous_thumbnail = thumbnail
+        
+        face_results = []
+        for face, similarity in zip(faces, similarities):
+            bbox = (face.bbox * scale).astype(int)
+            face_results.append({
+                'bbox': bbox.tolist(),
+                'confidence': float(face.det_score),
+                'similarity': similarity,
+                'is_match': similarity >= self.face_threshold,
+                'too_small': bool(min(bbox[2] - bbox[0], bbox[3] - bbox[1]) < self.min_face_size)
+            })
+        best = max(face_results, key=lambda face: face['similarity'], default=None)
+        similarity = best['similarity'] if best else 0.0
+        verified = bool(best and best['is_match'] and not best['too_small'])
+        
+        if similarity >= self.high_confidence_threshold and verified:
+            confidence = 'HIGH'
+        elif verified:
+            confidence = 'MODERATE'
+        else:
+            confidence = 'LOW'
+        
+        brightness_min, brightness_max = ANALYZE_BRIGHTNESS_RANGE
+        return {
+            'verified': verified,
+            'similarity': similarity,
+            'confidence': confidence,
+            'threshold_used': self.face_threshold,
+            'bbox': best['bbox'] if best else None,
+            'face_count': len(face_results),
+            'multiple_faces': len(face_results) > 1,
+            'faces': face_results,
+            'detected_faces': [face['bbox'] for face in face_results],  # proctoring overlay
+            'quality': {
+                'blur_variance': round(blur, 2),
+                'brightness': round(brightness, 2),
+                'motion': round(motion, 5) if motion is not None else None,
+                'too_blurry': blur < ANALYZE_BLUR_MIN,
+                'too_dark': brightness < brightness_min,
+                'too_bright': brightness > brightness_max,
+                'low_motion': motion is not None and motion < ANALYZE_MOTION_MIN
+            },
+            'model_used': 'FastFaceVerification_InsightFace_Analyze'
+        }
+
+# Initialize the face verification system; models load in the background
 face_verifier = FastFaceVerification()
+face_verifier.start_background_init()
+monitor_sessions = SessionStore("face_monitor_sessions", MONITOR_MAX_SESSIONS, MONITOR_SESSION_TTL)
+identity_indexes = IdentityIndexRegistry()
+identity_indexes.start_flusher()
+READY_WAIT_SECONDS = float(os.getenv("FACE_READY_WAIT_SECONDS", "30"))
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -341,33 +738,60 @@ def health_check():
         'version': '2.0',
         'insightface_available': INSIGHTFACE_AVAILABLE,
         'opencv_available': face_verifier.cv2_cascade is not None,
+        'models_ready': face_verifier.ready_event.is_set(),
         'thresholds': {
             'face_threshold': face_verifier.face_threshold,
             'min_face_size': face_verifier.min_face_size
         }
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 only once models are loaded and warmed up"""
+    if not face_verifier.ready_event.is_set():
+        return jsonify({'status': 'loading', 'service': 'face_verification_fixed'}), 503
+    # A failed load still sets ready_event; report it so the supervisor restarts the worker
+    loaded = face_verifier.init_error is None and (
+        face_verifier.insight_model is not None or face_verifier.cv2_cascade is not None)
+    return jsonify({
+        'status': 'ready' if loaded else 'error',
+        'service': 'face_verification_fixed',
+        'init_seconds': face_verifier.init_seconds,
+        'init_error': face_verifier.init_error,
+        'model_rss_mb': face_verifier.model_rss_mb,
+        'insightface_modules': sorted(face_verifier.insight_model.models) if face_verifier.insight_model else [],
+        'adaptive_det_size': face_verifier.adaptive_det_size
+    }), 200 if loaded else 503
+
+def models_ready(requirement=None):
+    """None when the endpoint can run, else the 503 response; `requirement` names a feature that needs InsightFace"""
+    with QUEUE_DEPTH.track(queue="face_model_wait"), stage("face", "model_wait"):
+        ready = face_verifier.wait_until_ready(READY_WAIT_SECONDS)
+    if not ready:
+        return jsonify({'error': 'Face models are still loading, retry shortly'}), 503
+    if requirement and not face_verifier.insight_model:
+        return jsonify({'error': f'{requirement} requires InsightFace'}), 503
+    return None
+
 @app.route('/verify', methods=['POST'])
 def verify_face():
     """Face verification endpoint"""
     try:
-        data = request.json
+        not_ready = models_ready()
+        if not_ready:
+            return not_ready
         
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        # JSON with a base64 data URL, multipart (test_image file) or a raw image body
+        upload = read_verify_upload("face", 'stored_image_url', 'test_image_base64', 'test_image')
         
-        stored_image_url = data.get('stored_image_url')
-        test_image_base64 = data.get('test_image_base64')
+        if not upload.stored_url or not upload.media:
+            return jsonify({'error': 'Missing stored_image_url or test_image_base64 (or a test_image upload)'}), 400
         
-        if not stored_image_url or not test_image_base64:
-            return jsonify({'error': 'Missing stored_image_url or test_image_base64'}), 400
-        
-        logger.info(f"👤 Face verification request received")
-        logger.info(f"📥 Stored URL: {stored_image_url[:50]}...")
-        logger.info(f"📥 Test image: {len(test_image_base64)} chars")
+        hot_log.debug("👤 Face verification request: stored=%s test=%d (%s, %d body bytes)",
+                      upload.stored_url[:50], media_size(upload.media), upload.encoding, upload.body_bytes)
         
         # Perform verification
-        result = face_verifier.verify_faces(stored_image_url, test_image_base64)
+        result = face_verifier.verify_faces(upload.stored_url, upload.media)
         
         return jsonify(result)
         
@@ -381,9 +805,160 @@ def verify_face():
             'model_used': 'FastFaceVerification_Error'
         }), 500
 
+@app.route('/monitor', methods=['POST'])
+def monitor_face():
+    """Continuous interview monitoring: detector + IoU tracking, recognition only when needed"""
+    try:
+        not_ready = models_ready('Monitoring')
+        if not_ready:
+            return not_ready
+        
+        # Same encodings as /verify; the frame is frame_base64 (JSON) or a frame upload
+        upload = read_verify_upload("face", 'stored_image_url', 'frame_base64', 'frame', extra_fields=('session_id',))
+        session_id = upload.fields.get('session_id')
+        
+        if not session_id or not upload.media:
+            return jsonify({'error': 'Missing session_id or frame_base64 (or a frame upload)'}), 400
+        
+        session = monitor_sessions.get(session_id)
+        if session is None or (upload.stored_url and upload.stored_url != session.stored_image_url):
+            if not upload.stored_url:
+                return jsonify({'error': 'Unknown session_id; send stored_image_url to start monitoring'}), 400
+            session = face_verifier.start_monitor_session(upload.stored_url)
+            monitor_sessions.put(session_id, session)
+        
+        image_array, scale = face_verifier.preprocess_image(upload.media)
+        with session.lock:
+            result = face_verifier.monitor_frame(session, image_array, scale)
+        result['session_id'] = session_id
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Monitor error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/analyze', methods=['POST'])
+def analyze_face():
+    """Single pass for proctoring: all faces with identity scores, blur, brightness and motion"""
+    try:
+        not_ready = models_ready('Frame analysis')
+        if not_ready:
+            return not_ready
+        
+        # session_id is optional: it caches the reference embedding and enables motion
+        upload = read_verify_upload("face", 'stored_image_url', 'frame_base64', 'frame', extra_fields=('session_id',))
+        session_id = upload.fields.get('session_id')
+        if not upload.media:
+            return jsonify({'error': 'Missing frame_base64 (or a frame upload)'}), 400
+        
+        session = monitor_sessions.get(session_id) if session_id else None
+        if session is None or (upload.stored_url and upload.stored_url != session.stored_image_url):
+            if not upload.stored_url:
+                return jsonify({'error': 'Missing stored_image_url'}), 400
+            session = face_verifier.start_monitor_session(upload.stored_url)
+            if session_id:
+                monitor_sessions.put(session_id, session)
+        
+        image_array, scale = face_verifier.preprocess_image(upload.media)
+        with session.lock:
+            result = face_verifier.analyze_frame(image_array, scale, session.reference_embedding,
+                                                 session if session_id else None)
+        if session_id:
+            result['session_id'] = session_id
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Analyze error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/identities/<job_id>', methods=['POST'])
+def enroll_identity(job_id):
+    """Add or replace a candidate's face in the job's identity index"""
+    try:
+        not_ready = models_ready('Identity search')
+        if not_ready:
+            return not_ready
+        
+        # The enrolled photo by URL, or sent directly as image_base64 / an image upload
+        upload = read_verify_upload("face", 'stored_image_url', 'image_base64', 'image', extra_fields=('candidate_id',))
+        candidate_id = upload.fields.get('candidate_id')
+        if not candidate_id or not (upload.media or upload.stored_url):
+            return jsonify({'error': 'Missing candidate_id or stored_image_url (or image_base64 / an image upload)'}), 400
+        
+        index = identity_indexes.get(job_id)
+        if upload.media:
+            face = face_verifier.identity_embedding(upload.media)
+        else:
+            with stage("face", "download"):
+                image_data = face_verifier.download_image_from_url(upload.stored_url)
+            face = face_verifier.identity_embedding(image_data)
+        index.add(candidate_id, face['embedding'])
+        return jsonify({'job_id': job_id, 'candidate_id': candidate_id, 'enrolled': True,
+                        'index_size': len(index), 'confidence': face['confidence']})
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Identity enroll error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/identities/<job_id>/<candidate_id>', methods=['DELETE'])
+def remove_identity(job_id, candidate_id):
+    """Drop a candidate from the job's identity index"""
+    try:
+        index = identity_indexes.get(job_id, create=False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    removed = bool(index and index.remove(candidate_id))
+    return jsonify({'job_id': job_id, 'candidate_id': candidate_id, 'removed': removed,
+                    'index_size': len(index) if index else 0})
+
+@app.route('/identities/<job_id>/search', methods=['POST'])
+def search_identity(job_id):
+    """Proxy-interview check: which other enrolled candidates does this frame's face match?"""
+    try:
+        not_ready = models_ready('Identity search')
+        if not_ready:
+            return not_ready
+        
+        # candidate_id is the person expected in the frame; their own entry is excluded
+        upload = read_verify_upload("face", 'stored_image_url', 'frame_base64', 'frame',
+                                    extra_fields=('candidate_id', 'k'))
+        if not upload.media:
+            return jsonify({'error': 'Missing frame_base64 (or a frame upload)'}), 400
+        candidate_id = upload.fields.get('candidate_id')
+        k = min(max(int(upload.fields.get('k', 5)), 1), 100)
+        
+        index = identity_indexes.get(job_id, create=False)
+        if index is None:
+            return jsonify({'error': f'No identities enrolled for job {job_id}'}), 404
+        
+        result = face_verifier.search_identities(index, upload.media,
+                                                 exclude=(candidate_id,) if candidate_id else (), k=k)
+        result['job_id'] = job_id
+        result['candidate_id'] = candidate_id
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Identity search error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/monitor/<session_id>', methods=['DELETE'])
+def end_monitoring(session_id):
+    """Drop a candidate's tracking state when the interview ends"""
+    monitor_sessions.discard(session_id)
+    return jsonify({'session_id': session_id, 'ended': True})
+
 if __name__ == '__main__':
     logger.info("🚀 Starting Fixed Face Verification Service...")
     logger.info(f"👤 Face threshold: {face_verifier.face_threshold}")
     logger.info(f"🔍 InsightFace available: {INSIGHTFACE_AVAILABLE}")
     logger.info(f"👁️ OpenCV cascade available: {face_verifier.cv2_cascade is not None}")
-    app.run(host='0.0.0.0', port=8001, debug=True)
\ No newline at end of file
+    # The reloader would re-import this module and load every model twice
+    app.run(host='0.0.0.0', port=8001, debug=True, use_reloader=False)
\ No newline at end of file
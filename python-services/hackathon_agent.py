@@ -5,14 +5,15 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import TypedDict, List, Optional
-from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_core.messages import SystemMessage, HumanMessage
 import requests
-import json
 import os
 from dotenv import load_dotenv
+from llm_gateway import LLMGateway
+from agent_clients import get_gateway, get_serper
+from json_utils import parse_complete_json, parse_llm_json
+from structured_logging import configure_logging, install_request_id_fastapi
+from metrics import instrument_fastapi, instrument_node, observe_upstream
 
 load_dotenv()
 
@@ -22,6 +23,11 @@ if not os.getenv("SERPER_API_KEY") or not os.getenv("GOOGLE_API_KEY"):
 
 app = FastAPI(title="Hire AI - Hackathon Agent")
 
+# --- LLM ---
+# Created on first use (see agent_clients) to keep import time low
+def hackathon_llm() -> LLMGateway:
+    return get_gateway("hackathon", temperature=0)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -29,6 +35,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_fastapi(app, "hackathon")
+install_request_id_fastapi(app)
 
 # --- MODELS ---
 class AgenticInputs(BaseModel):
@@ -64,7 +72,8 @@ def github_scanner_node(state: AgentState):
     try:
         # REAL CALL to GitHub API (Public Data)
         url = f"https://api.github.com/users/{username}/repos?sort=updated&per_page=10"
-        response = requests.get(url)
+        with observe_upstream("github", "repos"):
+            response = requests.get(url)
         
         if response.status_code == 200:
             repos = response.json()
@@ -119,10 +128,10 @@ def search_node(state: AgentState):
     # Force high-quality platforms
     search_term += " site:devpost.com OR site:unstop.com OR site:dorahacks.io OR site:lu.ma"
     
-    serper = GoogleSerperAPIWrapper()
     try:
         # Get raw results
-        raw = serper.results(search_term)
+        with observe_upstream("serper", "hackathon.search"):
+            raw = get_serper().results(search_term)
         
         # Convert to string for LLM
         output = f"CONTEXT FROM GITHUB: {github_context}\n\nSEARCH RESULTS:\n"
@@ -144,12 +153,6 @@ def matching_node(state: AgentState):
     if not raw_text:
         return {"structured_events": []}
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash-lite",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0
-    )
-
     current_date = datetime.datetime.now().strftime("%Y-%m-%d")
 
     prompt = f"""
@@ -188,12 +191,14 @@ def matching_node(state: AgentState):
     """
     
     try:
-        res = llm.invoke([HumanMessage(content=prompt)])
-        content = res.content.replace("```json", "").replace("```", "").strip()
-        data = json.loads(content)
+        res = hackathon_llm().invoke(
+            [HumanMessage(content=prompt)],
+            validate=lambda content: parse_complete_json(content, expect=list) is not None
+        )
+        data = parse_llm_json(res.content, expect=list, default=[])
         
         # Filter and Sort
-        valid = [x for x in data if x.get('link') and x['link'].startswith("http")]
+        valid = [x for x in data if isinstance(x, dict) and isinstance(x.get('link'), str) and x['link'].startswith("http")]
         valid.sort(key=lambda x: x.get('match_score', 0), reverse=True)
         
         return {"structured_events": valid}
@@ -202,17 +207,25 @@ def matching_node(state: AgentState):
         return {"structured_events": []}
 
 # --- GRAPH ---
-workflow = StateGraph(AgentState)
-workflow.add_node("github", github_scanner_node)
-workflow.add_node("search", search_node)
-workflow.add_node("match", matching_node)
-
-workflow.set_entry_point("github")
-workflow.add_edge("github", "search")
-workflow.add_edge("search", "match")
-workflow.add_edge("match", END)
-
-app_graph = workflow.compile()
+_app_graph = None
+
+def get_app_graph():
+    """Compile the graph on first use so langgraph stays out of import time"""
+    global _app_graph
+    if _app_graph is None:
+        from langgraph.graph import StateGraph, END
+        workflow = StateGraph(AgentState)
+        workflow.add_node("github", instrument_node("hackathon", "github", github_scanner_node))
+        workflow.add_node("search", instrument_node("hackathon", "search", search_node))
+        workflow.add_node("match", instrument_node("hackathon", "match", matching_node))
+
+        workflow.set_entry_point("github")
+        workflow.add_edge("github", "search")
+        workflow.add_edge("search", "match")
+        workflow.add_edge("match", END)
+
+        _app_graph = workflow.compile()
+    return _app_graph
 
 @app.post("/search-hackathons")
 async def search_endpoint(req: SearchRequest):
@@ -224,11 +237,17 @@ async def search_endpoint(req: SearchRequest):
             "raw_results": "",
             "structured_events": []
         }
-        result = app_graph.invoke(initial_state)
+        # ainvoke runs the sync nodes in a worker thread instead of blocking the event loop
+        result = await get_app_graph().ainvoke(initial_state)
         return result['structured_events']
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "hackathon"}
+
 if __name__ == "__main__":
+    configure_logging("hackathon")
     print("🚀 Hire AI Hackathon Agent running on Port 8006")
     uvicorn.run(app, host="0.0.0.0", port=8006)
\ No newline at end of file
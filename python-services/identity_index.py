@@ -0,0 +1,306 @@
+# python-services/identity_index.py
+# 1:N identity search over normalized face embeddings, one index per namespace (job)
+#
+# Vectors live in contiguous float32 blocks scored with one matrix-vector product each.
+# Small indexes are a single block (exact search). From IDENTITY_IVF_MIN vectors the
+# index trains spherical k-means centroids and keeps one block per centroid (IVF): a
+# query scores the centroids, then only the IDENTITY_NPROBE closest blocks, which keeps
+# search well under a millisecond at 100k identities.
+#
+# Indexes are saved as .npy + JSON and loaded memory-mapped, so startup does not read
+# the vectors and worker processes share the page cache. A block is copied into RAM
+# only when it is modified.
+
+import atexit
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INDEX_DIR = os.getenv("IDENTITY_INDEX_DIR", os.path.join(BASE_DIR, ".cache", "identities"))
+IVF_MIN = int(os.getenv("IDENTITY_IVF_MIN", "20000"))
+NPROBE = int(os.getenv("IDENTITY_NPROBE", "8"))
+FLUSH_SECONDS = float(os.getenv("IDENTITY_FLUSH_SECONDS", "30"))
+
+_NAMESPACE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,127}")  # leading alphanumeric rules out "." and ".."
+
+
+def normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    return vector / (np.linalg.norm(vector) + 1e-8)
+
+
+class _Block:
+    """One inverted list: rows [0, size) of `vectors` are live, ids[i] owns row i"""
+
+    __slots__ = ("vectors", "ids")
+
+    def __init__(self, dim: int, vectors: Optional[np.ndarray] = None, ids: Optional[List[str]] = None):
+        self.vectors = vectors if vectors is not None else np.empty((0, dim), dtype=np.float32)
+        self.ids = ids if ids is not None else []
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def _writable(self, capacity: int) -> None:
+        """Own a writable buffer of at least `capacity` rows (memory-mapped blocks are read-only)"""
+        if self.vectors.flags.writeable and self.vectors.shape[0] >= capacity:
+            return
+        rows = max(capacity, self.vectors.shape[0] * 2 if self.vectors.shape[0] < capacity else 0, 16)
+        grown = np.empty((rows, self.vectors.shape[1]), dtype=np.float32)
+        grown[:self.size] = self.vectors[:self.size]
+        self.vectors = grown
+
+    def append(self, vector: np.ndarray, identity_id: str) -> int:
+        self._writable(self.size + 1)
+        self.vectors[self.size] = vector
+        self.ids.append(identity_id)
+        return self.size - 1
+
+    def remove(self, row: int) -> Optional[str]:
+        """Swap-delete `row`; returns the id that moved into it, if any"""
+        self._writable(self.size)
+        last = self.size - 1
+        moved = None
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.ids[row] = self.ids[last]
+            moved = self.ids[row]
+        self.ids.pop()
+        return moved
+
+
+class IdentityIndex:
+    """Top-k cosine search with incremental add/remove; thread-safe"""
+
+    def __init__(self, dim: int = 512, path: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self.centroids: Optional[np.ndarray] = None  # (nlist, dim) once trained
+        self.blocks: List[_Block] = [_Block(dim)]
+        self.locations: Dict[str, Tuple[int, int]] = {}  # id -> (block, row)
+        self.trained_size = 0
+        self.dirty = False
+        self.generation = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __contains__(self, identity_id: str) -> bool:
+        return identity_id in self.locations
+
+    # --- Mutation ---
+    def add(self, identity_id: str, embedding) -> None:
+        """Insert or replace one identity"""
+        vector = normalize(embedding)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"embedding has {vector.shape[0]} dimensions, index expects {self.dim}")
+        with self._lock:
+            if identity_id in self.locations:
+                self._remove(identity_id)
+            block = 0 if self.centroids is None else int(np.argmax(self.centroids @ vector))
+            self.locations[identity_id] = (block, self.blocks[block].append(vector, identity_id))
+            self.dirty = True
+            if len(self) >= IVF_MIN and len(self) >= 4 * self.trained_size:
+                self.train()
+
+    def remove(self, identity_id: str) -> bool:
+        with self._lock:
+            if identity_id not in self.locations:
+                return False
+            self._remove(identity_id)
+            self.dirty = True
+            return True
+
+    def _remove(self, identity_id: str) -> None:
+        block, row = self.locations.pop(identity_id)
+        moved = self.blocks[block].remove(row)
+        if moved is not None:
+            self.locations[moved] = (block, row)
+
+    def train(self, iterations: int = 8, seed: int = 0) -> None:
+        """(Re)build the IVF layout: sqrt(n) spherical k-means centroids, one block per centroid"""
+        with self._lock:
+            started = time.perf_counter()
+            vectors, ids = self._snapshot()
+            nlist = max(1, int(math.sqrt(len(ids))))
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(len(ids), size=min(len(ids), nlist * 64), replace=False)]
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                empty = ~sums.any(axis=1)
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]  # reseed empty lists
+                centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-8)
+
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+            self.blocks = []
+            self.locations = {}
+            for block in range(nlist):
+                rows = order[bounds[block]:bounds[block + 1]]
+                block_ids = [ids[row] for row in rows]
+                self.blocks.append(_Block(self.dim, vectors[rows], block_ids))
+                for row, identity_id in enumerate(block_ids):
+                    self.locations[identity_id] = (block, row)
+            self.centroids = centroids
+            self.trained_size = len(ids)
+            self.dirty = True
+            logger.info(f"🗂️ Identity index trained: {len(ids)} vectors, {nlist} lists "
+                        f"in {time.perf_counter() - started:.2f}s")
+
+    # --- Search ---
+    def search(self, embedding, k: int = 5, exclude: Iterable[str] = (), nprobe: int = NPROBE) -> List[Tuple[str, float]]:
+        """[(identity_id, cosine)] best first; `exclude` ids (e.g. the candidate's own) are skipped"""
+        query = normalize(embedding)
+        exclude = set(exclude)
+        with self._lock:
+            if self.centroids is None or nprobe >= len(self.blocks):
+                probe = range(len(self.blocks))
+            else:
+                probe = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+            blocks = [self.blocks[b] for b in probe if self.blocks[b].size]
+            if not blocks:
+                return []
+            scores = np.concatenate([block.vectors[:block.size] @ query for block in blocks])
+            offsets = np.cumsum([0] + [block.size for block in blocks])
+
+            wanted = min(len(scores), k + len(exclude))
+            top = np.argpartition(scores, -wanted)[-wanted:]
+            top = top[np.argsort(scores[top])[::-1]]
+            matches = []
+            for position in top:
+                b = int(np.searchsorted(offsets, position, side="right")) - 1
+                identity_id = blocks[b].ids[position - offsets[b]]
+                if identity_id in exclude:
+                    continue
+                matches.append((identity_id, float(scores[position])))
+                if len(matches) == k:
+                    break
+            return matches
+
+    # --- Persistence ---
+    def _snapshot(self) -> Tuple[np.ndarray, List[str]]:
+        vectors = np.concatenate([block.vectors[:block.size] for block in self.blocks]) if len(self) else \
+            np.empty((0, self.dim), dtype=np.float32)
+        return vectors, [identity_id for block in self.blocks for identity_id in block.ids]
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write vectors-<generation>.npy then swap meta.json, so readers never see a torn index"""
+        path = path or self.path
+        with self._lock:
+            vectors, ids = self._snapshot()
+            sizes = [block.size for block in self.blocks]
+            centroids = self.centroids
+            self.generation += 1
+            generation = self.generation
+            self.dirty = False
+
+        os.makedirs(path, exist_ok=True)
+        vectors_file = f"vectors-{generation}.npy"
+        np.save(os.path.join(path, vectors_file), vectors)
+        if centroids is not None:
+            np.save(os.path.join(path, f"centroids-{generation}.npy"), centroids)
+        meta = {"dim": self.dim, "generation": generation, "ids": ids, "block_sizes": sizes,
+                "trained_size": self.trained_size, "vectors": vectors_file,
+                "centroids": f"centroids-{generation}.npy" if centroids is not None else None}
+        tmp = os.path.join(path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+        for name in os.listdir(path):  # older generations; still-mapped files stay readable on POSIX
+            if name.endswith(".npy") and name not in (vectors_file, meta["centroids"]):
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, path: str) -> "IdentityIndex":
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        index = cls(meta["dim"], path)
+        vectors = np.load(os.path.join(path, meta["vectors"]), mmap_mode="r")
+        if meta.get("centroids"):
+            index.centroids = np.load(os.path.join(path, meta["centroids"]))
+        index.blocks = []
+        offset = 0
+        for block, size in enumerate(meta["block_sizes"]):
+            block_ids = meta["ids"][offset:offset + size]
+            index.blocks.append(_Block(meta["dim"], vectors[offset:offset + size], block_ids))
+            for row, identity_id in enumerate(block_ids):
+                index.locations[identity_id] = (block, row)
+            offset += size
+        if not index.blocks:
+            index.blocks = [_Block(meta["dim"])]
+        index.trained_size = meta.get("trained_size", 0)
+        index.generation = meta["generation"]
+        return index
+
+
+class IdentityIndexRegistry:
+    """One IdentityIndex per namespace under `root`, loaded on first use and flushed periodically"""
+
+    def __init__(self, root: str = INDEX_DIR, dim: int = 512):
+        self.root = root
+        self.dim = dim
+        self._indexes: Dict[str, IdentityIndex] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+
+    def get(self, namespace: str, create: bool = True) -> Optional[IdentityIndex]:
+        if not _NAMESPACE.fullmatch(namespace or ""):
+            raise ValueError("namespace must be 1-128 characters of letters, digits, '.', '_' or '-', "
+                             "starting with a letter or digit")
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                path = os.path.join(self.root, namespace)
+                if os.path.exists(os.path.join(path, "meta.json")):
+                    index = IdentityIndex.load(path)
+                elif create:
+                    index = IdentityIndex(self.dim, path)
+                else:
+                    return None
+                self._indexes[namespace] = index
+            return index
+
+    def flush(self) -> int:
+        """Save every modified index; returns how many were written"""
+        with self._lock:
+            dirty = [index for index in self._indexes.values() if index.dirty]
+        for index in dirty:
+            try:
+                index.save()
+            except Exception as e:
+                logger.error(f"❌ Could not save identity index {index.path}: {e}")
+        return len(dirty)
+
+    def start_flusher(self, interval: float = FLUSH_SECONDS) -> None:
+        if self._flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.flush()
+
+        self._flusher = threading.Thread(target=run, name="identity-index-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
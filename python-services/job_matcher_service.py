@@ -2,24 +2,22 @@ from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any, Annotated
 from pydantic import BaseModel
-from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import Tool
 from langchain_core.messages import SystemMessage, HumanMessage
-from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_community.utilities import GoogleSerperAPIWrapper
-import json
+import logging
 import os
 import io
-import nest_asyncio
 from dotenv import load_dotenv
 import uvicorn
-from pypdf import PdfReader
 import re
+from llm_gateway import LLMGateway
+from json_utils import parse_complete_json, parse_llm_json
+from agent_clients import get_gateway, get_llm_with_tools, get_serper
+from metrics import QUEUE_DEPTH, instrument_fastapi, instrument_node, observe_upstream, stage_timer
+from structured_logging import configure_logging, install_request_id_fastapi
 
-nest_asyncio.apply()
+# nest_asyncio.apply() is no longer needed: every graph call is awaited on uvicorn's loop
 load_dotenv()
 
 # --- VALIDATION ---
@@ -37,6 +35,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_fastapi(app, "job_matcher")
+install_request_id_fastapi(app)
+
+logger = logging.getLogger(__name__)
 
 # --- ENHANCED STATE ---
 class JobMatcherState(BaseModel):
@@ -54,7 +56,6 @@ class JobMatcherState(BaseModel):
     search_iterations: int = 0
 
 # --- ADVANCED TOOLS ---
-serper = GoogleSerperAPIWrapper()
 
 def advanced_job_search_tool(query: str) -> str:
     """
@@ -66,7 +67,8 @@ def advanced_job_search_tool(query: str) -> str:
     search_query = f'{query} (site:linkedin.com/jobs OR site:indeed.com OR site:glassdoor.com OR site:naukri.com OR site:monster.co.in OR site:greenhouse.io OR site:lever.co OR site:workable.com OR site:smartrecruiters.com OR site:breezy.hr OR "apply now" OR "job opening") -"expired" -"closed"'
     
     try:
-        raw_results = serper.results(search_query)
+        with observe_upstream("serper", "job_matcher.jobs"):
+            raw_results = get_serper().results(search_query)
         
         output_string = "=== REAL JOB SEARCH RESULTS ===\n\n"
         
@@ -101,7 +103,8 @@ def targeted_company_search_tool(query: str) -> str:
     print(f"🎯 Company/Industry Search: {query}")
     
     try:
-        raw_results = serper.results(query)
+        with observe_upstream("serper", "job_matcher.company"):
+            raw_results = get_serper().results(query)
         output_string = "=== COMPANY/INDUSTRY SEARCH RESULTS ===\n\n"
         
         if "organic" in raw_results:
@@ -134,15 +137,23 @@ tools = [
 ]
 
 # --- ENHANCED LLM ---
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite",
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.1
-)
-llm_with_tools = llm.bind_tools(tools)
+# Created on first use (see agent_clients) to keep import time low.
+# Tool-calling turns go straight to the model; plain prompts go through the cached gateway
+MATCHER_TEMPERATURE = 0.1
+
+def matcher_llm() -> LLMGateway:
+    return get_gateway("job_matcher", temperature=MATCHER_TEMPERATURE)
+
+def matcher_tools_llm():
+    return get_llm_with_tools(tools, temperature=MATCHER_TEMPERATURE)
+
+async def call_tools_llm(messages):
+    with QUEUE_DEPTH.track(queue="llm_upstream"), observe_upstream("gemini", "job_matcher.tools"):
+        return await matcher_tools_llm().ainvoke(messages)
 
 # --- HELPER ---
 def extract_text_from_pdf(file_content: bytes) -> str:
+    from pypdf import PdfReader  # deferred: only resume uploads need it
     try:
         pdf_file = io.BytesIO(file_content)
         reader = PdfReader(pdf_file)
@@ -188,14 +199,15 @@ async def advanced_resume_analyzer_node(state: JobMatcherState) -> Dict:
     5. Return ONLY valid JSON, no markdown or extra text
     """
     
-    response = await llm.ainvoke([
+    response = await matcher_llm().ainvoke([
         SystemMessage(content="You are a precision resume analyzer. Return only valid JSON."),
         HumanMessage(content=analysis_prompt)
     ])
     
     try:
-        content = response.content.replace("```json", "").replace("```", "").strip()
-        data = json.loads(content)
+        data = parse_llm_json(response.content, expect=dict)
+        if data is None:
+            raise ValueError("no JSON object in analyzer response")
         
         # LOGIC FIX: Prioritize User Input for Industry if provided
         user_industry = state.industry_preference
@@ -269,7 +281,7 @@ async def intelligent_job_searcher_node(state: JobMatcherState) -> Dict:
     Use the advanced_job_search tool for broad search results.
     """)
     
-    response = await llm_with_tools.ainvoke([
+    response = await call_tools_llm([
         SystemMessage(content="You are an expert recruiter finding real job opportunities. Use the search tools effectively."),
         search_message
     ])
@@ -281,7 +293,7 @@ async def intelligent_job_searcher_node(state: JobMatcherState) -> Dict:
         Search for: "careers {state.industry_preference} companies {state.preferred_location} {' '.join(state.core_skills[:2])}"
         """)
         
-        company_response = await llm_with_tools.ainvoke([
+        company_response = await call_tools_llm([
             SystemMessage(content="Find jobs at specific companies in the target industry."),
             company_message
         ])
@@ -296,6 +308,65 @@ async def intelligent_job_searcher_node(state: JobMatcherState) -> Dict:
         "search_iterations": state.search_iterations + 1
     }
 
+def validate_job(job: dict, state: JobMatcherState):
+    """Strict quality checks + cleanup for one extracted job; None if unusable"""
+    # Validate required fields
+    if not all(key in job for key in ["title", "company", "apply_link"]):
+        return None
+
+    link = job.get("apply_link", "")
+    if not isinstance(link, str) or not link.startswith("http"):
+        return None
+
+    # PERFECT DATA CLEANUP - NO "NONE" VALUES ALLOWED
+    # 1. Company
+    if not job.get("company") or job.get("company") in ["None", "null", "Unknown", ""]:
+        # Try to extract from URL if company is missing
+        try:
+            domain = link.split("/")[2].replace("www.", "").split(".")[0]
+            job["company"] = domain.title()
+        except:
+            job["company"] = "Hiring Company"
+
+    # 2. Location
+    if not job.get("location") or job.get("location") in ["None", "null", "Unknown", ""]:
+        job["location"] = state.preferred_location if state.preferred_location else "India"
+
+    # 3. ENHANCED SALARY ESTIMATION - More accurate
+    salary = job.get("salary", "")
+    if not salary or salary in ["None", "null", "Not disclosed", "Competitive", "Unknown", ""]:
+        # Advanced fallback logic based on role and experience
+        title_lower = job.get("title", "").lower()
+        exp_level = state.experience_level.lower()
+
+        if any(word in title_lower for word in ["senior", "lead", "principal", "architect", "staff"]):
+             job["salary"] = "₹15L - ₹30L PA (Est.)"
+        elif any(word in title_lower for word in ["intern", "trainee", "graduate", "fresher"]):
+             job["salary"] = "₹2L - ₹6L PA (Est.)"
+        elif any(word in title_lower for word in ["manager", "director", "vp", "head"]):
+             job["salary"] = "₹20L - ₹45L PA (Est.)"
+        elif "entry" in exp_level or "junior" in title_lower:
+             job["salary"] = "₹3L - ₹8L PA (Est.)"
+        elif "senior" in exp_level:
+             job["salary"] = "₹12L - ₹25L PA (Est.)"
+        else:
+             job["salary"] = "₹5L - ₹15L PA (Est.)"
+
+    # 4. Description enhancement
+    if not job.get("description") or len(job.get("description")) < 20:
+        job["description"] = f"Exciting opportunity for a {job.get('title')} role at {job.get('company')}. This position offers growth potential and competitive benefits. Apply to learn more about the role requirements and responsibilities."
+
+    # 5. Ensure key_requirements and matching_skills are lists
+    if not job.get("key_requirements") or not isinstance(job.get("key_requirements"), list):
+        job["key_requirements"] = ["Relevant experience", "Strong communication skills", "Team collaboration"]
+
+    if not job.get("matching_skills") or not isinstance(job.get("matching_skills"), list):
+        # Try to match from user's core skills
+        matching = [skill for skill in state.core_skills if skill.lower() in job.get("title", "").lower() or skill.lower() in job.get("description", "").lower()]
+        job["matching_skills"] = matching[:3] if matching else ["Technical skills", "Problem solving"]
+
+    return job
+
 async def advanced_job_matcher_node(state: JobMatcherState) -> Dict:
     """
     Enhanced job matching with better parsing and validation
@@ -356,114 +427,57 @@ async def advanced_job_matcher_node(state: JobMatcherState) -> Dict:
     CRITICAL: Return ONLY valid JSON.
     """
     
-    response = await llm.ainvoke([
-        SystemMessage(content="You are a precision job data extractor. Return only valid JSON arrays."),
-        HumanMessage(content=matching_prompt)
-    ])
-    
+    # Jobs are validated as each array item finishes streaming, so a truncated
+    # response still yields every complete job before the cut
+    validated_jobs = []
     try:
-        content = response.content.strip()
-        
-        # Clean any markdown formatting
-        content = re.sub(r'```json\s*', '', content)
-        content = re.sub(r'```\s*', '', content)
-        content = content.strip()
-        
-        if not content or content in ["[]", "", "null"]:
-            print("⚠️ No jobs extracted from search results")
-            return {"matched_jobs": []}
-        
-        jobs_data = json.loads(content)
-        
-        if not isinstance(jobs_data, list):
-            print(f"❌ Response is not a list: {type(jobs_data)}")
-            return {"matched_jobs": []}
-        
-        # ENHANCED: Validate and enhance job data with strict quality checks
-        validated_jobs = []
-        for job in jobs_data:
-            # Validate required fields
-            if not all(key in job for key in ["title", "company", "apply_link"]):
+        async for job in matcher_llm().astream_items(
+            [
+                SystemMessage(content="You are a precision job data extractor. Return only valid JSON arrays."),
+                HumanMessage(content=matching_prompt)
+            ],
+            root="[",
+            validate=lambda content: parse_complete_json(content, expect=list) is not None
+        ):
+            if not isinstance(job, dict):
                 continue
-                
-            link = job.get("apply_link", "")
-            if not link.startswith("http"):
-                continue
-            
-            # PERFECT DATA CLEANUP - NO "NONE" VALUES ALLOWED
-            # 1. Company
-            if not job.get("company") or job.get("company") in ["None", "null", "Unknown", ""]:
-                # Try to extract from URL if company is missing
-                try:
-                    domain = link.split("/")[2].replace("www.", "").split(".")[0]
-                    job["company"] = domain.title()
-                except:
-                    job["company"] = "Hiring Company"
-
-            # 2. Location
-            if not job.get("location") or job.get("location") in ["None", "null", "Unknown", ""]:
-                job["location"] = state.preferred_location if state.preferred_location else "India"
-
-            # 3. ENHANCED SALARY ESTIMATION - More accurate
-            salary = job.get("salary", "")
-            if not salary or salary in ["None", "null", "Not disclosed", "Competitive", "Unknown", ""]:
-                # Advanced fallback logic based on role and experience
-                title_lower = job.get("title", "").lower()
-                exp_level = state.experience_level.lower()
-                
-                if any(word in title_lower for word in ["senior", "lead", "principal", "architect", "staff"]):
-                     job["salary"] = "₹15L - ₹30L PA (Est.)"
-                elif any(word in title_lower for word in ["intern", "trainee", "graduate", "fresher"]):
-                     job["salary"] = "₹2L - ₹6L PA (Est.)"
-                elif any(word in title_lower for word in ["manager", "director", "vp", "head"]):
-                     job["salary"] = "₹20L - ₹45L PA (Est.)"
-                elif "entry" in exp_level or "junior" in title_lower:
-                     job["salary"] = "₹3L - ₹8L PA (Est.)"
-                elif "senior" in exp_level:
-                     job["salary"] = "₹12L - ₹25L PA (Est.)"
-                else:
-                     job["salary"] = "₹5L - ₹15L PA (Est.)"
-            
-            # 4. Description enhancement
-            if not job.get("description") or len(job.get("description")) < 20:
-                job["description"] = f"Exciting opportunity for a {job.get('title')} role at {job.get('company')}. This position offers growth potential and competitive benefits. Apply to learn more about the role requirements and responsibilities."
-
-            # 5. Ensure key_requirements and matching_skills are lists
-            if not job.get("key_requirements") or not isinstance(job.get("key_requirements"), list):
-                job["key_requirements"] = ["Relevant experience", "Strong communication skills", "Team collaboration"]
-            
-            if not job.get("matching_skills") or not isinstance(job.get("matching_skills"), list):
-                # Try to match from user's core skills
-                matching = [skill for skill in state.core_skills if skill.lower() in job.get("title", "").lower() or skill.lower() in job.get("description", "").lower()]
-                job["matching_skills"] = matching[:3] if matching else ["Technical skills", "Problem solving"]
-
-            validated_jobs.append(job)
-        
-        print(f"✅ Successfully matched {len(validated_jobs)} validated jobs")
-        return {"matched_jobs": validated_jobs[:10]}  # Limit to top 10
-        
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON Parse Error: {e}")
-        return {"matched_jobs": []}
+            job = validate_job(job, state)
+            if job:
+                validated_jobs.append(job)
     except Exception as e:
         print(f"❌ Matching Error: {e}")
-        return {"matched_jobs": []}
-
-# --- ENHANCED GRAPH ---
-graph_builder = StateGraph(JobMatcherState)
-graph_builder.add_node("analyzer", advanced_resume_analyzer_node)
-graph_builder.add_node("searcher", intelligent_job_searcher_node)
-graph_builder.add_node("tools", ToolNode(tools=tools))
-graph_builder.add_node("matcher", advanced_job_matcher_node)
 
-graph_builder.add_edge(START, "analyzer")
-graph_builder.add_edge("analyzer", "searcher")
-graph_builder.add_conditional_edges("searcher", tools_condition, {"tools": "tools", "__end__": "matcher"})
-graph_builder.add_edge("tools", "matcher")
-graph_builder.add_edge("matcher", END)
+    if not validated_jobs:
+        print("⚠️ No jobs extracted from search results")
+    else:
+        print(f"✅ Successfully matched {len(validated_jobs)} validated jobs")
+    return {"matched_jobs": validated_jobs[:10]}  # Limit to top 10
 
-memory = MemorySaver()
-job_graph = graph_builder.compile(checkpointer=memory)
+# --- ENHANCED GRAPH ---
+_job_graph = None
+
+def get_job_graph():
+    """Compile the graph on first use so langgraph stays out of import time"""
+    global _job_graph
+    if _job_graph is None:
+        from langgraph.graph import StateGraph, START, END
+        from langgraph.prebuilt import ToolNode, tools_condition
+        from langgraph.checkpoint.memory import MemorySaver
+        graph_builder = StateGraph(JobMatcherState)
+        graph_builder.add_node("analyzer", instrument_node("job_matcher", "analyzer", advanced_resume_analyzer_node))
+        graph_builder.add_node("searcher", instrument_node("job_matcher", "searcher", intelligent_job_searcher_node))
+        graph_builder.add_node("tools", ToolNode(tools=tools))  # timed per call via upstream serper metrics
+        graph_builder.add_node("matcher", instrument_node("job_matcher", "matcher", advanced_job_matcher_node))
+
+        graph_builder.add_edge(START, "analyzer")
+        graph_builder.add_edge("analyzer", "searcher")
+        graph_builder.add_conditional_edges("searcher", tools_condition, {"tools": "tools", "__end__": "matcher"})
+        graph_builder.add_edge("tools", "matcher")
+        graph_builder.add_edge("matcher", END)
+
+        memory = MemorySaver()
+        _job_graph = graph_builder.compile(checkpointer=memory)
+    return _job_graph
 
 # --- ENHANCED API ROUTE ---
 @app.post("/upload-resume")
@@ -475,17 +489,18 @@ async def upload_resume(
     industry: str = Form("")
 ):
     try:
-        print(f"📄 Processing file: {file.filename}")
-        print(f"📍 Location: {location}")
-        print(f"💼 Job Type: {job_type}")
-        print(f"💰 Salary: {salary_expectation}")
-        print(f"🏢 Industry: {industry}")
+        # Form fields are debug detail; one structured line instead of a print per field
+        logger.debug("📄 Resume upload", extra={
+            "resume_file": file.filename, "location": location, "job_type": job_type,
+            "salary_expectation": salary_expectation, "industry": industry
+        })
         
         content = await file.read()
-        if file.filename.endswith(".pdf"):
-            text = extract_text_from_pdf(content)
-        else:
-            text = content.decode('utf-8', errors='ignore')
+        with stage_timer("job_matcher", "resume_extract"):
+            if file.filename.endswith(".pdf"):
+                text = extract_text_from_pdf(content)
+            else:
+                text = content.decode('utf-8', errors='ignore')
 
         if len(text.strip()) < 50:
             return {"success": False, "error": "Resume text is too short or could not be extracted"}
@@ -504,7 +519,7 @@ async def upload_resume(
         config = {"configurable": {"thread_id": f"job_{hash(text[:1000])}"}}
         
         print("🚀 Starting perfect job matching process...")
-        result = await job_graph.ainvoke(initial_state, config=config)
+        result = await get_job_graph().ainvoke(initial_state, config=config)
         
         return {
             "success": True,
@@ -534,7 +549,12 @@ async def upload_resume(
 async def root():
     return {"message": "Perfect Real Job Matcher API - Enhanced with LangGraph", "status": "running"}
 
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "job_matcher"}
+
 if __name__ == "__main__":
+    configure_logging("job_matcher")
     print("🚀 PERFECT Real Job Matcher running on port 8002")
     print("🔧 Features: Advanced prompts, multi-strategy search, perfect data handling")
     print("🇮🇳 Optimized for Indian job market with accurate salary estimation")
@@ -0,0 +1,222 @@
+# python-services/json_utils.py
+# Tolerant + incremental JSON parsing for LLM outputs
+
+import json
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?")
+_PRIMITIVE_CHARS = set("-+.0123456789eEtruefalsn")
+_CLOSERS = {"{": "}", "[": "]"}
+_NO_ITEM = object()  # "nothing emitted"; None is a valid item (JSON null)
+
+
+def strip_code_fences(text: str) -> str:
+    return _FENCE_RE.sub("", text or "").strip()
+
+
+class IncrementalJSONParser:
+    """
+    Character-level JSON scanner that can be fed streamed tokens.
+
+    `feed()` returns the items of one array as soon as each is complete: the
+    top-level array when `item_path` is empty, else the array reached through
+    those object keys, e.g. ("lessons",) for {"lessons": [...]}. `result()`
+    returns the whole document, repairing a truncated tail if needed.
+    """
+
+    def __init__(self, item_path: Sequence[str] = (), root: Optional[str] = None):
+        self.item_path = tuple(item_path)
+        self.root = root  # "{" or "[" to skip prose until that opener
+        self.text = ""
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._stack: List[List[Any]] = []  # [container char, expectation, current key]
+        self._in_string = False
+        self._string_start = 0
+        self._escape = False
+        self._string_is_key = False
+        self._primitive_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._safe_end: Optional[int] = None
+        self._safe_stack: Tuple[str, ...] = ()
+
+    @property
+    def complete(self) -> bool:
+        return self._root_end is not None
+
+    def feed(self, chunk: str) -> List[Any]:
+        self.text += chunk
+        items = []
+        text = self.text
+        while self._pos < len(text) and self._root_end is None:
+            item = self._step(text, self._pos)
+            if item is not _NO_ITEM:
+                items.append(item)
+        return items
+
+    def _step(self, text: str, i: int) -> Any:
+        c = text[i]
+        self._pos = i + 1
+
+        if self._root_start is None:
+            if c in "{[" and (self.root is None or c == self.root):
+                self._root_start = i
+                self._stack.append([c, "key" if c == "{" else "value", None])
+                self._mark_safe(i + 1)
+            return _NO_ITEM
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                if self._string_is_key:
+                    self._stack[-1][1] = "colon"
+                    try:
+                        self._stack[-1][2] = json.loads(text[self._string_start:i + 1])
+                    except ValueError:
+                        self._stack[-1][2] = None
+                else:
+                    return self._value_done(i + 1)
+            return _NO_ITEM
+
+        if self._primitive_start is not None:
+            if c in _PRIMITIVE_CHARS:
+                return _NO_ITEM
+            item = self._value_done(i)
+            self._primitive_start = None
+            self._pos = i  # re-process the delimiter
+            return item
+
+        if c.isspace():
+            return _NO_ITEM
+        if c == '"':
+            self._in_string = True
+            self._string_start = i
+            self._string_is_key = self._stack[-1][0] == "{" and self._stack[-1][1] == "key"
+            if not self._string_is_key:
+                self._begin_value(i)
+        elif c in "{[":
+            self._begin_value(i)
+            self._stack.append([c, "key" if c == "{" else "value", None])
+        elif c in "}]":
+            self._stack.pop()
+            if not self._stack:
+                self._root_end = i + 1
+                return _NO_ITEM
+            return self._value_done(i + 1)
+        elif c == ":":
+            self._stack[-1][1] = "value"
+        elif c == ",":
+            self._stack[-1][1] = "key" if self._stack[-1][0] == "{" else "value"
+        elif c in _PRIMITIVE_CHARS:
+            self._begin_value(i)
+            self._primitive_start = i
+        return _NO_ITEM
+
+    def _in_item_array(self) -> bool:
+        """The innermost container is the item array: every object above it is on its item_path key"""
+        stack = self._stack
+        if len(stack) != len(self.item_path) + 1 or stack[-1][0] != "[":
+            return False
+        return all(entry[0] == "{" and entry[2] == key for entry, key in zip(stack, self.item_path))
+
+    def _begin_value(self, i: int) -> None:
+        if self._in_item_array():
+            self._item_start = i
+
+    def _value_done(self, end: int) -> Any:
+        self._stack[-1][1] = "comma"
+        self._mark_safe(end)
+        if self._item_start is not None and self._in_item_array():
+            start, self._item_start = self._item_start, None
+            try:
+                return json.loads(self.text[start:end])
+            except ValueError:
+                return _NO_ITEM
+        return _NO_ITEM
+
+    def _mark_safe(self, end: int) -> None:
+        self._safe_end = end
+        self._safe_stack = tuple(entry[0] for entry in self._stack)
+
+    def result(self) -> Any:
+        """Parse the document seen so far; raises ValueError if nothing usable was found"""
+        if self._root_start is None:
+            raise ValueError("no JSON object or array found")
+        if self._root_end is not None:
+            body = self.text[self._root_start:self._root_end]
+            try:
+                return json.loads(body)
+            except ValueError:
+                return json.loads(_remove_trailing_commas(body))
+
+        # Truncated: cut back to the last complete value and close what is still open
+        body = self.text[self._root_start:self._safe_end]
+        closers = "".join(_CLOSERS[opener] for opener in reversed(self._safe_stack))
+        return json.loads(_remove_trailing_commas(body.rstrip().rstrip(",") + closers))
+
+
+def _remove_trailing_commas(text: str) -> str:
+    """Drop commas that directly precede a closing bracket, ignoring string contents"""
+    out = []
+    in_string = escape = False
+    for c in text:
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+        out.append(c)
+    return "".join(out)
+
+
+def parse_llm_json(text: str, expect: Optional[type] = None, default: Any = None) -> Any:
+    """
+    Parse JSON from an LLM response: tolerates code fences, leading/trailing
+    prose, trailing commas and truncated arrays/objects. Returns `default`
+    when the document's top level is not of the expected type (dict or list).
+    Use parse_complete_json to reject truncated responses.
+    """
+    return _parse(text, expect, default, complete_only=False)
+
+
+def parse_complete_json(text: str, expect: Optional[type] = None, default: Any = None) -> Any:
+    """
+    parse_llm_json without the truncation repair: a document cut off before its
+    closing bracket returns `default`. Cache-admission checks use this.
+    """
+    return _parse(text, expect, default, complete_only=True)
+
+
+def _parse(text: str, expect: Optional[type], default: Any, complete_only: bool) -> Any:
+    content = strip_code_fences(text)
+    try:
+        data = json.loads(content)
+    except ValueError:
+        parser = IncrementalJSONParser()
+        parser.feed(content)
+        if complete_only and not parser.complete:
+            return default
+        try:
+            data = parser.result()
+        except ValueError:
+            return default
+    if expect is not None and not isinstance(data, expect):
+        return default  # never dig a nested value of the right type out of the wrong one
+    return data
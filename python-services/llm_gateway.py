@@ -0,0 +1,509 @@
+# python-services/llm_gateway.py
+# Shared LLM call layer with exact-match + semantic prompt cache
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage
+
+from json_utils import IncrementalJSONParser
+from metrics import QUEUE_DEPTH, observe_upstream, record_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "llm_cache.sqlite3"))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+CACHE_MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "50000"))
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_ACCESS_FLUSH_SECONDS = float(os.getenv("LLM_CACHE_ACCESS_FLUSH_SECONDS", "30"))  # last_access write-back
+CACHE_PRUNE_SECONDS = float(os.getenv("LLM_CACHE_PRUNE_SECONDS", "600"))  # expired-row sweep
+SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_THRESHOLD = float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.93"))
+EMBEDDING_MODEL = os.getenv("LLM_EMBEDDING_MODEL", "models/text-embedding-004")
+
+
+def normalize_prompt(text: str) -> str:
+    """Collapse whitespace and case so cosmetic prompt differences share a key"""
+    return re.sub(r"\s+", " ", str(text)).strip().casefold()
+
+
+def _message_text(messages: List[Any]) -> str:
+    parts = []
+    for msg in messages:
+        role = getattr(msg, "type", "human")
+        content = getattr(msg, "content", msg)
+        parts.append(f"{role}:{normalize_prompt(content)}")
+    return "\n".join(parts)
+
+
+def _hash(*parts: Any) -> str:
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    In-memory LRU tier in front of a persistent SQLite store, both TTL-bound.
+    Disk hits only note their access time; those are written back in one batch every
+    CACHE_ACCESS_FLUSH_SECONDS (or with the next set), and the disk row count is kept
+    in memory, so a cache hit never commits. aget/aset keep disk I/O off the event loop.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = CACHE_TTL_SECONDS, max_disk_entries: int = CACHE_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.semantic_hits = 0
+        self._touched: Dict[str, float] = {}  # key -> last access not yet written to disk
+        self._flushed_at = time.time()
+        self._pruned_at = 0.0
+        self._disk_count = 0
+
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS prompt_cache ("
+                    "key TEXT PRIMARY KEY, namespace TEXT, value TEXT, "
+                    "expires_at REAL, last_access REAL)"
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS semantic_index ("
+                    "key TEXT PRIMARY KEY, scope TEXT, semantic_key TEXT, embedding BLOB)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS semantic_scope ON semantic_index(scope)")
+                self._db.commit()
+                self._disk_count = self._db.execute("SELECT COUNT(*) FROM prompt_cache").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Persistent LLM cache unavailable, using memory only: {e}")
+                self._db = None
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._touched[key] = now
+                return value
+            del self._entries[key]
+        return None
+
+    def _flush_due(self, now: float) -> bool:
+        return self._db is not None and bool(self._touched) and now - self._flushed_at >= CACHE_ACCESS_FLUSH_SECONDS
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            value = self._get_memory(key, now)
+            if value is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM prompt_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._touched[key] = now
+                    self._remember(key, row[1], row[0])
+                    value = row[0]
+            if self._flush_due(now):
+                self._flush_access(now)
+                self._db.commit()
+            return value
+
+    def flush_access(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._flush_access(time.time())
+                self._db.commit()
+
+    def set(self, key: str, value: str, namespace: str = "") -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO prompt_cache (key, namespace, value, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, namespace, value, expires_at, now),
+                ).rowcount
+                if inserted:
+                    self._disk_count += 1
+                else:
+                    self._db.execute(
+                        "UPDATE prompt_cache SET namespace = ?, value = ?, expires_at = ?, last_access = ? "
+                        "WHERE key = ?",
+                        (namespace, value, expires_at, now, key),
+                    )
+                self._touched.pop(key, None)
+                self._flush_access(now)
+                self._prune_disk(now)
+                self._db.commit()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for the event loop: memory hits return inline, disk reads run on a thread"""
+        now = time.time()
+        with self._lock:
+            value = self._get_memory(key, now)
+            flush = self._flush_due(now)
+        if value is None and self._db is not None:
+            return await asyncio.to_thread(self.get, key)
+        if flush:
+            await asyncio.to_thread(self.flush_access)
+        return value
+
+    async def aset(self, key: str, value: str, namespace: str = "") -> None:
+        await asyncio.to_thread(self.set, key, value, namespace)
+
+    def record(self, hit: bool, semantic: bool = False) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+                if semantic:
+                    self.semantic_hits += 1
+            else:
+                self.misses += 1
+        record_cache("llm_prompt", ("semantic_hit" if semantic else "hit") if hit else "miss")
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _flush_access(self, now: float) -> None:
+        """Write pending access times in one statement (caller holds the lock and commits)"""
+        if self._touched:
+            self._db.executemany("UPDATE prompt_cache SET last_access = ? WHERE key = ?",
+                                 [(at, key) for key, at in self._touched.items()])
+            self._touched.clear()
+        self._flushed_at = now
+
+    def _prune_disk(self, now: float) -> None:
+        """Sweep expired rows now and then, and LRU rows once over max_disk_entries"""
+        removed = 0
+        if now - self._pruned_at >= CACHE_PRUNE_SECONDS:
+            self._pruned_at = now
+            removed += self._db.execute("DELETE FROM prompt_cache WHERE expires_at <= ?", (now,)).rowcount
+            self._disk_count -= removed
+        if self._disk_count > self.max_disk_entries:
+            evicted = self._db.execute(
+                "DELETE FROM prompt_cache WHERE key IN ("
+                "SELECT key FROM prompt_cache ORDER BY last_access ASC LIMIT ?)",
+                (self._disk_count - self.max_disk_entries,),
+            ).rowcount
+            self._disk_count -= evicted
+            removed += evicted
+        if removed:
+            self._db.execute("DELETE FROM semantic_index WHERE key NOT IN (SELECT key FROM prompt_cache)")
+
+    # --- Semantic index persistence ---
+    def load_semantic(self, scope: str) -> List[tuple]:
+        if self._db is None:
+            return []
+        with self._lock:
+            return self._db.execute(
+                "SELECT key, semantic_key, embedding FROM semantic_index WHERE scope = ?", (scope,)
+            ).fetchall()
+
+    def save_semantic(self, key: str, scope: str, semantic_key: str, embedding: bytes) -> None:
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO semantic_index (key, scope, semantic_key, embedding) VALUES (?, ?, ?, ?)",
+                (key, scope, semantic_key, embedding),
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._entries),
+        }
+
+
+class SemanticIndex:
+    """Embedding similarity over past semantic keys, bucketed by prompt scope"""
+
+    def __init__(self, cache: PromptCache, threshold: float = SEMANTIC_THRESHOLD):
+        import numpy as np  # only needed when the semantic cache is switched on
+        self._np = np
+        self.cache = cache
+        self.threshold = threshold
+        self._embedder = None
+        self._scopes: Dict[str, List[tuple]] = {}
+        self._vectors: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_embedder(self):
+        if self._embedder is None:
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            self._embedder = GoogleGenerativeAIEmbeddings(
+                model=EMBEDDING_MODEL, google_api_key=os.getenv("GOOGLE_API_KEY")
+            )
+        return self._embedder
+
+    def _normalized(self, raw):
+        vector = self._np.asarray(raw, dtype=self._np.float32)
+        return vector / (self._np.linalg.norm(vector) + 1e-8)
+
+    def embed(self, text: str):
+        return self._normalized(self._get_embedder().embed_query(normalize_prompt(text)))
+
+    async def aembed(self, text: str):
+        """embed() for the async path; the embedding request does not block the event loop"""
+        return self._normalized(await self._get_embedder().aembed_query(normalize_prompt(text)))
+
+    def _bucket(self, scope: str):
+        with self._lock:
+            if scope not in self._scopes:
+                rows = self.cache.load_semantic(scope)
+                self._scopes[scope] = [(key, sk) for key, sk, _ in rows]
+                self._vectors[scope] = (
+                    self._np.stack([self._np.frombuffer(blob, dtype=self._np.float32) for _, _, blob in rows])
+                    if rows else None
+                )
+            return self._scopes[scope], self._vectors[scope]
+
+    def lookup(self, scope: str, vector) -> Optional[str]:
+        keys, matrix = self._bucket(scope)
+        if matrix is None:
+            return None
+        scores = matrix @ vector
+        order = self._np.argsort(-scores)
+        for idx in order:
+            if scores[idx] < self.threshold:
+                break
+            key, semantic_key = keys[idx]
+            value = self.cache.get(key)
+            if value is not None:
+                logger.info(f"🧲 Semantic cache hit ({scores[idx]:.3f}) via '{semantic_key}'")
+                return value
+        return None
+
+    def add(self, scope: str, key: str, semantic_key: str, vector) -> None:
+        self._bucket(scope)
+        with self._lock:
+            self._scopes[scope].append((key, semantic_key))
+            current = self._vectors[scope]
+            row = vector[None, :]
+            self._vectors[scope] = row if current is None else self._np.vstack([current, row])
+        self.cache.save_semantic(key, scope, semantic_key, vector.astype(self._np.float32).tobytes())
+
+
+class LLMGateway:
+    """Single entry point for chat-model calls across the agent services"""
+
+    def __init__(self, llm, namespace: str = "default", cache: Optional[PromptCache] = None,
+                 semantic: Optional[SemanticIndex] = None):
+        self.llm = llm
+        self.namespace = namespace
+        self.cache = cache if cache is not None else get_prompt_cache()
+        self.semantic = semantic if semantic is not None else get_semantic_index()
+        self.model = getattr(llm, "model", None) or getattr(llm, "model_name", "") or type(llm).__name__
+        self.temperature = getattr(llm, "temperature", None)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _call(self, messages: List[Any]):
+        with QUEUE_DEPTH.track(queue="llm_upstream"), observe_upstream("gemini", self.namespace):
+            return await self.llm.ainvoke(messages)
+
+    def _call_sync(self, messages: List[Any]):
+        with QUEUE_DEPTH.track(queue="llm_upstream"), observe_upstream("gemini", self.namespace):
+            return self.llm.invoke(messages)
+
+    def cache_key(self, messages: List[Any]) -> str:
+        return _hash(self.model, self.temperature, _message_text(messages))
+
+    def _semantic_scope(self, messages: List[Any], semantic_key: str, semantic_scope: Optional[str]) -> str:
+        if semantic_scope:
+            template = semantic_scope
+        else:
+            # The prompt with the topic masked out identifies "the same question about another topic"
+            template = _message_text(messages).replace(normalize_prompt(semantic_key), "{topic}")
+        return _hash(self.namespace, self.model, self.temperature, template)
+
+    def _record_exact(self, value: Optional[str], semantic_key) -> Optional[str]:
+        """Records an exact-match hit, or the miss when no semantic lookup follows"""
+        if value is not None:
+            self.cache.record(hit=True)
+        elif not (self.semantic and semantic_key):
+            self.cache.record(hit=False)
+        return value
+
+    def _lookup_semantic(self, scope: str, vector):
+        if vector is None:
+            self.cache.record(hit=False)
+            return None, None, None
+        value = self.semantic.lookup(scope, vector)
+        self.cache.record(hit=value is not None, semantic=True)
+        return value, scope, vector
+
+    def _lookup(self, key: str, messages, semantic_key, semantic_scope):
+        value = self._record_exact(self.cache.get(key), semantic_key)
+        if value is not None or not (self.semantic and semantic_key):
+            return value, None, None
+        try:
+            vector = self.semantic.embed(semantic_key)
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache embedding failed: {e}")
+            vector = None
+        return self._lookup_semantic(self._semantic_scope(messages, semantic_key, semantic_scope), vector)
+
+    async def _alookup(self, key: str, messages, semantic_key, semantic_scope):
+        value = self._record_exact(await self.cache.aget(key), semantic_key)
+        if value is not None or not (self.semantic and semantic_key):
+            return value, None, None
+        try:
+            vector = await self.semantic.aembed(semantic_key)
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache embedding failed: {e}")
+            vector = None
+        # Candidates are read through the disk tier, so the lookup runs on a thread
+        return await asyncio.to_thread(
+            self._lookup_semantic, self._semantic_scope(messages, semantic_key, semantic_scope), vector
+        )
+
+    def _store(self, key: str, response, semantic_key, scope, vector, validate=None) -> None:
+        content = getattr(response, "content", None)
+        if not isinstance(content, str) or not content.strip() or getattr(response, "tool_calls", None):
+            return
+        if validate is not None and not validate(content):
+            return
+        self.cache.set(key, content, self.namespace)
+        if self.semantic and semantic_key and scope is not None and vector is not None:
+            self.semantic.add(scope, key, semantic_key, vector)
+
+    async def ainvoke(self, messages: List[Any], semantic_key: Optional[str] = None,
+                      semantic_scope: Optional[str] = None, use_cache: bool = True,
+                      validate: Optional[Callable[[str], bool]] = None):
+        """Cached llm.ainvoke; `validate` keeps malformed responses out of the cache"""
+        if not use_cache:
+            return await self._call(messages)
+
+        key = self.cache_key(messages)
+        value, scope, vector = await self._alookup(key, messages, semantic_key, semantic_scope)
+        if value is not None:
+            return AIMessage(content=value)
+
+        # Coalesce identical concurrent prompts onto one upstream call
+        while (pending := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this caller was cancelled, not the leader
+                # The leader was cancelled; a waiter takes over the call
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._call(messages)
+            await asyncio.to_thread(self._store, key, response, semantic_key, scope, vector, validate)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            # Cancellation too: waiters on a never-resolved future would hang forever
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def astream_items(self, messages: List[Any], item_path: Sequence[str] = (), root: Optional[str] = None,
+                            validate: Optional[Callable[[str], bool]] = None):
+        """Yield JSON array items as the model streams them; cached responses replay at once"""
+        key = self.cache_key(messages)
+        parser = IncrementalJSONParser(item_path=item_path, root=root)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            self.cache.record(hit=True)
+            for item in parser.feed(cached):
+                yield item
+            return
+
+        self.cache.record(hit=False)
+        chunks = []
+        with QUEUE_DEPTH.track(queue="llm_upstream"), observe_upstream("gemini", f"{self.namespace}.stream"):
+            async for chunk in self.llm.astream(messages):
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                chunks.append(text)
+                for item in parser.feed(text):
+                    yield item
+        await asyncio.to_thread(self._store, key, AIMessage(content="".join(chunks)), None, None, None, validate)
+
+    def invoke(self, messages: List[Any], semantic_key: Optional[str] = None,
+               semantic_scope: Optional[str] = None, use_cache: bool = True,
+               validate: Optional[Callable[[str], bool]] = None):
+        if not use_cache:
+            return self._call_sync(messages)
+
+        key = self.cache_key(messages)
+        value, scope, vector = self._lookup(key, messages, semantic_key, semantic_scope)
+        if value is not None:
+            return AIMessage(content=value)
+
+        response = self._call_sync(messages)
+        self._store(key, response, semantic_key, scope, vector, validate)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+_prompt_cache: Optional[PromptCache] = None
+_semantic_index: Optional[SemanticIndex] = None
+_singleton_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache:
+    """Process-wide prompt cache shared by every gateway"""
+    global _prompt_cache
+    with _singleton_lock:
+        if _prompt_cache is None:
+            _prompt_cache = PromptCache()
+        return _prompt_cache
+
+
+def set_prompt_cache(cache: PromptCache) -> None:
+    """Swap the process-wide prompt cache (benchmarks use an in-memory one)"""
+    global _prompt_cache
+    with _singleton_lock:
+        _prompt_cache = cache
+
+
+def get_semantic_index() -> Optional[SemanticIndex]:
+    """Process-wide semantic index, or None when LLM_SEMANTIC_CACHE is off"""
+    global _semantic_index
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    cache = get_prompt_cache()
+    with _singleton_lock:
+        if _semantic_index is None:
+            _semantic_index = SemanticIndex(cache)
+        return _semantic_index
@@ -0,0 +1,193 @@
+# python-services/media_fetcher.py
+# Shared fetcher for stored media (Cloudinary photos and recordings)
+#
+# - one pooled keep-alive requests.Session per process, so repeat fetches reuse TLS connections
+# - streamed reads capped at MEDIA_MAX_MB (Content-Length checked first, then the running total)
+# - content-addressed disk cache: blobs/<sha256> holds the bytes, urls/<sha256(url)>.json the
+#   ETag / Last-Modified validators and which blob the URL resolved to
+#
+# A URL fetched within MEDIA_CACHE_FRESH_SECONDS is served from disk with no request at all;
+# after that it is revalidated with If-None-Match / If-Modified-Since, and a 304 costs one
+# round trip with no body. Identical media under different URLs is stored once.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from io import BytesIO
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import observe_upstream, record_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "media"))  # "" disables
+MEDIA_CACHE_FRESH_SECONDS = float(os.getenv("MEDIA_CACHE_FRESH_SECONDS", "3600"))
+MEDIA_CACHE_MAX_MB = float(os.getenv("MEDIA_CACHE_MAX_MB", "2048"))
+MEDIA_MAX_BYTES = int(float(os.getenv("MEDIA_MAX_MB", "25")) * 1024 * 1024)
+MEDIA_POOL_SIZE = int(os.getenv("MEDIA_POOL_SIZE", "32"))
+MEDIA_TIMEOUT = (float(os.getenv("MEDIA_CONNECT_TIMEOUT", "5")), float(os.getenv("MEDIA_READ_TIMEOUT", "30")))
+
+_CHUNK_BYTES = 64 * 1024
+
+
+class MediaTooLarge(ValueError):
+    """The response is bigger than the fetcher's max_bytes"""
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class MediaFetcher:
+    """Pooled, size-capped GETs with conditional revalidation and a content-addressed disk cache"""
+
+    def __init__(self, cache_dir: Optional[str] = MEDIA_CACHE_DIR, max_bytes: int = MEDIA_MAX_BYTES,
+                 fresh_seconds: float = MEDIA_CACHE_FRESH_SECONDS, max_cache_mb: float = MEDIA_CACHE_MAX_MB,
+                 pool_size: int = MEDIA_POOL_SIZE):
+        self.cache_dir = cache_dir or None
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.max_cache_bytes = int(max_cache_mb * 1024 * 1024)
+
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._cache_bytes = 0
+        if self.cache_dir:
+            os.makedirs(os.path.join(self.cache_dir, "blobs"), exist_ok=True)
+            os.makedirs(os.path.join(self.cache_dir, "urls"), exist_ok=True)
+            self._cache_bytes = sum(entry.stat().st_size for entry in os.scandir(os.path.join(self.cache_dir, "blobs")))
+
+    # --- Disk cache ---
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, "urls", _sha256(url.encode("utf-8")) + ".json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", digest)
+
+    def _cached(self, url: str):
+        """(url entry, blob bytes) or (None, None) when the URL or its blob is not on disk"""
+        try:
+            with open(self._url_path(url)) as f:
+                entry = json.load(f)
+            with open(self._blob_path(entry["digest"]), "rb") as f:
+                return entry, f.read()
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def _store(self, url: str, body: bytes, headers) -> None:
+        digest = _sha256(body)
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            _write_atomic(blob_path, body)
+            with self._lock:
+                self._cache_bytes += len(body)
+                over = self._cache_bytes > self.max_cache_bytes
+            if over:
+                self._evict()
+        entry = {"digest": digest, "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+                 "size": len(body), "checked_at": time.time()}
+        _write_atomic(self._url_path(url), json.dumps(entry).encode("utf-8"))
+
+    def _touch(self, url: str, entry: dict) -> None:
+        entry["checked_at"] = time.time()
+        _write_atomic(self._url_path(url), json.dumps(entry).encode("utf-8"))
+
+    def _evict(self) -> None:
+        """Delete least recently written blobs until the cache is 10% under its cap"""
+        blobs = sorted(os.scandir(os.path.join(self.cache_dir, "blobs")), key=lambda entry: entry.stat().st_mtime)
+        target = self.max_cache_bytes * 0.9
+        with self._lock:
+            for blob in blobs:
+                if self._cache_bytes <= target:
+                    break
+                try:
+                    size = blob.stat().st_size
+                    os.remove(blob.path)
+                    self._cache_bytes -= size
+                except OSError:
+                    pass
+        # URL entries pointing at evicted blobs are treated as misses by _cached
+
+    # --- Fetch ---
+    def _read_capped(self, response) -> bytes:
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise MediaTooLarge(f"Media is {int(declared)} bytes, limit is {self.max_bytes}")
+        buffer = bytearray()
+        for chunk in response.iter_content(_CHUNK_BYTES):
+            buffer += chunk
+            if len(buffer) > self.max_bytes:
+                raise MediaTooLarge(f"Media exceeds the {self.max_bytes} byte limit")
+        return bytes(buffer)
+
+    def fetch(self, url: str, operation: str = "download") -> BytesIO:
+        """Bytes at url: from disk while fresh, revalidated (304) once stale, downloaded otherwise"""
+        entry, body = self._cached(url) if self.cache_dir else (None, None)
+        if entry is not None and time.time() - entry.get("checked_at", 0) < self.fresh_seconds:
+            record_cache("media", "hit")
+            return BytesIO(body)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with observe_upstream("cloudinary", operation):
+            with self.session.get(url, headers=headers, timeout=MEDIA_TIMEOUT, stream=True) as response:
+                if response.status_code == 304 and entry is not None:
+                    record_cache("media", "revalidated")
+                    self._touch(url, entry)
+                    return BytesIO(body)
+                response.raise_for_status()
+                fetched = self._read_capped(response)
+
+        record_cache("media", "miss")
+        if self.cache_dir:
+            try:
+                self._store(url, fetched, response.headers)
+            except OSError as e:
+                logger.warning(f"⚠️ Media cache write failed: {e}")
+        return BytesIO(fetched)
+
+
+_media_fetcher: Optional[MediaFetcher] = None
+_singleton_lock = threading.Lock()
+
+
+def get_media_fetcher() -> MediaFetcher:
+    """Process-wide fetcher shared by the face and voice services"""
+    global _media_fetcher
+    with _singleton_lock:
+        if _media_fetcher is None:
+            _media_fetcher = MediaFetcher()
+        return _media_fetcher
+
+
+def set_media_fetcher(fetcher: MediaFetcher) -> None:
+    """Swap the process-wide fetcher (benchmarks use an uncached one)"""
+    global _media_fetcher
+    with _singleton_lock:
+        _media_fetcher = fetcher
@@ -0,0 +1,364 @@
+# python-services/metrics.py
+# Dependency-free Prometheus-style metrics shared by the Flask and FastAPI services
+#
+# Every service exposes GET /metrics in the Prometheus text format. Metrics live in
+# one process-wide registry, so in agent_gateway.py mode the four agent apps share
+# it and are told apart by the `service` label. Each gateway worker process keeps
+# its own registry.
+
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for cached lookups (ms) through full LLM pipelines (minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTE_BUCKETS = (16e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """Evaluate `function` at scrape time instead of tracking the value"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress (in-flight requests, queue depth)"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                values[key] = float(function())
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            snapshot = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- SHARED METRICS ---
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled", ("service", "method", "path", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("service", "method", "path"))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("service",))
+STAGE_LATENCY = REGISTRY.histogram(
+    "stage_duration_seconds", "Latency of LangGraph nodes and verification pipeline stages", ("service", "stage"))
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external services",
+    ("upstream", "operation", "outcome"))
+MODEL_INFERENCE = REGISTRY.histogram(
+    "model_inference_seconds", "Local model inference time", ("model", "operation"))
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Cache lookups by result", ("cache", "result"))
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "cache_hit_ratio", "Share of cache lookups served from the cache", ("cache",))
+QUEUE_DEPTH = REGISTRY.gauge(
+    "queue_depth", "Work items waiting or in progress", ("queue",))
+REQUEST_BYTES = REGISTRY.histogram(
+    "http_request_body_bytes", "Request body size by upload encoding", ("service", "encoding"), buckets=BYTE_BUCKETS)
+
+_HIT_RESULTS = ("hit", "semantic_hit", "stale", "revalidated")
+_ratio_caches = set()
+
+
+def _hit_ratio(cache: str) -> float:
+    hits = total = 0.0
+    for (name, result), value in CACHE_REQUESTS.items():
+        if name == cache:
+            total += value
+            if result in _HIT_RESULTS:
+                hits += value
+    return hits / total if total else 0.0
+
+
+def record_cache(cache: str, result: str) -> None:
+    """Count a lookup; result is "hit", "semantic_hit", "stale", "revalidated" (HTTP 304) or "miss" """
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+    if cache not in _ratio_caches:
+        _ratio_caches.add(cache)
+        CACHE_HIT_RATIO.set_function(functools.partial(_hit_ratio, cache), cache=cache)
+
+
+@contextmanager
+def observe_upstream(upstream: str, operation: str):
+    """Time an external call; failures are recorded with outcome="error" and re-raised"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started,
+                                 upstream=upstream, operation=operation, outcome=outcome)
+
+
+def stage_timer(service: str, stage: str):
+    return STAGE_LATENCY.time(service=service, stage=stage)
+
+
+def instrument_node(service: str, name: str, node: Callable) -> Callable:
+    """Wrap a sync or async LangGraph node so its duration lands in stage_duration_seconds"""
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state, *args, **kwargs):
+            with STAGE_LATENCY.time(service=service, stage=name):
+                return await node(state, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        with STAGE_LATENCY.time(service=service, stage=name):
+            return node(state, *args, **kwargs)
+    return wrapper
+
+
+# --- FRAMEWORK HOOKS ---
+class MetricsMiddleware:
+    """Plain ASGI middleware: request counts, latency per route template, in-flight gauge"""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(service=self.service)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(service=self.service)
+            # The router stores the matched route in the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(time.perf_counter() - started, service=self.service, method=method, path=path)
+            HTTP_REQUESTS.inc(service=self.service, method=method, path=path, status=str(status["code"]))
+
+
+async def metrics_endpoint(request):
+    from starlette.responses import Response
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def instrument_fastapi(app, service: str) -> None:
+    """Add request metrics and GET /metrics to a FastAPI/Starlette app"""
+    app.add_middleware(MetricsMiddleware, service=service)
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
+
+def instrument_flask(app, service: str) -> None:
+    """Add request metrics and GET /metrics to a Flask app"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(service=service)
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            path = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - started, service=service, method=request.method, path=path)
+            HTTP_REQUESTS.inc(service=service, method=request.method, path=path, status=str(response.status_code))
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc):
+        HTTP_IN_FLIGHT.dec(service=service)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_view():
+        return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
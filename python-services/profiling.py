@@ -0,0 +1,224 @@
+# python-services/profiling.py
+# Opt-in per-request stage breakdown and sampled profiler dumps for the verification services
+#
+#   curl -H "X-Profile: 1" ...  /verify        # or /verify?profile=1
+#   -> response JSON gains "profile": {"stages_ms": {...}, "total_ms": ...}
+#      plus a standard Server-Timing header
+#
+#   PROFILE_SAMPLE_RATE=0.01   dump a full profile for 1% of requests (default 0 = never)
+#   PROFILE_DIR=.profiles      where dumps are written
+#   PROFILER=cprofile          or pyinstrument (if installed)
+#
+# stage() always feeds stage_duration_seconds in /metrics. The per-request breakdown
+# costs one ContextVar lookup per stage when the request did not ask for it.
+
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import STAGE_LATENCY
+from structured_logging import get_request_id
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, ".profiles"))
+PROFILER = os.getenv("PROFILER", "cprofile").lower()
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+
+class RequestProfile:
+    """Stage timings collected for one request"""
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages.append((name, seconds))
+
+    def breakdown(self) -> Dict:
+        totals: Dict[str, float] = {}
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return {
+            "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in totals.items()},
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+        }
+
+    def server_timing(self) -> str:
+        breakdown = self.breakdown()
+        parts = [f"{name};dur={ms}" for name, ms in breakdown["stages_ms"].items()]
+        parts.append(f"total;dur={breakdown['total_ms']}")
+        return ", ".join(parts)
+
+
+_profile_var: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("request_profile", default=None)
+
+
+class stage:
+    """
+    Time one pipeline stage: always into /metrics, and into the request's
+    breakdown when profiling was requested. Repeated stages are summed.
+    """
+
+    __slots__ = ("service", "name", "started")
+
+    def __init__(self, service: str, name: str):
+        self.service = service
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        STAGE_LATENCY.observe(elapsed, service=self.service, stage=self.name)
+        profile = _profile_var.get()
+        if profile is not None:
+            profile.add(self.name, elapsed)
+        return False
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _profile_var.get()
+
+
+@contextmanager
+def collect():
+    """Collect a stage breakdown for code running outside a request (benchmarks, scripts)"""
+    profile = RequestProfile()
+    token = _profile_var.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile_var.reset(token)
+
+
+def run_parallel(executor, *calls: Callable[[], Any]) -> List[Any]:
+    """
+    Run calls concurrently, the last one on the calling thread, and return their results in
+    order. Workers keep the caller's request id and profile, so their stages still land in
+    the request's breakdown (where parallel stages overlap, stages_ms can exceed total_ms).
+    The first failure in argument order is re-raised once every call has finished.
+    executor=None runs the calls one after another.
+    """
+    if executor is None:
+        return [call() for call in calls]
+    futures = [executor.submit(contextvars.copy_context().run, call) for call in calls[:-1]]
+    outcomes = []
+    try:
+        last = (True, calls[-1]())
+    except Exception as e:
+        last = (False, e)
+    for future in futures:
+        try:
+            outcomes.append((True, future.result()))
+        except Exception as e:
+            outcomes.append((False, e))
+    outcomes.append(last)
+    for ok, value in outcomes:
+        if not ok:
+            raise value
+    return [value for _, value in outcomes]
+
+
+def _start_profiler():
+    """Return a started profiler object, or None if one cannot run in this thread"""
+    try:
+        if PROFILER == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except Exception as e:  # another profiler active, pyinstrument missing, ...
+        logger.warning(f"⚠️ Request profiler unavailable: {e}")
+        return None
+
+
+def _stop_profiler(profiler) -> None:
+    if PROFILER == "pyinstrument":
+        profiler.stop()
+    else:
+        profiler.disable()
+
+
+def _dump_profiler(profiler, service: str, label: str) -> Optional[str]:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # label carries client input (the request id); only [A-Za-z0-9_-] reaches the filename
+    label = re.sub(r"[^A-Za-z0-9_-]+", "_", label)[:80]
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+    try:
+        _stop_profiler(profiler)
+        if PROFILER == "pyinstrument":
+            path = os.path.join(PROFILE_DIR, f"{service}-{stamp}-{label}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        else:
+            path = os.path.join(PROFILE_DIR, f"{service}-{stamp}-{label}.prof")
+            profiler.dump_stats(path)
+        logger.info(f"🧪 Profile written to {path}")
+        return path
+    except Exception as e:
+        logger.warning(f"⚠️ Could not write profile: {e}")
+        return None
+
+
+def install_profiling_flask(app, service: str) -> None:
+    """Enable ?profile=1 / X-Profile breakdowns and sampled profiler dumps on a Flask app"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_profile():
+        flag = request.headers.get(PROFILE_HEADER) or request.args.get("profile")
+        if flag and flag.lower() in _TRUTHY:
+            g._profile_token = _profile_var.set(RequestProfile())
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            g._profiler = _start_profiler()
+
+    @app.after_request
+    def _attach_request_profile(response):
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            _dump_profiler(profiler, service, f"{request.endpoint or 'request'}-{get_request_id()}")
+
+        profile = _profile_var.get()
+        if profile is None:
+            return response
+        response.headers["Server-Timing"] = profile.server_timing()
+        if response.is_json:
+            body = response.get_json(silent=True)
+            if isinstance(body, dict):
+                body["profile"] = profile.breakdown()
+                response.set_data(json.dumps(body))
+        return response
+
+    @app.teardown_request
+    def _clear_request_profile(exc):
+        token = g.pop("_profile_token", None)
+        if token is not None:
+            _profile_var.reset(token)
+        profiler = g.pop("_profiler", None)  # request failed before after_request
+        if profiler is not None:
+            try:
+                _stop_profiler(profiler)
+            except Exception:
+                pass
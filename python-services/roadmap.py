@@ -1,15 +1,22 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any, TypedDict
-from langgraph.graph import StateGraph, START, END
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import List, Dict, Any, Tuple, TypedDict, Annotated
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_community.utilities import GoogleSerperAPIWrapper
 import os
 import json
+import asyncio
+import hashlib
+import time
+import operator
 import uvicorn
 from dotenv import load_dotenv
+from llm_gateway import LLMGateway, get_prompt_cache, normalize_prompt
+from agent_clients import get_gateway, get_serper
+from json_utils import parse_complete_json, parse_llm_json
+from catalog import Catalog
+from structured_logging import configure_logging, install_request_id_fastapi
+from metrics import STAGE_LATENCY, instrument_fastapi, observe_upstream, record_cache
 
 load_dotenv()
 
@@ -26,13 +33,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_fastapi(app, "roadmap")
+install_request_id_fastapi(app)
 
-serper = GoogleSerperAPIWrapper()
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite", 
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.2
-)
+# Clients are created on first use (see agent_clients) to keep import time low
+def roadmap_llm() -> LLMGateway:
+    return get_gateway("roadmap", temperature=0.2)
 
 # --- STATE ---
 class RoadmapState(TypedDict):
@@ -41,109 +47,260 @@ class RoadmapState(TypedDict):
     research_data: str
     structure_json: List[Dict]
     final_roadmap: Dict
+    timings: Annotated[Dict[str, float], operator.or_]
+    degraded: Annotated[bool, operator.or_]  # some part fell back to an outline
+
+def timed_node(name: str, node):
+    """Wrap a node so its wall-clock duration lands in state['timings'] and /metrics"""
+    async def wrapper(state: RoadmapState) -> Dict:
+        started = time.perf_counter()
+        update = await node(state)
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.observe(elapsed, service="roadmap", stage=name)
+        update["timings"] = {name: round(elapsed, 3)}
+        return update
+    return wrapper
+
+# --- RESEARCH CACHE ---
+def research_query(state: RoadmapState) -> str:
+    return f"Best structured curriculum roadmap for {state['topic']} {state['level']} with official documentation links"
+
+def research_key(query: str) -> str:
+    return "research:" + hashlib.sha256(normalize_prompt(query).encode("utf-8")).hexdigest()
 
 # --- NODES ---
+# researcher and architect start together: the architect drafts from the topic alone
+# (or from cached research) while the search is in flight, and the writer refines
+# each phase with the research once both branches have joined.
 
 async def researcher_node(state: RoadmapState) -> Dict:
+    query = research_query(state)
+    key = research_key(query)
+    cached = await get_prompt_cache().aget(key)
+    if cached is not None:
+        record_cache("research", "hit")
+        print(f"📚 Research cache hit: {state['topic']}")
+        return {"research_data": cached}
+
+    record_cache("research", "miss")
     print(f"🕵️‍♂️ Researching: {state['topic']}")
-    query = f"Best structured curriculum roadmap for {state['topic']} {state['level']} with official documentation links"
-    results = serper.run(query)
+    try:
+        with observe_upstream("serper", "roadmap.research"):
+            results = await get_serper().arun(query)
+    except Exception as e:
+        print(f"❌ Research Error: {e}")
+        return {"research_data": ""}
+    if results:
+        await get_prompt_cache().aset(key, results, "research")
     return {"research_data": results}
 
 async def architect_node(state: RoadmapState) -> Dict:
-    print("🏗️ Designing Architecture...")
+    research = await get_prompt_cache().aget(research_key(research_query(state)))
+    if research:
+        print("🏗️ Designing Architecture from cached research...")
+        research_hint = f"Use this research: {research[:3000]}"
+    else:
+        print("🏗️ Drafting Architecture from topic (research in flight)...")
+        research_hint = "Base it on the official documentation and industry-standard curricula."
+
     prompt = f"""
     Design a professional learning path for "{state['topic']}".
-    Use this research: {state['research_data'][:3000]}
+    {research_hint}
     
     Create 4-6 distinct PHASES.
     Return ONLY valid JSON:
     [ {{ "phase_title": "Phase 1: ...", "topics": ["Topic A", "Topic B"] }} ]
     """
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    response = await roadmap_llm().ainvoke(
+        [HumanMessage(content=prompt)],
+        semantic_key=state['topic'],
+        semantic_scope=f"roadmap.architect:{state['level']}",
+        validate=lambda content: bool(parse_complete_json(content, expect=list))
+    )
+    structure = parse_llm_json(response.content, expect=list)
+    if not structure:
+        return {"structure_json": [{"phase_title": "Core Foundations", "topics": ["Introduction"]}], "degraded": True}
+    return {"structure_json": structure}
+
+WRITER_CONCURRENCY = int(os.getenv("ROADMAP_WRITER_CONCURRENCY", "4"))
+WRITER_MAX_ATTEMPTS = int(os.getenv("ROADMAP_WRITER_MAX_ATTEMPTS", "3"))
+WRITER_BACKOFF_SECONDS = float(os.getenv("ROADMAP_WRITER_BACKOFF_SECONDS", "1"))  # doubled per upstream error
+
+def _parse_phase(content: str, parse=parse_llm_json) -> Dict:
+    phase = parse(content, expect=dict)
+    if not isinstance(phase, dict) or not isinstance(phase.get("steps"), list) or not phase["steps"]:
+        raise ValueError("phase JSON has no steps")
+    return phase
+
+def _is_valid_phase(content: str) -> bool:
     try:
-        content = response.content.replace("```json", "").replace("```", "").strip()
-        return {"structure_json": json.loads(content)}
-    except:
-        return {"structure_json": [{"phase_title": "Core Foundations", "topics": ["Introduction"]}]}
+        _parse_phase(content, parse_complete_json)  # a truncated phase is used once, never cached
+        return True
+    except Exception:
+        return False
 
-async def writer_node(state: RoadmapState) -> Dict:
-    print("✍️ Writing Detailed Content with Links...")
-    structure = json.dumps(state["structure_json"])
-    
+def _fallback_phase(phase: Dict, index: int) -> Dict:
+    """Skeleton built from the architect's structure when a phase can't be expanded"""
+    return {
+        "title": phase.get("phase_title", f"Phase {index + 1}"),
+        "duration": "2 Weeks",
+        "steps": [
+            {"title": topic, "details": f"Study {topic}.", "resources": []}
+            for topic in phase.get("topics", []) or ["Core Concepts"]
+        ]
+    }
+
+async def expand_phase(state: RoadmapState, phase: Dict, index: int, semaphore: asyncio.Semaphore) -> Tuple[Dict, bool]:
+    """(phase, degraded) where degraded means the outline fallback was used"""
     prompt = f"""
-    You are a Technical Lead. Expand this structure into a detailed roadmap.
+    You are a Technical Lead. Expand ONE phase of a "{state['topic']}" roadmap into detailed steps.
     
-    Structure: {structure}
+    Phase {index + 1} of {len(state['structure_json'])}: {json.dumps(phase)}
     Topic: {state['topic']}
     
+    Research (prefer links from here when relevant; refine the phase if it reveals gaps):
+    {state['research_data'][:1500]}
+    
     CRITICAL INSTRUCTION FOR RESOURCES:
     Provide REAL, DIRECT URLs to official documentation, high-quality articles, or specific courses. 
     Do NOT provide generic strings like "Search Google". 
     If you know the official docs (e.g. React Docs, MDN, Python Docs), provide that specific URL.
     
-    Return strict JSON:
+    Return strict JSON for this phase only:
     {{
-        "title": "Professional Path: {state['topic']}",
-        "description": "A structured, industry-standard roadmap to mastery.",
-        "phases": [
+        "title": "{phase.get('phase_title', f'Phase {index + 1}')}",
+        "duration": "2 Weeks",
+        "steps": [
             {{
-                "title": "Phase 1: Foundations",
-                "duration": "2 Weeks",
-                "steps": [
-                    {{
-                        "id": "step_1", 
-                        "title": "Concept Name",
-                        "details": "Technical explanation...",
-                        "resources": [
-                            {{ "title": "Official Docs", "url": "https://...", "type": "doc" }},
-                            {{ "title": "Video Guide", "url": "https://youtube.com/...", "type": "video" }}
-                        ]
-                    }}
+                "title": "Concept Name",
+                "details": "Technical explanation...",
+                "resources": [
+                    {{ "title": "Official Docs", "url": "https://...", "type": "doc" }},
+                    {{ "title": "Video Guide", "url": "https://youtube.com/...", "type": "video" }}
                 ]
             }}
         ]
     }}
     """
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
-    try:
-        content = response.content.replace("```json", "").replace("```", "").strip()
-        return {"final_roadmap": json.loads(content)}
-    except Exception as e:
-        print(f"Error: {e}")
-        return {"final_roadmap": {}}
+    for attempt in range(WRITER_MAX_ATTEMPTS):
+        try:
+            async with semaphore:
+                response = await roadmap_llm().ainvoke(
+                    [HumanMessage(content=prompt)],
+                    semantic_key=state['topic'],
+                    semantic_scope=f"roadmap.writer.phase:{state['level']}:{index}:{json.dumps(phase, sort_keys=True)}",
+                    use_cache=attempt == 0,
+                    validate=_is_valid_phase
+                )
+        except Exception as e:
+            # Upstream errors (rate limits, timeouts) must not fail the whole gather
+            print(f"⚠️ Phase {index + 1} attempt {attempt + 1} upstream error: {e}")
+            if attempt + 1 < WRITER_MAX_ATTEMPTS:
+                await asyncio.sleep(WRITER_BACKOFF_SECONDS * 2 ** attempt)
+            continue
+        try:
+            return _parse_phase(response.content), False
+        except Exception as e:
+            print(f"⚠️ Phase {index + 1} attempt {attempt + 1} failed: {e}")
+    print(f"❌ Phase {index + 1} could not be expanded, using outline")
+    return _fallback_phase(phase, index), True
+
+async def writer_node(state: RoadmapState) -> Dict:
+    phases_outline = state["structure_json"]
+    if not isinstance(phases_outline, list):
+        phases_outline = [phases_outline]
+    phases_outline = [p if isinstance(p, dict) else {"phase_title": str(p), "topics": []} for p in phases_outline]
+    print(f"✍️ Writing {len(phases_outline)} phases in parallel (limit {WRITER_CONCURRENCY})...")
+    semaphore = asyncio.Semaphore(WRITER_CONCURRENCY)
+    expanded = await asyncio.gather(*(
+        expand_phase(state, phase, index, semaphore) for index, phase in enumerate(phases_outline)
+    ))
+    phases = [phase for phase, _ in expanded]
+    degraded = state.get("degraded", False) or any(fallback for _, fallback in expanded)
+
+    # Step ids must stay unique across the merged document
+    step_number = 1
+    for phase in phases:
+        for step in phase["steps"]:
+            step["id"] = f"step_{step_number}"
+            step_number += 1
+
+    return {"final_roadmap": {
+        "title": f"Professional Path: {state['topic']}",
+        "description": "A structured, industry-standard roadmap to mastery.",
+        "phases": phases,
+        "degraded": degraded
+    }}
 
 # --- GRAPH ---
-builder = StateGraph(RoadmapState)
-builder.add_node("researcher", researcher_node)
-builder.add_node("architect", architect_node)
-builder.add_node("writer", writer_node)
+_roadmap_graph = None
+
+def get_roadmap_graph():
+    """Compile the graph on first use so langgraph stays out of import time"""
+    global _roadmap_graph
+    if _roadmap_graph is None:
+        from langgraph.graph import StateGraph, START, END
+        builder = StateGraph(RoadmapState)
+        builder.add_node("researcher", timed_node("researcher", researcher_node))
+        builder.add_node("architect", timed_node("architect", architect_node))
+        builder.add_node("writer", timed_node("writer", writer_node))
 
-builder.add_edge(START, "researcher")
-builder.add_edge("researcher", "architect")
-builder.add_edge("architect", "writer")
-builder.add_edge("writer", END)
+        builder.add_edge(START, "researcher")
+        builder.add_edge(START, "architect")
+        builder.add_edge(["researcher", "architect"], "writer")
+        builder.add_edge("writer", END)
 
-roadmap_graph = builder.compile()
+        _roadmap_graph = builder.compile()
+    return _roadmap_graph
 
 # --- API ---
 class RoadmapRequest(BaseModel):
     topic: str
 
+async def build_roadmap(topic: str, level: str) -> Dict:
+    state = {
+        "topic": topic,
+        "level": level,
+        "research_data": "",
+        "structure_json": [],
+        "final_roadmap": {},
+        "timings": {},
+        "degraded": False
+    }
+    started = time.perf_counter()
+    result = await get_roadmap_graph().ainvoke(state)
+    timings = result.get("timings", {})
+    critical_path = max(timings.get("researcher", 0), timings.get("architect", 0)) + timings.get("writer", 0)
+    print(f"⏱️ Roadmap '{topic}' in {time.perf_counter() - started:.2f}s "
+          f"(critical path {critical_path:.2f}s): {timings}")
+    return result["final_roadmap"]
+
+roadmap_catalog = Catalog("roadmap", build_roadmap)
+
+@app.on_event("startup")
+async def start_catalog_warmer():
+    roadmap_catalog.start_warmer()
+
+@app.on_event("shutdown")
+async def stop_catalog_warmer():
+    roadmap_catalog.stop_warmer()
+
 @app.post("/generate-roadmap")
 async def generate_roadmap(req: RoadmapRequest):
     try:
-        state = {
-            "topic": req.topic,
-            "level": "Professional",
-            "research_data": "",
-            "structure_json": [],
-            "final_roadmap": {}
-        }
-        result = await roadmap_graph.ainvoke(state)
-        return {"success": True, "roadmap": result["final_roadmap"]}
+        roadmap, status = await roadmap_catalog.serve(req.topic, "Professional")
+        return {"success": True, "roadmap": roadmap or {}, "catalog": status}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "roadmap"}
+
+@app.get("/catalog/top")
+async def catalog_top(limit: int = 20):
+    return {"success": True, "topics": roadmap_catalog.store.top_topics("roadmap", limit)}
+
 if __name__ == "__main__":
+    configure_logging("roadmap")
     uvicorn.run(app, host="0.0.0.0", port=8004)
\ No newline at end of file
@@ -0,0 +1,43 @@
+# python-services/sessions.py
+# Bounded in-memory store for per-candidate state (face monitoring, voice streams)
+
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import QUEUE_DEPTH
+
+
+class SessionStore:
+    """Sessions by id, least recently seen evicted first, idle ones expired after `ttl` seconds"""
+
+    def __init__(self, name: str, max_sessions: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # id -> (session, last_seen)
+        self._lock = threading.Lock()
+        QUEUE_DEPTH.set_function(lambda: len(self._sessions), queue=name)
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if now - entry[1] > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, session_id, session):
+        with self._lock:
+            self._sessions[session_id] = (session, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
@@ -1,106 +1,250 @@
 # python-services/start_services.py
-# Script to start both Python verification services
+# Supervisor for all Python services: parallel start, readiness gating, auto-restart
 
+import argparse
+import importlib.util
+import json
+import os
+import signal
 import subprocess
 import sys
-import time
 import threading
-import signal
-import os
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# name, script, port, readiness path, modules the script cannot start without.
+# The model services expose /ready (models loaded + warmed up) separately from /health.
+SERVICES = [
+    ("Face Verification Service", "face_service.py", 8001, "/ready", ["flask", "cv2", "insightface"]),
+    ("Voice Verification Service", "voice_service.py", 8003, "/ready", ["flask", "librosa", "resemblyzer"]),
+    ("Job Matcher Service", "job_matcher_service.py", 8002, "/health", ["fastapi", "langgraph", "langchain_google_genai"]),
+    ("Roadmap Generator", "roadmap.py", 8004, "/health", ["fastapi", "langgraph", "langchain_google_genai"]),
+    ("Course Generator", "course.py", 8005, "/health", ["fastapi", "langgraph", "langchain_google_genai"]),
+    ("Hackathon Agent", "hackathon_agent.py", 8006, "/health", ["fastapi", "langgraph", "langchain_google_genai"]),
+]
+
+# Replaces the four agent entries above when started with --gateway
+AGENT_SCRIPTS = {"job_matcher_service.py", "roadmap.py", "course.py", "hackathon_agent.py"}
+GATEWAY_SERVICE = ("Agent Gateway (jobs, roadmap, course, hackathon)", "agent_gateway.py", 8002, "/health",
+                   ["fastapi", "langgraph", "langchain_google_genai"])
+
+READY_TIMEOUT = float(os.getenv("SUPERVISOR_READY_TIMEOUT", "300"))
+POLL_INTERVAL = 0.5
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 60.0  # seconds of uptime before the backoff resets
+PROBE_INTERVAL = float(os.getenv("SUPERVISOR_PROBE_INTERVAL", "10"))  # readiness re-check once up
+PROBE_FAILURES = int(os.getenv("SUPERVISOR_PROBE_FAILURES", "3"))  # consecutive failures before a restart
 
-# Global variables for process management
-processes = []
 shutdown_event = threading.Event()
 
+
+class ManagedService:
+    """One supervised worker process"""
+
+    def __init__(self, name, script, port, ready_path, modules, args=()):
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.port = port
+        self.ready_path = ready_path
+        self.modules = modules
+        self.proc = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_restart_at = None
+        self.ready = False
+        self.waiting = False  # a wait_ready() is in progress; periodic probes hold off meanwhile
+        self.probe_failures = 0
+        self.next_probe_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def ready_url(self):
+        return f"http://127.0.0.1:{self.port}{self.ready_path}"
+
+    def missing_modules(self):
+        return [m for m in self.modules if importlib.util.find_spec(m) is None]
+
+    def start(self):
+        with self.lock:
+            print(f"🚀 Starting {self.name} on port {self.port}...")
+            self.proc = subprocess.Popen([sys.executable, self.script] + self.args, cwd=BASE_DIR)
+            self.started_at = time.monotonic()
+            self.next_restart_at = None
+            self.ready = False
+            self.waiting = True
+            self.probe_failures = 0
+            print(f"✅ {self.name} started (PID: {self.proc.pid})")
+
+    def is_healthy(self):
+        try:
+            with urllib.request.urlopen(self.ready_url, timeout=2) as response:
+                if response.status != 200:
+                    return False
+                body = json.loads(response.read() or b"{}")
+                return body.get("status", "healthy") in ("healthy", "ready")
+        except Exception:
+            return False
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """Poll the readiness endpoint until it answers, the process dies or the timeout passes"""
+        started = time.monotonic()
+        deadline = started + timeout
+        try:
+            while not shutdown_event.is_set() and time.monotonic() < deadline:
+                if self.proc is None or self.proc.poll() is not None:
+                    print(f"❌ {self.name} exited before becoming ready")
+                    return False
+                if self.is_healthy():
+                    self.ready = True
+                    print(f"🟢 {self.name} ready in {time.monotonic() - started:.1f}s")
+                    return True
+                shutdown_event.wait(POLL_INTERVAL)
+            print(f"⚠️ {self.name} not ready after {timeout:.0f}s")
+            return False
+        finally:
+            self.waiting = False
+            self.next_probe_at = time.monotonic() + PROBE_INTERVAL
+
+    def probe(self):
+        """Periodic readiness check; a live worker failing PROBE_FAILURES in a row is restarted"""
+        self.next_probe_at = time.monotonic() + PROBE_INTERVAL
+        if self.is_healthy():
+            self.probe_failures = 0
+            self.ready = True
+            return
+        self.probe_failures += 1
+        self.ready = False
+        if self.probe_failures >= PROBE_FAILURES:
+            self.stop()
+            self.schedule_restart(f"not ready for {self.probe_failures} probes")
+
+    def schedule_restart(self, reason=None):
+        """Exponential backoff: 1s, 2s, 4s ... capped, reset once the worker stays up"""
+        if time.monotonic() - self.started_at > STABLE_AFTER:
+            self.restarts = 0
+        delay = min(BACKOFF_INITIAL * (2 ** self.restarts), BACKOFF_MAX)
+        self.restarts += 1
+        self.ready = False
+        self.next_restart_at = time.monotonic() + delay
+        reason = reason or f"exit code {self.proc.returncode}"
+        print(f"⚠️ {self.name} stopped ({reason}); restarting in {delay:.0f}s")
+
+    def stop(self):
+        with self.lock:
+            if self.proc is None or self.proc.poll() is not None:
+                return
+            try:
+                self.proc.terminate()
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+
+managed = []
+
+
 def signal_handler(signum, frame):
     """Handle shutdown signals"""
     print("\n🛑 Shutdown signal received, stopping services...")
     shutdown_event.set()
-    
-    for proc in processes:
-        try:
-            proc.terminate()
-            proc.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            proc.kill()
-    
+    for service in managed:
+        service.stop()
     print("✅ All services stopped")
     sys.exit(0)
 
-def start_service(service_name, script_name, port):
-    """Start a single service"""
-    try:
-        print(f"🚀 Starting {service_name} on port {port}...")
-        proc = subprocess.Popen([sys.executable, script_name])
-        processes.append(proc)
-        print(f"✅ {service_name} started (PID: {proc.pid})")
-        return proc
-    except Exception as e:
-        print(f"❌ Failed to start {service_name}: {e}")
-        return None
-
-def monitor_services():
-    """Monitor service health"""
+
+def monitor_services(pool):
+    """Restart crashed or unresponsive workers with backoff and re-gate them on readiness"""
     while not shutdown_event.is_set():
-        time.sleep(10)  # Check every 10 seconds
-        
-        for i, proc in enumerate(processes):
-            if proc.poll() is not None:
-                print(f"⚠️ Service {i+1} has stopped unexpectedly")
-                # Optionally restart the service here
-        
-        shutdown_event.wait(10)
+        now = time.monotonic()
+        for service in managed:
+            if service.proc is None:
+                continue
+            if service.next_restart_at is None and service.proc.poll() is not None:
+                service.schedule_restart()
+            elif service.next_restart_at is not None:
+                if now >= service.next_restart_at:
+                    service.start()
+                    pool.submit(service.wait_ready)
+            elif not service.waiting and now >= service.next_probe_at:
+                service.probe()
+        shutdown_event.wait(1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start and supervise the Python services")
+    parser.add_argument("--only", nargs="+", metavar="SCRIPT",
+                        help="start only these scripts, e.g. --only face_service.py voice_service.py")
+    parser.add_argument("--gateway", action="store_true",
+                        help="run the four agent services in one agent_gateway.py process group")
+    parser.add_argument("--gateway-workers", type=int, default=2, help="worker processes for --gateway")
+    return parser.parse_args()
+
 
 def main():
     """Main function to start all services"""
-    # Set up signal handlers
+    args = parse_args()
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    
-    print("🎯 Starting Python Verification Services...")
-    
-    # Check if requirements are installed
-    try:
-        import insightface
-        import librosa
-        import flask
-        print("✅ Required packages are installed")
-    except ImportError as e:
-        print(f"❌ Missing required package: {e}")
-        print("Please run: python setup.py")
-        return False
-    
-    # Start services
-    face_service = start_service("Face Verification Service", "face_service.py", 8001)
-    time.sleep(2)  # Give first service time to start
-    
-    voice_service = start_service("Voice Verification Service", "voice_service.py", 8003)
-    time.sleep(2)  # Give second service time to start
-    
-    if not face_service or not voice_service:
-        print("❌ Failed to start one or more services")
+
+    print("🎯 Starting Python Services...")
+
+    services = [(*entry, ()) for entry in SERVICES]
+    if args.gateway:
+        services = [entry for entry in services if entry[1] not in AGENT_SCRIPTS]
+        services.append((*GATEWAY_SERVICE, ("--workers", str(args.gateway_workers))))
+
+    for name, script, port, ready_path, modules, extra_args in services:
+        if args.only and script not in args.only:
+            continue
+        service = ManagedService(name, script, port, ready_path, modules, extra_args)
+        missing = service.missing_modules()
+        if missing:
+            print(f"❌ Skipping {name}: missing package(s) {', '.join(missing)} (run: python setup.py)")
+            continue
+        managed.append(service)
+
+    if not managed:
+        print("❌ No services could be started")
         return False
-    
-    print("\n🎉 All services started successfully!")
+
+    # Independent services start together, so cold start tracks the slowest model load
+    started = time.monotonic()
+    for service in managed:
+        service.start()
+
+    # Room for a restarted worker's wait_ready() while the initial waits are still running
+    pool = ThreadPoolExecutor(max_workers=2 * len(managed), thread_name_prefix="readiness")
+
+    # Monitor from the start, so a worker that crashes while slower models load restarts at once
+    monitor_thread = threading.Thread(target=monitor_services, args=(pool,), daemon=True)
+    monitor_thread.start()
+
+    results = list(pool.map(lambda s: s.wait_ready(), managed))
+
+    print(f"\n🎉 {sum(results)}/{len(managed)} services ready in {time.monotonic() - started:.1f}s")
     print("\nService endpoints:")
-    print("- Face Verification: http://localhost:8001/verify-face")
-    print("- Voice Verification: http://localhost:8003/verify-voice")
-    print("- Health Checks: http://localhost:8001/health, http://localhost:8003/health")
+    for service in managed:
+        status = "🟢" if service.ready else "🔴"
+        print(f"- {status} {service.name}: http://localhost:{service.port} (ready: {service.ready_url})")
     print("\nPress Ctrl+C to stop all services")
-    
-    # Start monitoring thread
-    monitor_thread = threading.Thread(target=monitor_services, daemon=True)
-    monitor_thread.start()
-    
+
     # Wait for shutdown
     try:
         while not shutdown_event.is_set():
             shutdown_event.wait(1)
     except KeyboardInterrupt:
         signal_handler(signal.SIGINT, None)
-    
+
     return True
 
+
 if __name__ == '__main__':
     success = main()
     sys.exit(0 if success else 1)
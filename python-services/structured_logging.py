@@ -0,0 +1,208 @@
+# python-services/structured_logging.py
+# Structured, queue-backed logging with per-request correlation ids
+#
+# Request threads only enqueue log records; a QueueListener thread formats and writes
+# them, so a slow terminal or disk never stalls /verify. Every record carries the
+# request id of the request it was logged from (X-Request-ID, or a generated one that
+# is echoed back in the response).
+#
+#   LOG_LEVEL=INFO            root level
+#   LOG_FORMAT=json           json (one object per line) or text
+#   LOG_HOT_PATH_SAMPLE=100   emit 1 of every N hot-path debug messages when DEBUG is on
+
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import uuid
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+HOT_PATH_SAMPLE = max(1, int(os.getenv("LOG_HOT_PATH_SAMPLE", "100")))
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID = re.compile(r"[A-Za-z0-9_.:-]{1,128}")  # inbound ids are echoed in headers and logs
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "service"}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def inbound_request_id(value: Optional[str]) -> str:
+    """The client's X-Request-ID when it is a plain token, else a fresh id"""
+    return value if value and _REQUEST_ID.fullmatch(value) else new_request_id()
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request id and service name on the calling thread"""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.service = self.service
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "service": getattr(record, "service", ""),
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(service)s %(request_id)s] %(name)s: %(message)s")
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers message formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves the process, so the record needs no pickling-safe copy
+        return record
+
+
+def create_queue_handler(service: str, fmt: str = LOG_FORMAT, output: Optional[logging.Handler] = None):
+    """(handler to attach, started listener) pair writing through `output` (stderr by default)"""
+    if output is None:
+        output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    enqueue = _EnqueueHandler(log_queue)
+    enqueue.addFilter(RequestContextFilter(service))
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return enqueue, listener
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(service: str, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> logging.handlers.QueueListener:
+    """Route the root logger through a background writer thread; first call wins"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    enqueue, _listener = create_queue_handler(service, fmt)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(enqueue)
+    root.setLevel(level)
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class SampledLogger:
+    """
+    Debug logging for per-request hot paths (detection, similarity, preprocessing).
+
+    Nothing is built unless DEBUG is enabled, and then only 1 of every `every`
+    calls becomes a record, tagged with the sampling rate.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = HOT_PATH_SAMPLE):
+        self.logger = logger
+        self.every = every
+        self._calls = itertools.count()
+
+    def debug(self, msg: str, *args, **fields) -> None:
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if next(self._calls) % self.every:
+            return
+        fields["sampled_every"] = self.every
+        self.logger.debug(msg, *args, extra=fields)
+
+
+def hot_path_logger(name: str, every: int = HOT_PATH_SAMPLE) -> SampledLogger:
+    return SampledLogger(logging.getLogger(name), every)
+
+
+# --- FRAMEWORK HOOKS ---
+class RequestIdMiddleware:
+    """Plain ASGI middleware: bind X-Request-ID (or a new id) for the request and echo it back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = inbound_request_id(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+def install_request_id_fastapi(app) -> None:
+    app.add_middleware(RequestIdMiddleware)
+
+
+def install_request_id_flask(app) -> None:
+    from flask import g, request
+
+    @app.before_request
+    def _bind_request_id():
+        request_id = inbound_request_id(request.headers.get(REQUEST_ID_HEADER))
+        g._request_id_token = request_id_var.set(request_id)
+
+    @app.after_request
+    def _echo_request_id(response):
+        response.headers[REQUEST_ID_HEADER] = request_id_var.get()
+        return response
+
+    @app.teardown_request
+    def _unbind_request_id(exc):
+        token = g.pop("_request_id_token", None)
+        if token is not None:
+            request_id_var.reset(token)
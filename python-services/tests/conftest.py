@@ -0,0 +1,7 @@
+# python-services/tests/conftest.py
+# The services import each other as top-level modules; make them importable from here
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+# python-services/tests/test_json_utils.py
+# Incremental and tolerant JSON parsing of LLM output
+
+from json_utils import IncrementalJSONParser, parse_complete_json, parse_llm_json
+
+
+def stream(parser, text, size=3):
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return items
+
+
+def test_null_array_items_are_emitted():
+    assert stream(IncrementalJSONParser(), '[1, null, {"a": null}, null]') == [1, None, {"a": None}, None]
+
+
+def test_item_path_ignores_arrays_under_other_keys():
+    text = '{"other": [9, 8], "items": [1, [2]], "more": {"items": [7]}}'
+    assert stream(IncrementalJSONParser(item_path=("items",)), text) == [1, [2]]
+
+
+def test_item_path_matches_every_level():
+    text = '{"a": {"items": [5]}, "course": {"x": [6], "items": [1, 2]}}'
+    assert stream(IncrementalJSONParser(item_path=("course", "items")), text) == [1, 2]
+
+
+def test_wrong_top_level_type_returns_default():
+    assert parse_llm_json('[{"a": 1}, {"b": 2}]', expect=dict) is None
+    assert parse_llm_json('Here you go: [{"a": 1},', expect=dict, default={}) == {}
+    assert parse_llm_json('{"lessons": [1, 2]}', expect=list, default=[]) == []
+
+
+def test_truncated_document_is_repaired_but_not_complete():
+    truncated = '```json\n[{"title": "A"}, {"title": "B"}, {"title": "C'
+    assert parse_llm_json(truncated, expect=list) == [{"title": "A"}, {"title": "B"}]
+    assert parse_complete_json(truncated, expect=list) is None
+
+
+def test_complete_document_with_prose_and_fences():
+    text = 'Sure!\n```json\n{"lessons": [{"title": "A"},]}\n```\nEnjoy.'
+    assert parse_complete_json(text, expect=dict) == {"lessons": [{"title": "A"}]}
@@ -0,0 +1,55 @@
+# python-services/tests/test_vad.py
+# Speech trimming must keep noisy and dense speech and defer flat clips to webrtcvad
+
+import numpy as np
+
+import vad
+
+SR = 16000
+
+
+def speech_like(seconds, pause_every=None, seed=0):
+    """Voiced harmonics with a syllable-rate (4 Hz) envelope, optionally with 0.25 s pauses"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SR)) / SR
+    pitch = 120 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SR
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.35 + 0.65 * np.abs(np.sin(2 * np.pi * 2 * t + rng.uniform(0, np.pi)))
+    wav = 0.1 * voiced * envelope
+    if pause_every:
+        wav[(t % pause_every) < 0.25] = 0.0
+    return wav.astype(np.float32)
+
+
+def with_noise(wav, snr_db, seed=1):
+    rng = np.random.default_rng(seed)
+    signal_power = np.mean(wav ** 2)
+    noise = rng.standard_normal(len(wav)) * np.sqrt(signal_power / 10 ** (snr_db / 10))
+    return (wav + noise).astype(np.float32)
+
+
+def test_speech_with_pauses_is_trimmed():
+    wav = np.concatenate([np.zeros(SR * 2), speech_like(4), np.zeros(SR * 2)]).astype(np.float32)
+    kept = len(vad.speech_only(wav, SR)) / SR
+    assert 3.8 <= kept <= 4.6
+
+
+def test_noisy_room_speech_is_kept():
+    wav = with_noise(speech_like(6, pause_every=1.5), snr_db=5)
+    assert len(vad.speech_only(wav, SR)) / SR >= 4.0
+
+
+def test_dense_speech_over_background_noise_is_kept():
+    wav = with_noise(speech_like(6), snr_db=15)
+    assert len(vad.speech_only(wav, SR)) / SR >= 5.0
+
+
+def test_flat_clip_defers_to_webrtcvad(monkeypatch):
+    noise = (np.random.default_rng(2).standard_normal(SR * 5) * 10 ** (-26 / 20)).astype(np.float32)
+    monkeypatch.setattr(vad, "_webrtcvad_mask", lambda frames, sr: np.zeros(len(frames), dtype=bool))
+    assert len(vad.speech_only(noise, SR)) == 0
+
+
+def test_digital_silence_is_never_speech():
+    assert len(vad.speech_only(np.zeros(SR * 3, dtype=np.float32), SR)) == 0
@@ -0,0 +1,99 @@
+# python-services/uploads.py
+# Binary media uploads for the face and voice /verify endpoints
+#
+# /verify accepts the same request in three encodings:
+#   application/json           {"stored_image_url": ..., "test_image_base64": "data:image/jpeg;base64,..."}
+#   multipart/form-data        stored_image_url=<field>, test_image=<file part>
+#   application/octet-stream   raw media as the body, ?stored_image_url=... in the query string
+#   (image/*, audio/* and video/* bodies are treated like octet-stream)
+#
+# The binary variants are ~25% smaller on the wire and skip the JSON parse and the
+# base64 decode. File parts are buffered in memory, never spooled to a temp file, and
+# reach the decoders as the same BytesIO the request body was read into.
+
+import os
+from io import BytesIO
+from typing import Dict, NamedTuple, Optional, Sequence, Union
+
+from metrics import REQUEST_BYTES
+from profiling import stage
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+
+_RAW_PREFIXES = ("image/", "audio/", "video/")
+
+
+class VerifyUpload(NamedTuple):
+    stored_url: Optional[str]
+    media: Union[str, BytesIO, None]  # base64 data URL (JSON) or the raw bytes
+    encoding: str  # json | multipart | binary
+    body_bytes: int
+    fields: Dict[str, str]  # extra_fields that were present
+
+
+def install_binary_uploads(app, max_bytes: int = MAX_UPLOAD_BYTES, uncapped_endpoints: Sequence[str] = ()) -> None:
+    """
+    Keep multipart file parts in memory and cap binary and multipart bodies (413 beyond
+    max_bytes). JSON bodies keep their original behaviour (no cap), so existing clients
+    sending large base64 data URLs are unaffected. uncapped_endpoints read their body
+    incrementally (long streams) and get no cap.
+    """
+    uncapped = frozenset(uncapped_endpoints)
+
+    class InMemoryUploadRequest(app.request_class):
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            return BytesIO()
+
+        @property
+        def max_content_length(self):
+            if self.endpoint in uncapped or self.mimetype == "application/json":
+                return None
+            return max_bytes
+
+    app.request_class = InMemoryUploadRequest
+
+
+def read_verify_upload(service: str, url_field: str, base64_field: str, file_field: str,
+                       extra_fields: Sequence[str] = ()) -> VerifyUpload:
+    """
+    Stored-media URL and test media from the current Flask request, whatever its encoding.
+    extra_fields are read from the same place as the URL (JSON body, form or query string).
+    """
+    from flask import request
+
+    mimetype = request.mimetype
+    with stage(service, "request_parse"):
+        if mimetype == "multipart/form-data":
+            encoding = "multipart"
+            params = request.form
+            stored_url = params.get(url_field)
+            upload = request.files.get(file_field)
+            media = None
+            if upload is not None:
+                media = upload.stream
+                media.seek(0)
+        elif mimetype == "application/octet-stream" or mimetype.startswith(_RAW_PREFIXES):
+            encoding = "binary"
+            params = request.args
+            stored_url = params.get(url_field)
+            body = request.get_data(cache=False)
+            media = BytesIO(body) if body else None  # shares the bytes object, no copy
+        else:
+            encoding = "json"
+            params = request.get_json(silent=True) or {}
+            stored_url = params.get(url_field)
+            media = params.get(base64_field)
+        fields = {name: str(params[name]) for name in extra_fields if params.get(name) is not None}
+
+    body_bytes = request.content_length or 0
+    REQUEST_BYTES.observe(body_bytes, service=service, encoding=encoding)
+    return VerifyUpload(stored_url, media, encoding, body_bytes, fields)
+
+
+def media_size(media: Union[str, BytesIO, None]) -> int:
+    """Characters of a base64 payload or bytes of a binary one, for logging"""
+    if media is None:
+        return 0
+    if isinstance(media, str):
+        return len(media)
+    return media.getbuffer().nbytes
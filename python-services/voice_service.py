@@ -1,22 +1,36 @@
 # python-services/voice_service_fixed.py
 # FIXED Voice Verification Service - Updated with Resemblyzer (Deep Learning)
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import numpy as np
 import librosa
+import soxr
 import base64
-import requests
 from io import BytesIO
 import logging
+import os
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from metrics import MODEL_INFERENCE, QUEUE_DEPTH, instrument_flask
+from profiling import install_profiling_flask, run_parallel, stage
+from structured_logging import configure_logging, hot_path_logger, install_request_id_flask
+from media_fetcher import get_media_fetcher
+from sessions import SessionStore
+from vad import speech_only
+from uploads import install_binary_uploads, media_size, read_verify_upload
 from resemblyzer import VoiceEncoder, preprocess_wav
+from resemblyzer import audio as resemblyzer_audio, hparams as resemblyzer_hparams
+import torch
 import warnings
 warnings.filterwarnings('ignore')
 
 # Try to import pydub for audio conversion with multiple FFmpeg path options
 try:
-    import os
-    
     # Multiple potential FFmpeg paths (KEEPING YOUR ROBUST LOGIC)
     ffmpeg_paths = [
         r"C:\Users\PARTH\ffmpeg\bin",
@@ -48,35 +62,129 @@ try:
 except ImportError as e:
     PYDUB_AVAILABLE = False
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging; per-request detail goes through the sampled hot-path logger
+configure_logging("voice")
 logger = logging.getLogger(__name__)
+hot_log = hot_path_logger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+instrument_flask(app, "voice")
+install_request_id_flask(app)
+install_profiling_flask(app, "voice")
+install_binary_uploads(app, uncapped_endpoints=('stream_voice',))  # interview streams outlast any body cap
+
+# --- BATCHED EMBEDDING ---
+# Every clip is cut into Resemblyzer's 1.6 s partial windows (same slicing as embed_utterance);
+# all partials of all clips go through the LSTM as one batch
+TORCH_THREADS = int(os.getenv("VOICE_TORCH_THREADS", "0"))  # 0 = torch default
+BATCH_MAX_CLIPS = int(os.getenv("VOICE_BATCH_MAX_CLIPS", "16"))
+PARTIAL_RATE = 1.3
+PARTIAL_MIN_COVERAGE = 0.75
+
+# --- CONCURRENT DECODING ---
+# Clips are downloaded, converted (an ffmpeg subprocess) and loaded on workers in parallel,
+# all of which wait outside the GIL; the embeddings then come from one batched encoder pass
+VERIFY_PARALLEL = os.getenv("VOICE_VERIFY_PARALLEL", "1") == "1"
+VERIFY_WORKERS = int(os.getenv("VOICE_VERIFY_WORKERS", "8"))
+verify_pool = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix="voice-verify") if VERIFY_PARALLEL else None
+
+# --- STREAMING VERIFICATION ---
+# Clients send PCM16 mono chunks during the interview. Each Resemblyzer partial window
+# (1.6 s, advancing at embed_utterance's 1.3 partials/s) is embedded once, as soon as its
+# audio has arrived; the rolling speaker embedding is the mean of the partials from the
+# last VOICE_STREAM_WINDOW_SECONDS, scored against the reference every few seconds.
+STREAM_SAMPLE_RATE = resemblyzer_hparams.sampling_rate
+_SAMPLES_PER_FRAME = STREAM_SAMPLE_RATE * resemblyzer_hparams.mel_window_step // 1000
+PARTIAL_SAMPLES = resemblyzer_hparams.partials_n_frames * _SAMPLES_PER_FRAME
+PARTIAL_STEP_SAMPLES = int(round(STREAM_SAMPLE_RATE / 1.3 / _SAMPLES_PER_FRAME)) * _SAMPLES_PER_FRAME
+STREAM_WINDOW_SECONDS = float(os.getenv("VOICE_STREAM_WINDOW_SECONDS", "6"))
+STREAM_SCORE_EVERY_SECONDS = float(os.getenv("VOICE_STREAM_SCORE_EVERY_SECONDS", "3"))
+STREAM_MIN_RMS = float(os.getenv("VOICE_STREAM_MIN_RMS", "0.005"))  # quieter partials are skipped
+STREAM_SESSION_TTL = float(os.getenv("VOICE_STREAM_SESSION_TTL", "900"))
+STREAM_MAX_SESSIONS = int(os.getenv("VOICE_STREAM_MAX_SESSIONS", "1000"))
+STREAM_READ_BYTES = 16000  # 0.5 s of 16 kHz PCM16 per read of a long chunked body
+
+class VoiceStream:
+    """Rolling audio buffer and partial embeddings for one streamed interview"""
+    
+    def __init__(self, stored_voice_url, reference_embedding, sample_rate=STREAM_SAMPLE_RATE):
+        self.stored_voice_url = stored_voice_url
+        self.reference_embedding = reference_embedding
+        self.sample_rate = sample_rate
+        # One resampler per stream: its filter state carries across chunk boundaries
+        self.resampler = soxr.ResampleStream(sample_rate, STREAM_SAMPLE_RATE, 1, dtype='float32', quality='HQ') \
+            if sample_rate != STREAM_SAMPLE_RATE else None
+        self.lock = threading.Lock()
+        self.buffer = np.zeros(0, dtype=np.float32)  # 16 kHz samples from buffer_start on
+        self.buffer_start = 0
+        self.received = 0  # 16 kHz samples received so far
+        self.next_partial = 0  # sample where the next partial window starts
+        self.partials = deque()  # (end sample, embedding) inside the rolling window
+        self.odd_byte = b''  # half of an int16 split across chunks
+        self.embedded_partials = 0
+        self.skipped_partials = 0
+        self.last_score_at = 0
+        self.latest = None
 
 class ImprovedVoiceVerification:
     def __init__(self):
         # NEW TECH: Resemblyzer allows for high accuracy, so we use a standard high threshold
         self.voice_threshold = 0.50
         self.high_confidence_threshold = 0.85
-        self.min_duration = 1.0  # Deep learning models can work with shorter audio
+        self.min_duration = 1.0  # seconds of speech after VAD; shorter clips never reach the encoder
+        
+        # The encoder is loaded by a background initializer
+        self.encoder = None
+        self.ready_event = threading.Event()
+        self.init_error = None
+        self.init_seconds = None
         
         logger.info("🎤 Deep Learning Voice Verification initialized (Resemblyzer)")
-        logger.info("🧠 Loading AI Model... (This might take a moment)")
-        self.encoder = VoiceEncoder() # Downloads/Loads the pre-trained brain
-        logger.info("✅ AI Model Loaded Successfully")
         logger.info(f"📊 Voice threshold: {self.voice_threshold}")
 
+    def start_background_init(self):
+        """Load the encoder and warm it up off the request path, in parallel with server startup"""
+        thread = threading.Thread(target=self._initialize_models, name="voice-model-init", daemon=True)
+        thread.start()
+        return thread
+
+    def _initialize_models(self):
+        started = time.perf_counter()
+        try:
+            logger.info("🧠 Loading AI Model... (This might take a moment)")
+            if TORCH_THREADS:
+                torch.set_num_threads(TORCH_THREADS)
+            self.encoder = VoiceEncoder() # Downloads/Loads the pre-trained brain
+            logger.info("✅ AI Model Loaded Successfully")
+            self._warm_up()
+        except Exception as e:
+            self.init_error = str(e)
+            logger.error(f"❌ Voice model initialization failed: {e}")
+        finally:
+            self.init_seconds = round(time.perf_counter() - started, 2)
+            self.ready_event.set()
+            logger.info(f"✅ Voice models ready in {self.init_seconds}s")
+
+    def _warm_up(self):
+        """Synthetic inference so torch/numba JIT costs are not paid by the first candidate"""
+        rng = np.random.default_rng(0)
+        tone = np.sin(2 * np.pi * 180 * np.arange(48000 * 2) / 48000)
+        noisy = (0.3 * tone + 0.05 * rng.standard_normal(tone.shape)).astype(np.float32)
+        wav = librosa.resample(noisy, orig_sr=48000, target_sr=16000)
+        self.encoder.embed_utterance(preprocess_wav(wav, source_sr=16000))
+        logger.info("🔥 Voice model warmed up")
+
+    def wait_until_ready(self, timeout=None):
+        return self.ready_event.wait(timeout)
+
     def download_audio_from_url(self, audio_url):
-        """Download audio from Cloudinary URL (UNCHANGED)"""
+        """Download audio from Cloudinary URL"""
         try:
-            logger.info(f"📥 Downloading audio from: {audio_url}")
-            response = requests.get(audio_url, timeout=30)
-            response.raise_for_status()
-            
-            audio_data = BytesIO(response.content)
-            logger.info(f"✅ Downloaded {len(response.content)} bytes")
+            hot_log.debug("📥 Downloading audio from: %s", audio_url)
+            # Pooled connection, size cap, and a disk cache revalidated with ETag / Last-Modified
+            audio_data = get_media_fetcher().fetch(audio_url, "download_audio")
+            hot_log.debug("✅ Downloaded %d bytes", audio_data.getbuffer().nbytes)
             return audio_data
         except Exception as e:
             logger.error(f"❌ Failed to download audio: {e}")
@@ -86,7 +194,7 @@ class ImprovedVoiceVerification:
         """Convert audio to WAV format (UNCHANGED - Required for stability)"""
         try:
             if PYDUB_AVAILABLE:
-                logger.info(f"🔄 Converting {input_format} to WAV using pydub...")
+                hot_log.debug("🔄 Converting %s to WAV using pydub...", input_format)
                 
                 # Handle different input formats
                 if input_format in ['webm', 'mkv']:
@@ -106,7 +214,7 @@ class ImprovedVoiceVerification:
                 audio.export(wav_io, format="wav")
                 wav_io.seek(0)
                 
-                logger.info("✅ Audio conversion successful")
+                hot_log.debug("✅ Audio conversion successful")
                 return wav_io
             else:
                 logger.warning("⚠️ Pydub not available, using raw audio")
@@ -116,51 +224,184 @@ class ImprovedVoiceVerification:
             logger.error(f"❌ Audio conversion failed: {e}")
             return audio_data
 
+    def load_speech(self, audio_wav_io):
+        """16 kHz speech-only, volume-normalized waveform; ValueError when under min_duration"""
+        # Load audio to numpy array using librosa (Standard bridge to Resemblyzer)
+        # We use the BytesIO object directly
+        with stage("voice", "librosa_load_resample"):
+            wav, sr = librosa.load(audio_wav_io, sr=16000)
+        if len(wav) < self.min_duration * sr:
+            raise ValueError(f"Audio too short: {len(wav) / sr:.2f}s, need at least {self.min_duration}s")
+        
+        # Keep speech only (capped), then normalize volume; silence is already gone, so
+        # preprocess_wav's webrtcvad trimming pass is skipped
+        with stage("voice", "vad"):
+            speech = speech_only(wav, sr)
+        if len(speech) < self.min_duration * sr:
+            raise ValueError(f"Not enough speech: {len(speech) / sr:.2f}s of {len(wav) / sr:.2f}s, "
+                             f"need at least {self.min_duration}s")
+        with stage("voice", "preprocess_wav"):
+            return resemblyzer_audio.normalize_volume(speech, resemblyzer_hparams.audio_norm_target_dBFS,
+                                                      increase_only=True)
+
+    def encode_partials(self, mels):
+        """One encoder forward pass over a (partials, 160, 40) mel batch -> L2-normalized partial embeddings"""
+        with torch.inference_mode():
+            return self.encoder(torch.from_numpy(mels).to(self.encoder.device)).cpu().numpy()
+
+    def embed_batch(self, wavs):
+        """
+        (len(wavs), 256) utterance embeddings from a single forward pass: each embedding is the
+        normalized mean of its clip's partials, exactly as embed_utterance computes it
+        """
+        mels, counts = [], []
+        with stage("voice", "mel"):
+            for wav in wavs:
+                wav_slices, mel_slices = VoiceEncoder.compute_partial_slices(len(wav), PARTIAL_RATE, PARTIAL_MIN_COVERAGE)
+                if wav_slices[-1].stop >= len(wav):
+                    wav = np.pad(wav, (0, wav_slices[-1].stop - len(wav)), "constant")
+                mel = resemblyzer_audio.wav_to_mel_spectrogram(wav)
+                mels.extend(mel[s] for s in mel_slices)
+                counts.append(len(mel_slices))
+        
+        with stage("voice", "embed"), MODEL_INFERENCE.time(model="resemblyzer", operation="embed_batch"):
+            partials = self.encode_partials(np.stack(mels))
+        
+        embeddings = np.add.reduceat(partials, np.cumsum([0] + counts[:-1]), axis=0) / np.array(counts)[:, None]
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
     def get_voice_embedding(self, audio_wav_io):
         """NEW TECH: Extract Deep Learning Embeddings instead of MFCCs"""
         try:
-            logger.info("🧠 Generating AI Voice Embedding...")
-            
-            # Load audio to numpy array using librosa (Standard bridge to Resemblyzer)
-            # We use the BytesIO object directly
-            wav, sr = librosa.load(audio_wav_io, sr=16000)
-            
-            # Preprocess (Normalize, Trim Silence)
-            wav = preprocess_wav(wav)
-            
-            # Generate Embedding (256-dimensional vector representing identity)
-            embedding = self.encoder.embed_utterance(wav)
-            
-            logger.info("✅ Embedding generated successfully")
+            wav = self.load_speech(audio_wav_io)
+            embedding = self.embed_batch([wav])[0]
+            hot_log.debug("✅ Embedding generated from %.2fs of speech", len(wav) / 16000)
             return embedding
             
         except Exception as e:
             logger.error(f"❌ AI Embedding generation failed: {e}")
             raise
 
-    def verify_voices(self, stored_audio_url, test_audio_base64):
-        """Main voice verification method REPLACED with Deep Learning logic"""
-        try:
-            logger.info("🎤 Starting AI voice verification...")
-            
-            # 1. Download & Convert (Keep existing flow)
-            stored_audio_data = self.download_audio_from_url(stored_audio_url)
+    def decode_clip(self, clip):
+        """Speech waveform for a URL, a base64 data URL or raw bytes (BytesIO)"""
+        if isinstance(clip, str) and clip.startswith(('http://', 'https://')):
+            with stage("voice", "download"):
+                audio_data = self.download_audio_from_url(clip)
+        elif isinstance(clip, str):
+            with stage("voice", "base64_decode"):
+                audio_data = BytesIO(base64.b64decode(clip[clip.find(',') + 1:]))
+        else:
+            audio_data = clip
+        with stage("voice", "ffmpeg_convert"):
+            wav_io = self.convert_audio_to_wav(audio_data, 'webm')
+        return self.load_speech(wav_io)
+
+    def embed_voices(self, clips):
+        """Embeddings, pairwise cosine similarity matrix and speech seconds for several clips"""
+        def decode(i, clip):
+            try:
+                return self.decode_clip(clip)
+            except ValueError as e:
+                raise ValueError(f"Clip {i}: {e}")
+        
+        wavs = run_parallel(verify_pool, *(partial(decode, i, clip) for i, clip in enumerate(clips)))
+        embeddings = self.embed_batch(wavs)
+        return {
+            'embeddings': embeddings,
+            'similarity_matrix': embeddings @ embeddings.T,
+            'speech_seconds': [round(len(wav) / STREAM_SAMPLE_RATE, 2) for wav in wavs]
+        }
+
+    # --- Streaming ---
+    def start_voice_stream(self, stored_voice_url, sample_rate=STREAM_SAMPLE_RATE):
+        """Reference embedding from the enrolled recording, computed once per stream"""
+        with stage("voice", "download"):
+            stored_audio_data = self.download_audio_from_url(stored_voice_url)
+        with stage("voice", "ffmpeg_convert"):
             stored_wav_io = self.convert_audio_to_wav(stored_audio_data, 'webm')
+        return VoiceStream(stored_voice_url, self.get_voice_embedding(stored_wav_io), sample_rate)
+
+    def feed_voice_stream(self, stream, pcm_bytes):
+        """
+        Append a PCM16LE mono chunk, embed every partial window it completes, and return the
+        score events that came due (usually none or one). Caller holds stream.lock.
+        """
+        pcm_bytes = stream.odd_byte + pcm_bytes
+        usable = len(pcm_bytes) - len(pcm_bytes) % 2
+        stream.odd_byte = pcm_bytes[usable:]
+        samples = np.frombuffer(pcm_bytes[:usable], dtype='<i2').astype(np.float32) / 32768.0
+        if stream.resampler is not None and len(samples):
+            samples = stream.resampler.resample_chunk(samples)
+        stream.buffer = np.concatenate([stream.buffer, samples])
+        stream.received += len(samples)
+        
+        # Every partial window that is now complete, each embedded exactly once
+        mels, ends = [], []
+        with stage("voice", "stream_mel"):
+            while stream.next_partial + PARTIAL_SAMPLES <= stream.received:
+                start = stream.next_partial - stream.buffer_start
+                window = stream.buffer[start:start + PARTIAL_SAMPLES]
+                stream.next_partial += PARTIAL_STEP_SAMPLES
+                if np.sqrt(np.mean(window ** 2)) < STREAM_MIN_RMS:
+                    stream.skipped_partials += 1  # silence would drag the speaker mean around
+                    continue
+                window = resemblyzer_audio.normalize_volume(window, resemblyzer_hparams.audio_norm_target_dBFS,
+                                                            increase_only=True)
+                mel = resemblyzer_audio.wav_to_mel_spectrogram(window)
+                mels.append(mel[:resemblyzer_hparams.partials_n_frames])
+                ends.append(stream.next_partial - PARTIAL_STEP_SAMPLES + PARTIAL_SAMPLES)
+        consumed = stream.next_partial - stream.buffer_start
+        if consumed > 0:
+            stream.buffer = stream.buffer[consumed:]
+            stream.buffer_start = stream.next_partial
+        
+        if mels:
+            with stage("voice", "embed"), MODEL_INFERENCE.time(model="resemblyzer", operation="embed_partials"):
+                embeddings = self.encode_partials(np.stack(mels))
+            stream.partials.extend(zip(ends, embeddings))
+            stream.embedded_partials += len(mels)
+        window_start = stream.received - int(STREAM_WINDOW_SECONDS * STREAM_SAMPLE_RATE)
+        while stream.partials and stream.partials[0][0] <= window_start:
+            stream.partials.popleft()
+        
+        events = []
+        if stream.received - stream.last_score_at >= STREAM_SCORE_EVERY_SECONDS * STREAM_SAMPLE_RATE:
+            stream.last_score_at = stream.received
+            stream.latest = self.score_voice_stream(stream)
+            events.append(stream.latest)
+        return events
+
+    def score_voice_stream(self, stream):
+        """Similarity of the rolling speaker embedding to the reference; None while nobody speaks"""
+        at_seconds = round(stream.received / STREAM_SAMPLE_RATE, 2)
+        if not stream.partials:
+            return {'at_seconds': at_seconds, 'speech': False, 'similarity': None, 'same_speaker': None,
+                    'partials': 0}
+        raw = np.mean([embedding for _, embedding in stream.partials], axis=0)
+        similarity = float(np.inner(stream.reference_embedding, raw / np.linalg.norm(raw)))
+        return {'at_seconds': at_seconds, 'speech': True, 'similarity': similarity,
+                'same_speaker': similarity >= self.voice_threshold, 'partials': len(stream.partials)}
+
+    def verify_voices(self, stored_audio_url, test_audio):
+        """Main voice verification method; test_audio is a base64 data URL or raw bytes (BytesIO)"""
+        try:
+            # 1. Stored recording (download, convert, load) and test audio (base64 data URL or
+            #    raw upload bytes; convert, load) are decoded concurrently
+            def stored_path():
+                with stage("voice", "download"):
+                    stored_audio_data = self.download_audio_from_url(stored_audio_url)
+                return self.decode_clip(stored_audio_data)
             
-            # 2. Convert test audio from base64 (Keep existing flow)
-            test_audio_bytes = base64.b64decode(test_audio_base64.split(',')[1])
-            test_audio_data = BytesIO(test_audio_bytes)
-            test_wav_io = self.convert_audio_to_wav(test_audio_data, 'webm')
+            stored_wav, test_wav = run_parallel(verify_pool, stored_path, partial(self.decode_clip, test_audio))
             
-            # 3. NEW TECH: Get AI Embeddings
-            embed_stored = self.get_voice_embedding(stored_wav_io)
-            embed_test = self.get_voice_embedding(test_wav_io)
+            # 2. NEW TECH: Get AI Embeddings, both clips in one encoder pass
+            embed_stored, embed_test = self.embed_batch([stored_wav, test_wav])
             
-            # 4. Calculate Similarity (Dot Product of Embeddings)
+            # 3. Calculate Similarity (Dot Product of Embeddings)
             # Resemblyzer embeddings are normalized, so dot product = cosine similarity
             similarity = np.inner(embed_stored, embed_test)
             
-            # 5. Verify using Threshold
+            # 4. Verify using Threshold
             verified = bool(similarity >= self.voice_threshold)
             
             # Determine confidence level
@@ -171,7 +412,7 @@ class ImprovedVoiceVerification:
             else:
                 confidence = 'LOW'
             
-            # 6. Construct Response (KEEPING EXACT JSON STRUCTURE FOR FRONTEND)
+            # 5. Construct Response (KEEPING EXACT JSON STRUCTURE FOR FRONTEND)
             # We map the single robust score to the previous fields to prevent breaking the UI
             result = {
                 'verified': bool(verified),
@@ -187,9 +428,11 @@ class ImprovedVoiceVerification:
                 'model_used': 'Resemblyzer_DeepLearning_v1'
             }
             
-            logger.info(f"🎯 VERIFICATION RESULT: {verified}")
-            logger.info(f"📊 AI Similarity: {similarity:.4f} (threshold: {self.voice_threshold})")
-            logger.info(f"🎖️ Confidence: {confidence}")
+            # One structured line per verification; the step-by-step detail is sampled debug
+            logger.info("🎯 Voice verification result", extra={
+                'verified': bool(verified), 'similarity': round(float(similarity), 4),
+                'threshold': self.voice_threshold, 'confidence': confidence
+            })
             
             return result
             
@@ -203,8 +446,11 @@ class ImprovedVoiceVerification:
                 'model_used': 'Resemblyzer_DeepLearning_v1'
             }
 
-# Initialize the system
+# Initialize the system; the encoder loads in the background
 voice_verifier = ImprovedVoiceVerification()
+voice_verifier.start_background_init()
+voice_streams = SessionStore("voice_stream_sessions", STREAM_MAX_SESSIONS, STREAM_SESSION_TTL)
+READY_WAIT_SECONDS = float(os.getenv("VOICE_READY_WAIT_SECONDS", "30"))
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -214,33 +460,45 @@ def health_check():
         'service': 'voice_verification_fixed',
         'version': '3.0 (AI)',
         'pydub_available': PYDUB_AVAILABLE,
+        'models_ready': voice_verifier.ready_event.is_set(),
         'thresholds': {
             'voice_threshold': voice_verifier.voice_threshold,
             'min_duration': voice_verifier.min_duration
         }
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 only once the encoder is loaded and warmed up"""
+    if not voice_verifier.ready_event.is_set():
+        return jsonify({'status': 'loading', 'service': 'voice_verification_fixed'}), 503
+    return jsonify({
+        'status': 'ready' if voice_verifier.encoder is not None else 'error',
+        'service': 'voice_verification_fixed',
+        'init_seconds': voice_verifier.init_seconds,
+        'init_error': voice_verifier.init_error
+    }), 200 if voice_verifier.encoder is not None else 503
+
 @app.route('/verify', methods=['POST'])
 def verify_voice():
     """Voice verification endpoint (UNCHANGED LOGIC)"""
     try:
-        data = request.json
+        with QUEUE_DEPTH.track(queue="voice_model_wait"), stage("voice", "model_wait"):
+            ready = voice_verifier.wait_until_ready(READY_WAIT_SECONDS)
+        if not ready:
+            return jsonify({'error': 'Voice model is still loading, retry shortly'}), 503
         
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        # JSON with a base64 data URL, multipart (test_voice file) or a raw audio body
+        upload = read_verify_upload("voice", 'stored_voice_url', 'test_voice_base64', 'test_voice')
         
-        stored_voice_url = data.get('stored_voice_url')
-        test_voice_base64 = data.get('test_voice_base64')
+        if not upload.stored_url or not upload.media:
+            return jsonify({'error': 'Missing stored_voice_url or test_voice_base64 (or a test_voice upload)'}), 400
         
-        if not stored_voice_url or not test_voice_base64:
-            return jsonify({'error': 'Missing stored_voice_url or test_voice_base64'}), 400
-        
-        logger.info(f"🎤 Voice verification request received")
-        logger.info(f"📥 Stored URL: {stored_voice_url[:50]}...")
-        logger.info(f"📥 Test audio: {len(test_voice_base64)} chars")
+        hot_log.debug("🎤 Voice verification request: stored=%s test=%d (%s, %d body bytes)",
+                      upload.stored_url[:50], media_size(upload.media), upload.encoding, upload.body_bytes)
         
         # Perform verification
-        result = voice_verifier.verify_voices(stored_voice_url, test_voice_base64)
+        result = voice_verifier.verify_voices(upload.stored_url, upload.media)
         
         return jsonify(result)
         
@@ -254,8 +512,127 @@ def verify_voice():
             'model_used': 'Resemblyzer_DeepLearning_v1'
         }), 500
 
+@app.route('/embed-batch', methods=['POST'])
+def embed_voice_batch():
+    """
+    Embed several clips in one encoder pass and compare them all pairwise. JSON
+    {"voice_urls": [...], "voices_base64": [...]} or multipart voice_url fields and voice files;
+    clips are ordered URLs first, then inline audio.
+    """
+    try:
+        with QUEUE_DEPTH.track(queue="voice_model_wait"), stage("voice", "model_wait"):
+            ready = voice_verifier.wait_until_ready(READY_WAIT_SECONDS)
+        if not ready or voice_verifier.encoder is None:
+            return jsonify({'error': 'Voice model is still loading, retry shortly'}), 503
+        
+        with stage("voice", "request_parse"):
+            if request.mimetype == 'multipart/form-data':
+                uploads = request.files.getlist('voice')
+                for upload in uploads:
+                    upload.stream.seek(0)
+                clips = request.form.getlist('voice_url') + [upload.stream for upload in uploads]
+                labels = request.form.getlist('voice_url') + [upload.filename or f'voice[{i}]'
+                                                              for i, upload in enumerate(uploads)]
+                include_embeddings = request.form.get('include_embeddings', '1') != '0'
+            else:
+                data = request.get_json(silent=True) or {}
+                urls, inline = list(data.get('voice_urls') or []), list(data.get('voices_base64') or [])
+                clips = urls + inline
+                labels = urls + [f'voices_base64[{i}]' for i in range(len(inline))]
+                include_embeddings = bool(data.get('include_embeddings', True))
+        
+        if not clips:
+            return jsonify({'error': 'Send voice_urls and/or voices_base64 (or voice_url fields / voice uploads)'}), 400
+        if len(clips) > BATCH_MAX_CLIPS:
+            return jsonify({'error': f'At most {BATCH_MAX_CLIPS} clips per batch'}), 400
+        
+        result = voice_verifier.embed_voices(clips)
+        response = {
+            'count': len(clips),
+            'labels': labels,
+            'similarity_matrix': np.round(result['similarity_matrix'], 4).tolist(),
+            'speech_seconds': result['speech_seconds'],
+            'threshold_used': voice_verifier.voice_threshold,
+            'model_used': 'Resemblyzer_DeepLearning_v1'
+        }
+        if include_embeddings:
+            response['embeddings'] = result['embeddings'].tolist()
+        return jsonify(response)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Batch embedding error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stream/<session_id>', methods=['POST'])
+def stream_voice(session_id):
+    """
+    Streaming verification: the body is raw PCM16LE mono audio (?sample_rate=, default 16000).
+    Send short chunks as separate requests, or one long chunked request with
+    Accept: application/x-ndjson to receive each score as a line as soon as it is computed.
+    """
+    try:
+        with QUEUE_DEPTH.track(queue="voice_model_wait"), stage("voice", "model_wait"):
+            ready = voice_verifier.wait_until_ready(READY_WAIT_SECONDS)
+        if not ready or voice_verifier.encoder is None:
+            return jsonify({'error': 'Voice model is still loading, retry shortly'}), 503
+        
+        stored_voice_url = request.args.get('stored_voice_url')
+        stream = voice_streams.get(session_id)
+        if stream is None or (stored_voice_url and stored_voice_url != stream.stored_voice_url):
+            if not stored_voice_url:
+                return jsonify({'error': 'Unknown session_id; send stored_voice_url to start streaming'}), 400
+            sample_rate = int(request.args.get('sample_rate', STREAM_SAMPLE_RATE))
+            if not 8000 <= sample_rate <= 48000:
+                return jsonify({'error': 'sample_rate must be between 8000 and 48000'}), 400
+            stream = voice_verifier.start_voice_stream(stored_voice_url, sample_rate)
+            voice_streams.put(session_id, stream)
+        
+        def chunk_events():
+            body = request.stream
+            while True:
+                with stage("voice", "request_parse"):
+                    chunk = body.read(STREAM_READ_BYTES)
+                if not chunk:
+                    break
+                # Yield outside the lock: the client may read slowly, and other requests
+                # for this session must not wait on it
+                with stream.lock:
+                    events = voice_verifier.feed_voice_stream(stream, chunk)
+                yield from events
+        
+        def summary():
+            return {'session_id': session_id, 'received_seconds': round(stream.received / STREAM_SAMPLE_RATE, 2),
+                    'embedded_partials': stream.embedded_partials, 'skipped_partials': stream.skipped_partials,
+                    'latest': stream.latest}
+        
+        if request.accept_mimetypes.best == 'application/x-ndjson':
+            def ndjson():
+                for event in chunk_events():
+                    yield json.dumps(event) + '\n'
+                yield json.dumps(summary()) + '\n'
+            return Response(stream_with_context(ndjson()), mimetype='application/x-ndjson')
+        
+        scores = list(chunk_events())
+        return jsonify({**summary(), 'scores': scores})
+        
+    except ValueError as e:
+        # e.g. the stored recording is too short or has no speech
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Voice stream error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stream/<session_id>', methods=['DELETE'])
+def end_voice_stream(session_id):
+    """Drop a streamed interview's buffer and partials"""
+    voice_streams.discard(session_id)
+    return jsonify({'session_id': session_id, 'ended': True})
+
 if __name__ == '__main__':
     logger.info("🚀 Starting AI-Powered Voice Verification Service...")
     logger.info(f"🎤 Voice threshold: {voice_verifier.voice_threshold}")
     logger.info(f"🔊 Pydub available: {PYDUB_AVAILABLE}")
-    app.run(host='0.0.0.0', port=8003, debug=True)
\ No newline at end of file
+    # The reloader would re-import this module and load every model twice
+    app.run(host='0.0.0.0', port=8003, debug=True, use_reloader=False)
\ No newline at end of file